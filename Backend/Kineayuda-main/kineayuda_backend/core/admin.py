@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import kinesiologo, paciente, cita, reseña, documentoVerificacion,agenda, metodoPago, pagoSuscripcion, pagoCita
+from .models import kinesiologo, paciente, cita, reseña, documentoVerificacion,agenda, agendaHistorica, metodoPago, pagoSuscripcion, pagoCita, regionChile, comunaChile
 
 # Register your models here.
 admin.site.register(kinesiologo)
@@ -7,9 +7,12 @@ admin.site.register(paciente)
 admin.site.register(cita)
 admin.site.register(reseña)
 admin.site.register(agenda)
+admin.site.register(agendaHistorica)
 admin.site.register(metodoPago)
 admin.site.register(pagoSuscripcion)
 admin.site.register(pagoCita)
+admin.site.register(regionChile)
+admin.site.register(comunaChile)
 
 @admin.register(documentoVerificacion)
 class DocumentoVerificacionAdmin(admin.ModelAdmin):
@@ -1,10 +1,21 @@
-from firebase_admin import auth
 from rest_framework import authentication, exceptions  
+from core.utils.cache_tokens import cache_tokens
+from core.utils.auth_helpers import buscar_kinesiologo
+
+_SIN_RESOLVER = object()
 
 class FirebaseUser:
     def __init__(self, uid, email=None):
         self.uid = uid
         self.email = email
+        self._kinesiologo = _SIN_RESOLVER
+
+    @property
+    def kinesiologo(self):
+        # Se consulta una vez: el usuario se crea en cada authenticate, así que vive lo que dura el request
+        if self._kinesiologo is _SIN_RESOLVER:
+            self._kinesiologo = buscar_kinesiologo(self.uid)
+        return self._kinesiologo
 
     @property
     def is_authenticated(self):
@@ -21,7 +32,8 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
             raise exceptions.AuthenticationFailed('No se proporcionó un token.')
         
         try:
-            decoded = auth.verify_id_token(token)
+            # Claims en cache hasta el exp del token (ver FIREBASE_TOKEN_CACHE_MAX)
+            decoded = cache_tokens.verificar(token)
         except Exception as e:
             print(f"🔥 ERROR VERIFICANDO TOKEN (Ignorado para fallback): {str(e)}")
             # NO lanzar excepción para permitir que la vista maneje la autenticación alternativa
@@ -0,0 +1,164 @@
+"""
+Backends de inferencia para el modelo de sentimiento, elegidos con settings.IA_BACKEND:
+
+  - 'torch':      el modelo de transformers tal cual (float32), referencia de resultados.
+  - 'torch_int8': mismo modelo con cuantización dinámica int8 de las capas Linear (CPU).
+  - 'onnx':       grafo exportado con `manage.py exportar_modelo_ia` y ejecutado con
+                  onnxruntime (dependencia opcional, no viene en requirements.txt).
+
+Todos exponen `probabilidades(textos, max_length)` -> list[list[float]] e `id2label`.
+Los hilos de torch/onnxruntime y los buckets de largo se configuran al crearlos (IA_TORCH_HILOS, IA_BUCKETS_LONGITUD).
+"""
+import math
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = ('torch', 'torch_int8', 'onnx')
+
+
+class _Backend:
+    # Largos (en tokens) a los que se rellena cada lote; vacío = rellenar al más largo del lote
+    buckets = ()
+
+    def tokenizar(self, textos, max_length, tensores):
+        """
+        Tokeniza con relleno por buckets: el lote se rellena al bucket más chico que
+        contiene su secuencia más larga. Así el modelo ve pocas formas de tensor
+        distintas (las mismas que se calentaron en warmup()) y un texto corto no se
+        rellena a max_length.
+        """
+        if not self.buckets:
+            return self.tokenizer(textos, return_tensors=tensores, truncation=True, padding='longest', max_length=max_length)
+        codificado = self.tokenizer(textos, truncation=True, max_length=max_length)
+        largo = max(len(ids) for ids in codificado['input_ids'])
+        objetivo = next((b for b in self.buckets if b >= largo), max_length)
+        return self.tokenizer.pad(codificado, padding='max_length', max_length=min(objetivo, max_length), return_tensors=tensores)
+
+
+class BackendTorch(_Backend):
+    nombre = 'torch'
+
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.id2label = model.config.id2label
+
+    def probabilidades(self, textos, max_length):
+        import torch
+
+        inputs = self.tokenizar(textos, max_length, "pt")
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+        return torch.softmax(logits, dim=-1).tolist()
+
+
+class BackendTorchInt8(BackendTorch):
+    nombre = 'torch_int8'
+
+    def __init__(self, tokenizer, model):
+        import torch
+
+        cuantizado = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(tokenizer, cuantizado)
+
+
+class BackendOnnx(_Backend):
+    nombre = 'onnx'
+
+    def __init__(self, tokenizer, ruta, id2label, hilos=0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImproperlyConfigured("IA_BACKEND='onnx' requiere instalar onnxruntime.") from e
+
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if hilos:
+            opciones.intra_op_num_threads = hilos
+        try:
+            self.sesion = ort.InferenceSession(ruta, opciones, providers=['CPUExecutionProvider'])
+        except Exception as e:
+            raise ImproperlyConfigured(
+                f"No se pudo abrir el modelo ONNX en {ruta}. Genéralo con 'python manage.py exportar_modelo_ia'."
+            ) from e
+        self.tokenizer = tokenizer
+        self.id2label = id2label
+        self.entradas = {i.name for i in self.sesion.get_inputs()}
+
+    def probabilidades(self, textos, max_length):
+        inputs = self.tokenizar(textos, max_length, "np")
+        feed = {k: v.astype('int64') for k, v in inputs.items() if k in self.entradas}
+        logits = self.sesion.run(['logits'], feed)[0]
+        return [_softmax(fila) for fila in logits.tolist()]
+
+
+def _softmax(fila):
+    m = max(fila)
+    exps = [math.exp(x - m) for x in fila]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+def configurar_hilos(hilos=0, hilos_interop=0):
+    """
+    Fija los hilos de torch (0 = dejar el valor por defecto). Debe llamarse antes de
+    la primera inferencia: torch no permite cambiar los hilos inter-op después.
+    """
+    import torch
+
+    if hilos:
+        torch.set_num_threads(hilos)
+    if hilos_interop:
+        try:
+            torch.set_num_interop_threads(hilos_interop)
+        except RuntimeError:
+            pass  # ya se usó el pool inter-op en este proceso
+
+
+def crear_backend(tipo, nombre, revision, ruta_onnx=None, hilos=0, hilos_interop=0, buckets=()):
+    if tipo not in BACKENDS:
+        raise ImproperlyConfigured(f"IA_BACKEND debe ser uno de {BACKENDS}, no '{tipo}'.")
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(nombre, revision=revision)
+    if tipo == 'onnx':
+        # Solo la configuración (id2label): no se cargan los pesos de torch
+        from transformers import AutoConfig
+        config = AutoConfig.from_pretrained(nombre, revision=revision)
+        backend = BackendOnnx(tokenizer, ruta_onnx, config.id2label, hilos=hilos)
+    else:
+        from transformers import AutoModelForSequenceClassification
+        configurar_hilos(hilos, hilos_interop)
+        model = AutoModelForSequenceClassification.from_pretrained(nombre, revision=revision)
+        model.eval()
+        backend = BackendTorchInt8(tokenizer, model) if tipo == 'torch_int8' else BackendTorch(tokenizer, model)
+    backend.buckets = tuple(sorted(buckets))
+    return backend
+
+
+def exportar_onnx(backend_torch, ruta, opset=17):
+    """Exporta el modelo de un BackendTorch a ONNX con ejes dinámicos de lote y secuencia."""
+    import os
+    import torch
+
+    class _SoloLogits(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *tensores):
+            return self.model(**dict(zip(nombres, tensores))).logits
+
+    ejemplo = backend_torch.tokenizer(["texto de ejemplo"], return_tensors="pt")
+    nombres = list(ejemplo.keys())  # input_ids, token_type_ids, attention_mask
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    torch.onnx.export(
+        _SoloLogits(backend_torch.model),
+        tuple(ejemplo[n] for n in nombres),
+        ruta,
+        input_names=nombres,
+        output_names=['logits'],
+        dynamic_axes={**{n: {0: 'lote', 1: 'secuencia'} for n in nombres}, 'logits': {0: 'lote'}},
+        opset_version=opset,
+        dynamo=False,
+    )
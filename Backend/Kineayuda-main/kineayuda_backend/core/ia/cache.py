@@ -0,0 +1,104 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from .registro import identificador_modelo
+
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza solo lo que el tokenizer ya ignora (unicode y espacios), así el resultado no cambia."""
+    return _ESPACIOS.sub(' ', unicodedata.normalize('NFC', texto or '')).strip()
+
+
+def clave_texto(texto: str) -> str:
+    """
+    Clave del resultado: hash del texto normalizado + modelo + revisión + backend.
+    Cambiar IA_MODELO_NOMBRE, IA_MODELO_REVISION o IA_BACKEND cambia todas las claves,
+    por lo que los resultados del modelo anterior dejan de usarse solos.
+    """
+    base = f"{identificador_modelo()}\x00{normalizar_texto(texto)}"
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+
+class CacheSentimiento:
+    """
+    Cache de resultados de sentimiento (el dict de analizar_sentimiento_detalle) en dos niveles:
+      1. LRU en memoria del proceso, acotado a IA_CACHE_MAX entradas.
+      2. Opcional y compartido entre workers: el backend de Django indicado en
+         IA_CACHE_BACKEND (alias de CACHES, p.ej. uno con DatabaseCache o Redis).
+    """
+
+    def __init__(self):
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_compartido = 0
+        self.misses = 0
+
+    @property
+    def max_entradas(self) -> int:
+        return getattr(settings, 'IA_CACHE_MAX', 2048)
+
+    def _compartido(self):
+        alias = getattr(settings, 'IA_CACHE_BACKEND', '')
+        return caches[alias] if alias else None
+
+    def obtener(self, texto):
+        clave = clave_texto(texto)
+        with self._lock:
+            if clave in self._lru:
+                self._lru.move_to_end(clave)
+                self.hits_memoria += 1
+                return self._lru[clave]
+
+        compartido = self._compartido()
+        valor = compartido.get(f"ia:sent:v2:{clave}") if compartido else None
+        with self._lock:
+            if valor is None:
+                self.misses += 1
+                return None
+            self.hits_compartido += 1
+        self._guardar_local(clave, valor)
+        return valor
+
+    def guardar(self, texto, valor):
+        clave = clave_texto(texto)
+        self._guardar_local(clave, valor)
+        compartido = self._compartido()
+        if compartido:
+            compartido.set(f"ia:sent:v2:{clave}", valor, getattr(settings, 'IA_CACHE_TTL', 7 * 24 * 3600))
+
+    def _guardar_local(self, clave, valor):
+        if self.max_entradas <= 0:
+            return
+        with self._lock:
+            self._lru[clave] = valor
+            self._lru.move_to_end(clave)
+            while len(self._lru) > self.max_entradas:
+                self._lru.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._lru.clear()
+            self.hits_memoria = self.hits_compartido = self.misses = 0
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits_memoria + self.hits_compartido + self.misses
+            return {
+                'modelo': identificador_modelo(),
+                'entradas_memoria': len(self._lru),
+                'max_entradas': self.max_entradas,
+                'hits_memoria': self.hits_memoria,
+                'hits_compartido': self.hits_compartido,
+                'misses': self.misses,
+                'tasa_aciertos': round((self.hits_memoria + self.hits_compartido) / consultas, 3) if consultas else 0,
+            }
+
+
+cache_sentimiento = CacheSentimiento()
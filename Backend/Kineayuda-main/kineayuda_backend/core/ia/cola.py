@@ -0,0 +1,149 @@
+"""
+Cálculo del sentimiento de reseñas en segundo plano.
+
+La reseña se guarda de inmediato con sentimiento=NULL y estado_sentimiento='pendiente';
+la propia tabla de reseñas hace de cola. Según settings.IA_SENTIMIENTO_MODO:
+
+  - 'hilo' (por defecto): al confirmar la transacción se despierta un hilo del mismo
+    proceso que procesa todas las pendientes en lotes.
+  - 'cola': el request solo guarda; un proceso aparte las procesa con
+    `python manage.py procesar_sentimientos --continuo`.
+  - 'sincrono': se calcula dentro del request (comportamiento anterior, útil en tests).
+
+Mientras un worker infiere, sus reseñas quedan en 'procesando' (ver procesar_pendientes).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+CAMPOS_SENTIMIENTO = [
+    'sentimiento', 'estado_sentimiento', 'confianza_sentimiento', 'probabilidades_sentimiento', 'modelo_sentimiento',
+    'sentimiento_reclamado',
+]
+
+
+def aplicar_detalle(resena, detalle):
+    """Copia el resultado de analizar_sentimiento_detalle a la reseña (sin guardar)."""
+    resena.sentimiento_reclamado = None
+    if detalle is None:
+        resena.estado_sentimiento = 'error'
+        return resena
+    resena.sentimiento = detalle['sentimiento']
+    resena.confianza_sentimiento = detalle['confianza']
+    resena.probabilidades_sentimiento = detalle['probabilidades']
+    resena.modelo_sentimiento = detalle['modelo']
+    resena.estado_sentimiento = 'procesado'
+    return resena
+
+
+def modo_sentimiento() -> str:
+    return getattr(settings, 'IA_SENTIMIENTO_MODO', 'hilo')
+
+
+def _obtener_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # Un solo hilo basta: cada pasada vacía la cola completa en lotes
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ia-sentimiento')
+    return _executor
+
+
+def programar_sentimiento(resena):
+    """Se llama justo después de crear la reseña."""
+    modo = modo_sentimiento()
+    if modo == 'sincrono':
+        from core.modulo_ia import analizar_sentimiento_detalle
+
+        aplicar_detalle(resena, analizar_sentimiento_detalle(resena.comentario))
+        resena.save(update_fields=CAMPOS_SENTIMIENTO)
+    elif modo == 'hilo':
+        transaction.on_commit(lambda: _obtener_executor().submit(_procesar_en_hilo))
+
+
+def _procesar_en_hilo():
+    try:
+        procesar_pendientes()
+    except Exception:
+        logger.exception("Error procesando sentimientos pendientes")
+    finally:
+        # El hilo tiene su propia conexión a la BD: no dejarla abierta
+        connection.close()
+
+
+def _reclamar(tamano_lote):
+    """
+    Toma hasta tamano_lote reseñas pendientes (o 'procesando' con el reclamo vencido) y
+    las marca 'procesando' en una transacción corta. Retorna (reseñas, hora del reclamo).
+    """
+    from core.models import reseña
+
+    ahora = timezone.now()
+    vencido = ahora - timedelta(seconds=getattr(settings, 'IA_COLA_RECLAMO_S', 300))
+    with transaction.atomic():
+        lote = list(
+            reseña.objects.select_for_update(skip_locked=True)
+            .filter(Q(estado_sentimiento='pendiente')
+                    | Q(estado_sentimiento='procesando', sentimiento_reclamado__lt=vencido))
+            .order_by('id')
+            .only('id', 'comentario')[:tamano_lote]
+        )
+        if lote:
+            reseña.objects.filter(id__in=[r.id for r in lote]).update(
+                estado_sentimiento='procesando', sentimiento_reclamado=ahora)
+    return lote, ahora
+
+
+def procesar_pendientes(tamano_lote=None, max_lotes=None) -> int:
+    """
+    Procesa reseñas con estado_sentimiento='pendiente' en lotes, en tres pasos: las toma
+    (SKIP LOCKED + 'procesando', así varios workers drenan la cola sin repetir filas),
+    infiere fuera de toda transacción y guarda con bulk_update en otra transacción corta.
+    Ningún bloqueo ni conexión queda tomado durante la inferencia. Si el modelo falla el
+    lote vuelve a 'pendiente' y la pasada termina. Retorna la cantidad de reseñas procesadas.
+    """
+    from core.models import reseña
+    from core.modulo_ia import analizar_sentimiento_detalle_batch
+    from core.utils.calificaciones import recalcular_por_resenas
+
+    tamano_lote = tamano_lote or getattr(settings, 'IA_LOTE_MAX', 16)
+    procesadas = 0
+    lotes = 0
+    close_old_connections()
+    while max_lotes is None or lotes < max_lotes:
+        lote, reclamo = _reclamar(tamano_lote)
+        if not lote:
+            break
+        propias = reseña.objects.filter(id__in=[r.id for r in lote], estado_sentimiento='procesando',
+                                         sentimiento_reclamado=reclamo)
+        try:
+            detalles = analizar_sentimiento_detalle_batch([r.comentario for r in lote])
+            if len(detalles) != len(lote):
+                raise ValueError(f"{len(detalles)} resultados para {len(lote)} reseñas")
+        except Exception:
+            logger.exception("Falló el análisis de sentimiento de %s reseñas; vuelven a la cola", len(lote))
+            propias.update(estado_sentimiento='pendiente', sentimiento_reclamado=None)
+            break
+
+        with transaction.atomic():
+            # Solo las que siguen siendo de este reclamo (si venció, otro worker las pudo retomar)
+            vigentes = set(propias.select_for_update().values_list('id', flat=True))
+            lote = [aplicar_detalle(r, d) for r, d in zip(lote, detalles) if r.id in vigentes]
+            reseña.objects.bulk_update(lote, CAMPOS_SENTIMIENTO)
+            # bulk_update no pasa por post_save: los conteos por sentimiento se reconcilian aquí
+            recalcular_por_resenas([r.id for r in lote])
+        procesadas += len(lote)
+        lotes += 1
+    return procesadas
@@ -0,0 +1,18 @@
+# Reseñas representativas (cortas, medianas y largas) usadas por los benchmarks
+# y el warm-up del modelo de sentimiento. No contienen datos reales de pacientes.
+TEXTOS = [
+    "Excelente atención, muy recomendable.",
+    "Muy mala experiencia, llegó tarde y no explicó nada.",
+    "La sesión estuvo bien.",
+    "El kinesiólogo fue muy amable y puntual, noté mejoría en mi rodilla desde la primera sesión.",
+    "No volvería, el lugar estaba sucio y la atención fue apurada.",
+    "Normal, cumplió con lo acordado.",
+    "Me ayudó muchísimo con el dolor lumbar que tenía hace meses. Los ejercicios para la casa fueron claros y "
+    "siempre respondió mis dudas por mensaje. Totalmente recomendado para quienes buscan un trato cercano.",
+    "Tuve que esperar casi una hora y después la sesión duró quince minutos. Además me cobraron más de lo "
+    "indicado en la página. No lo recomiendo.",
+    "Buena disposición, aunque la consulta queda un poco lejos del metro.",
+    "Gracias por todo!!",
+    "Atención a domicilio impecable, trajo todos los implementos y fue muy profesional con mi mamá.",
+    "Regular. Esperaba más seguimiento después de la primera cita.",
+]
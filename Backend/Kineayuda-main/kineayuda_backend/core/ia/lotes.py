@@ -0,0 +1,74 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class AgrupadorLotes:
+    """
+    Junta textos que llegan de forma concurrente (hilos de request) y los pasa
+    en un solo lote a `funcion_lote`, que recibe list[str] y retorna una lista
+    de resultados en el mismo orden.
+
+    Un lote se despacha cuando junta `max_lote` textos o cuando pasan `espera_ms`
+    desde que llegó el primero. Solo agrupa dentro de un proceso: con workers
+    sync de un hilo cada request llega sola y el lote es de tamaño 1.
+    """
+
+    def __init__(self, funcion_lote, max_lote: int = 16, espera_ms: float = 5):
+        self.funcion_lote = funcion_lote
+        self.max_lote = max(1, max_lote)
+        self.espera = max(0.0, espera_ms) / 1000
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+
+    def _asegurar_hilo(self):
+        # Tras un fork el hilo del proceso padre no existe en el hijo: se relanza.
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid():
+                self._cola = queue.Queue()
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._bucle, name='ia-lotes', daemon=True)
+                self._hilo.start()
+
+    def enviar(self, texto) -> Future:
+        self._asegurar_hilo()
+        futuro = Future()
+        self._cola.put((texto, futuro))
+        return futuro
+
+    def analizar(self, texto, timeout=None):
+        """Resultado de `texto`; concurrent.futures.TimeoutError si no llega en `timeout` segundos."""
+        return self.enviar(texto).result(timeout=timeout)
+
+    def _juntar_lote(self, cola):
+        lote = [cola.get()]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(cola.get(timeout=restante) if restante > 0 else cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        cola = self._cola
+        while True:
+            lote = self._juntar_lote(cola)
+            try:
+                resultados = list(self.funcion_lote([texto for texto, _ in lote]))
+                if len(resultados) != len(lote):
+                    # Con zip los que sobran quedarían esperando para siempre
+                    raise RuntimeError(f"funcion_lote retornó {len(resultados)} resultados para {len(lote)} textos")
+            except Exception as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+                continue
+            for (_, futuro), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
@@ -0,0 +1,143 @@
+import gc
+import logging
+import os
+import re
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Modelo público de sentimiento en español (se puede sobreescribir en settings.IA_MODELO_NOMBRE)
+MODEL_NAME = "finiteautomata/beto-sentiment-analysis"
+
+_lock = threading.Lock()
+_modelo = None  # backend de inferencia una vez cargado
+_revisiones = {}  # (modelo, rama o tag) -> commit al que apuntaba al resolverlo
+_lock_revisiones = threading.Lock()  # aparte de _lock: _cargar() la pide con _lock tomado
+_SHA = re.compile(r'[0-9a-f]{40}')
+
+
+def nombre_modelo() -> str:
+    return getattr(settings, 'IA_MODELO_NOMBRE', MODEL_NAME)
+
+
+def revision_modelo() -> str:
+    """
+    Commit del modelo en el Hub. settings.IA_MODELO_REVISION debería ser un SHA fijo;
+    una rama o tag se resuelve una vez por proceso al commit al que apunta, y con ese
+    commit se carga el modelo: la clave de la cache y modelo_sentimiento cambian
+    cuando cambia el modelo.
+    """
+    revision = getattr(settings, 'IA_MODELO_REVISION', 'main')
+    if _SHA.fullmatch(revision):
+        return revision
+    clave = (nombre_modelo(), revision)
+    if clave not in _revisiones:
+        with _lock_revisiones:
+            if clave not in _revisiones:
+                _revisiones[clave] = _resolver_revision(*clave)
+    return _revisiones[clave]
+
+
+def _resolver_revision(nombre, revision) -> str:
+    # Primero el Hub; sin red, la referencia que dejó la última descarga en la cache local
+    try:
+        from huggingface_hub import HfApi, constants
+    except ImportError:
+        return revision
+    try:
+        sha = HfApi().model_info(nombre, revision=revision).sha
+        if sha:
+            return sha
+    except Exception as e:
+        logger.warning("No se pudo resolver %s@%s en el Hub: %s", nombre, revision, e)
+    ruta = os.path.join(constants.HF_HUB_CACHE, f"models--{nombre.replace('/', '--')}", 'refs', revision)
+    try:
+        with open(ruta) as f:
+            return f.read().strip() or revision
+    except OSError:
+        logger.warning("%s@%s sin resolver a un commit: fijar IA_MODELO_REVISION a un SHA.", nombre, revision)
+        return revision
+
+
+def tipo_backend() -> str:
+    return getattr(settings, 'IA_BACKEND', 'torch')
+
+
+def identificador_modelo() -> str:
+    """Identifica qué produjo un resultado: modelo, revisión y backend de inferencia."""
+    return f"{nombre_modelo()}@{revision_modelo()}/{tipo_backend()}"
+
+
+def _cargar():
+    # transformers/torch se importan dentro de crear_backend y no a nivel de módulo:
+    # importar core.views (migrate, shell, cualquier comando de manage.py) no carga el modelo.
+    from .backends import crear_backend
+
+    return crear_backend(
+        tipo_backend(),
+        nombre_modelo(),
+        revision_modelo(),
+        ruta_onnx=getattr(settings, 'IA_ONNX_RUTA', None),
+        hilos=getattr(settings, 'IA_TORCH_HILOS', 0),
+        hilos_interop=getattr(settings, 'IA_TORCH_HILOS_INTEROP', 0),
+        buckets=getattr(settings, 'IA_BUCKETS_LONGITUD', ()),
+    )
+
+
+def obtener_backend():
+    """Retorna el backend de inferencia (ver core/ia/backends.py), cargándolo la primera vez."""
+    global _modelo
+    if _modelo is None:
+        with _lock:
+            if _modelo is None:
+                _modelo = _cargar()
+    return _modelo
+
+
+def modelo_cargado() -> bool:
+    return _modelo is not None
+
+
+def descargar_modelo():
+    """Olvida el modelo cargado y las revisiones resueltas (la próxima llamada los vuelve a cargar)."""
+    global _modelo
+    with _lock:
+        _modelo = None
+    with _lock_revisiones:
+        _revisiones.clear()
+
+
+def precargar_modelo(compartir: bool = False):
+    """
+    Carga el modelo de inmediato en vez de esperar a la primera reseña.
+
+    Con compartir=True se asume que el proceso actual es el maestro de un servidor
+    pre-fork (gunicorn --preload): tras cargar se congelan los objetos vivos en el GC
+    para que las recolecciones de los workers no toquen esas páginas y sigan
+    compartidas copy-on-write. En ese modo NO se ejecuta ninguna inferencia antes
+    del fork, porque el pool de hilos de torch no sobrevive a un fork.
+    """
+    obtener_backend()
+    if compartir:
+        gc.collect()
+        gc.freeze()
+
+
+def precargar_segun_settings():
+    """
+    Hook de arranque usado por wsgi.py / asgi.py según settings.IA_CARGA_MODELO:
+      - 'perezoso' (por defecto): no hace nada, el modelo se carga en el primer uso.
+      - 'arranque': cada proceso carga su copia al iniciar y la calienta (IA_WARMUP).
+      - 'prefork': se carga una sola vez en el proceso maestro y los workers la heredan.
+        El warm-up no puede correr antes del fork: llamar core.modulo_ia.warmup()
+        desde el hook post_fork del servidor.
+    """
+    modo = getattr(settings, 'IA_CARGA_MODELO', 'perezoso')
+    if modo == 'arranque':
+        precargar_modelo()
+        if getattr(settings, 'IA_WARMUP', True):
+            from core.modulo_ia import warmup
+            warmup()
+    elif modo == 'prefork':
+        precargar_modelo(compartir=True)
@@ -0,0 +1,155 @@
+"""
+Servicio local de inferencia: un único proceso (`manage.py servidor_ia`) tiene el modelo
+cargado y atiende a todos los workers de Django por un socket Unix. Así la memoria del
+modelo no se multiplica por la cantidad de workers y los hilos de torch no compiten con
+los hilos de request. Los textos que llegan de distintos workers se agrupan en lotes.
+
+Los workers lo usan si settings.IA_SERVICIO_SOCKET está definido; core.modulo_ia hace
+el cambio de forma transparente y, si el servicio no responde, infiere localmente
+(IA_SERVICIO_FALLBACK).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServicioNoDisponible(Exception):
+    pass
+
+
+def clave_servicio() -> bytes:
+    # Servidor y clientes comparten settings: la clave se deriva de SECRET_KEY
+    return hashlib.sha256(f"kineayuda-ia:{settings.SECRET_KEY}".encode('utf-8')).digest()
+
+
+class ClienteServicioIA:
+    """Cliente con una conexión persistente por hilo, timeout y espera tras una falla."""
+
+    def __init__(self, direccion, timeout=2.0, reintento_s=30.0):
+        self.direccion = direccion
+        self.timeout = timeout
+        self.reintento_s = reintento_s
+        self._local = threading.local()
+        self._caido_hasta = 0.0
+
+    def _conexion(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = Client(self.direccion, family='AF_UNIX', authkey=clave_servicio())
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _descartar(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _pedir(self, mensaje):
+        if time.monotonic() < self._caido_hasta:
+            raise ServicioNoDisponible("Servicio IA marcado como caído, se reintentará más tarde.")
+        try:
+            conn = self._conexion()
+            conn.send(mensaje)
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Sin respuesta del servicio IA en {self.timeout}s")
+            estado, datos = conn.recv()
+        except (OSError, EOFError, TimeoutError, AuthenticationError) as e:
+            # Tras un timeout la respuesta podría llegar después: la conexión ya no sirve
+            self._descartar()
+            self._caido_hasta = time.monotonic() + self.reintento_s
+            raise ServicioNoDisponible(str(e)) from e
+        if estado != 'ok':
+            raise ServicioNoDisponible(datos)
+        return datos
+
+    def detalle_batch(self, textos):
+        return self._pedir(('detalle', list(textos)))
+
+    def ping(self):
+        return self._pedir(('ping',))
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obtener_cliente():
+    """Cliente del servicio según settings, o None si la inferencia es en el proceso."""
+    global _cliente
+    direccion = getattr(settings, 'IA_SERVICIO_SOCKET', '')
+    if not direccion:
+        return None
+    if _cliente is None or _cliente.direccion != direccion:
+        with _cliente_lock:
+            if _cliente is None or _cliente.direccion != direccion:
+                _cliente = ClienteServicioIA(
+                    direccion,
+                    timeout=getattr(settings, 'IA_SERVICIO_TIMEOUT', 2.0),
+                    reintento_s=getattr(settings, 'IA_SERVICIO_REINTENTO_S', 30.0),
+                )
+    return _cliente
+
+
+class ServidorIA:
+    """Atiende cada conexión en su propio hilo; todas comparten el mismo agrupador de lotes."""
+
+    def __init__(self, direccion, agrupador, identificador):
+        self.direccion = direccion
+        self.agrupador = agrupador
+        self.identificador = identificador
+
+    def atender(self, conn):
+        with conn:
+            while True:
+                try:
+                    mensaje = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if mensaje[0] == 'detalle':
+                        futuros = [self.agrupador.enviar(texto) for texto in mensaje[1]]
+                        respuesta = ('ok', [f.result() for f in futuros])
+                    elif mensaje[0] == 'ping':
+                        respuesta = ('ok', self.identificador)
+                    else:
+                        respuesta = ('error', f"Mensaje desconocido: {mensaje[0]}")
+                except Exception as e:
+                    logger.exception("Error en el servicio IA")
+                    respuesta = ('error', str(e))
+                try:
+                    conn.send(respuesta)
+                except OSError:
+                    return
+
+    def servir(self, listo=None):
+        if os.path.exists(self.direccion):
+            os.unlink(self.direccion)  # socket huérfano de una ejecución anterior
+        umask = os.umask(0o077)  # solo el mismo usuario puede conectarse
+        try:
+            listener = Listener(self.direccion, family='AF_UNIX', authkey=clave_servicio())
+        finally:
+            os.umask(umask)
+        if listo:
+            listo()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    logger.warning("Conexión rechazada al servicio IA (clave inválida)")
+                    continue
+                threading.Thread(target=self.atender, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
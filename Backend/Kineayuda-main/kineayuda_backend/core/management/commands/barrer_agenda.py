@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from core.utils.agenda import barrer_agenda
+
+
+class Command(BaseCommand):
+    help = (
+        "Marca como 'expirado' los horarios disponibles que ya pasaron y mueve a agendaHistorica los que "
+        "tienen más de AGENDA_RETENCION_DIAS (una vez, o periódicamente con --continuo). Pensado para cron "
+        "o un proceso aparte; ver también AGENDA_BARRIDO_INTERVALO_S."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help="Horarios por transacción (AGENDA_BARRIDO_LOTE).")
+        parser.add_argument('--retencion-dias', type=int, default=None,
+                            help="Archivar los que empezaron hace más de estos días (AGENDA_RETENCION_DIAS).")
+        parser.add_argument('--continuo', action='store_true', help="No termina: repite cada --intervalo segundos.")
+        parser.add_argument('--intervalo', type=float, default=900.0)
+
+    def handle(self, *args, **options):
+        while True:
+            t0 = time.perf_counter()
+            resultado = barrer_agenda(tamano_lote=options['lote'], retencion_dias=options['retencion_dias'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{resultado['expirados']} horarios expirados y {resultado['archivados']} archivados "
+                f"en {time.perf_counter() - t0:.1f}s."
+            ))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,74 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.authentication import FirebaseUser
+from core.models import agenda, kinesiologo
+from core.utils.bench import revertir
+from core.views import AgendaViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Publica N horarios de 45 minutos (lunes a viernes, 9:00 a 18:00) para un kinesiólogo de prueba: "
+        "un POST /api/agendas/ por horario contra un solo POST /api/agendas/recurrente/. Informa tiempo "
+        "y queries de cada uno. Los datos se revierten al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horarios', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with revertir():
+            self.correr(options['horarios'])
+
+    def correr(self, cantidad):
+        kx = kinesiologo.objects.create(
+            nombre='Kine', apellido='Bench', email='bench-agenda@example.com', firebase_ide='bench-agenda',
+            nro_titulo='1', rut='bench-agenda', doc_verificacion='', especialidad='deportiva',
+            estado_verificacion='aprobado', suscripcion_vence=timezone.now() + datetime.timedelta(days=365),
+        )
+        fabrica = APIRequestFactory()
+        crear = AgendaViewSet.as_view({'post': 'create'})
+        recurrente = AgendaViewSet.as_view({'post': 'recurrente'})
+
+        def post(vista, url, datos):
+            request = fabrica.post(url, datos, format='json')
+            force_authenticate(request, user=FirebaseUser(kx.firebase_ide))
+            return vista(request)
+
+        # 12 horarios por día hábil: semanas suficientes para llegar a `cantidad`
+        desde = timezone.localdate() + datetime.timedelta(days=1)
+        regla = {'dias': [0, 1, 2, 3, 4], 'hora_inicio': '09:00', 'hora_fin': '18:00', 'duracion_minutos': 45,
+                 'desde': desde.isoformat(), 'hasta': (desde + datetime.timedelta(days=(cantidad // 60 + 1) * 7)).isoformat()}
+
+        with CaptureQueriesContext(connection) as queries:
+            t0 = time.perf_counter()
+            respuesta = post(recurrente, '/api/agendas/recurrente/', dict(regla, omitir_conflictos=False))
+            t_bulk = time.perf_counter() - t0
+        q_bulk = len(queries)
+        creados = respuesta.data['creados']
+        horarios = list(agenda.objects.filter(kinesiologo=kx).order_by('inicio').values_list('inicio', 'fin'))
+        agenda.objects.filter(kinesiologo=kx).delete()
+
+        # Lo mismo con un POST por horario
+        with CaptureQueriesContext(connection) as queries:
+            t0 = time.perf_counter()
+            for inicio, fin in horarios:
+                r = post(crear, '/api/agendas/', {'inicio': inicio.isoformat(), 'fin': fin.isoformat()})
+                assert r.status_code == 201, r.data
+            t_uno = time.perf_counter() - t0
+        q_uno = len(queries)
+
+        # Con todo ya publicado: la misma regla vuelve con un conflicto por horario
+        t0 = time.perf_counter()
+        conflictos = len(post(recurrente, '/api/agendas/recurrente/', regla).data['conflictos'])
+        t_conflictos = time.perf_counter() - t0
+
+        self.stdout.write(f"{creados} horarios")
+        self.stdout.write(f"  {'un POST por horario':<34}{t_uno * 1000:>10.1f} ms{q_uno:>8} queries")
+        self.stdout.write(f"  {'POST /recurrente/':<34}{t_bulk * 1000:>10.1f} ms{q_bulk:>8} queries")
+        self.stdout.write(f"  {'/recurrente/ con todo en conflicto':<34}{t_conflictos * 1000:>10.1f} ms  ({conflictos} conflictos)")
@@ -0,0 +1,50 @@
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Se ejecuta en un proceso limpio para medir un import "en frío".
+# 'perezoso' = comportamiento actual (importar core.views no carga el modelo)
+# 'anticipado' = comportamiento anterior (el modelo se cargaba al importar core.modulo_ia)
+CODIGO_HIJO = """
+import resource, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+import core.views
+if sys.argv[1] == 'anticipado':
+    from core.modulo_ia import precargar_modelo
+    precargar_modelo()
+segundos = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(segundos, rss_kb)
+"""
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo y la memoria de un import en frío de core.views con carga perezosa vs anticipada del modelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def medir(self, modo, repeticiones):
+        env = dict(os.environ, IA_CARGA_MODELO='perezoso')
+        tiempos, rss = [], []
+        for _ in range(repeticiones):
+            salida = subprocess.run(
+                [sys.executable, '-c', CODIGO_HIJO, modo],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+            )
+            segundos, rss_kb = salida.stdout.strip().splitlines()[-1].split()
+            tiempos.append(float(segundos))
+            rss.append(int(rss_kb) / 1024)
+        return tiempos, rss
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        self.stdout.write(f"{'modo':<12}{'mediana (s)':>14}{'mín (s)':>10}{'RSS máx (MB)':>16}")
+        for modo in ('anticipado', 'perezoso'):
+            tiempos, rss = self.medir(modo, repeticiones)
+            self.stdout.write(f"{modo:<12}{statistics.median(tiempos):>14.3f}{min(tiempos):>10.3f}{max(rss):>16.1f}")
@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Cada backend se mide en un proceso limpio para que la RSS de uno no contamine al otro.
+CODIGO_HIJO = """
+import json, sys, time
+import django
+django.setup()
+from core.ia.backends import crear_backend
+from core.ia.corpus_ejemplo import TEXTOS
+from core.ia.registro import nombre_modelo, revision_modelo
+from core.modulo_ia import max_length
+from core.utils.bench import percentil, rss_mb
+
+tipo, repeticiones, lote = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+rss_inicial = rss_mb()
+backend = crear_backend(tipo, nombre_modelo(), revision_modelo(), ruta_onnx=sys.argv[4])
+backend.probabilidades(TEXTOS, max_length())  # calentamiento
+
+latencias = []
+for _ in range(repeticiones):
+    for texto in TEXTOS:
+        t0 = time.perf_counter()
+        backend.probabilidades([texto], max_length())
+        latencias.append(time.perf_counter() - t0)
+
+textos = TEXTOS * repeticiones
+t0 = time.perf_counter()
+for i in range(0, len(textos), lote):
+    backend.probabilidades(textos[i:i + lote], max_length())
+throughput = len(textos) / (time.perf_counter() - t0)
+
+print(json.dumps({
+    'p50_ms': percentil(latencias, 50) * 1000,
+    'p99_ms': percentil(latencias, 99) * 1000,
+    'textos_s': throughput,
+    'rss_modelo_mb': rss_mb() - rss_inicial,
+    'rss_total_mb': rss_mb(),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Compara latencia, throughput y memoria (RSS) de los backends de inferencia de sentimiento."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', default='torch,torch_int8,onnx')
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--lote', type=int, default=16)
+        parser.add_argument('--ruta-onnx', default=settings.IA_ONNX_RUTA)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'backend':<12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'textos/s':>10}{'RSS modelo (MB)':>17}{'RSS total (MB)':>16}"
+        )
+        for tipo in [b.strip() for b in options['backends'].split(',') if b.strip()]:
+            salida = subprocess.run(
+                [sys.executable, '-c', CODIGO_HIJO, tipo, str(options['repeticiones']), str(options['lote']), options['ruta_onnx']],
+                cwd=settings.BASE_DIR, env=dict(os.environ), capture_output=True, text=True,
+            )
+            if salida.returncode != 0:
+                error = salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else 'error desconocido'
+                self.stdout.write(self.style.ERROR(f"{tipo:<12}{error}"))
+                continue
+            r = json.loads(salida.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{tipo:<12}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['textos_s']:>10.1f}"
+                f"{r['rss_modelo_mb']:>17.1f}{r['rss_total_mb']:>16.1f}"
+            )
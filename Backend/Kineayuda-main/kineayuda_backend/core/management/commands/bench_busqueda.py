@@ -0,0 +1,89 @@
+import random
+import re
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+from core.models import kinesiologo
+from core.utils.bench import revertir
+from core.utils.geografia import normalizar_ubicacion
+from core.views import KinesiologosPublicosView
+
+NOMBRES = ['José', 'María', 'Pedro', 'Camila', 'Andrés', 'Sofía', 'Matías', 'Valentina', 'Tomás', 'Martina']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda',
+             'Morales', 'Rodríguez', 'López', 'Fuentes', 'Hernández', 'Torres', 'Araya', 'Flores', 'Espinoza', 'Núñez']
+ESPECIALIDADES = ['Kinesiología deportiva', 'Rehabilitación respiratoria', 'Neurológica', 'Traumatología',
+                  'Geriatría', 'Pediatría', 'Suelo pélvico', 'Musculoesquelética']
+COMUNAS = [('Ñuñoa', 'Metropolitana'), ('Providencia', 'Metropolitana'), ('Maipú', 'Metropolitana'),
+           ('Valparaíso', 'Valparaíso'), ('Viña del Mar', 'Valparaíso'), ('Concepción', 'Biobío'),
+           ('Temuco', 'Araucanía'), ('Antofagasta', 'Antofagasta'), ('La Serena', 'Coquimbo'), ('Puerto Montt', 'Los Lagos')]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN ANALYZE de la búsqueda del directorio (?q=) con N kinesiólogos (Postgres): muestra qué índices "
+        "usa cada consulta comparada con los filtros icontains y por comuna del catálogo. Los datos se revierten al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+        parser.add_argument('--planes', action='store_true', help="Imprime el plan completo de cada consulta.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write("La búsqueda usa índices GIN de Postgres: este benchmark necesita una base Postgres.")
+            return
+        with revertir():
+            self.correr(options['filas'], options['planes'])
+
+    def correr(self, filas, planes):
+        azar = random.Random(42)
+        t0 = time.perf_counter()
+        lote = []
+        for i in range(filas):
+            comuna, region = azar.choice(COMUNAS)
+            region_obj, comuna_obj = normalizar_ubicacion(region, comuna)  # bulk_create no pasa por pre_save
+            lote.append(kinesiologo(
+                nombre=azar.choice(NOMBRES), apellido=f"{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}",
+                email=f'busq{i}@example.com', rut=f'busq-{i}', nro_titulo=str(i), doc_verificacion='',
+                especialidad=azar.choice(ESPECIALIDADES), comuna=comuna, region=region,
+                comuna_ref=comuna_obj, region_ref=region_obj,
+                estado_verificacion='aprobado' if i % 10 else 'pendiente',
+            ))
+            if len(lote) == 5000:
+                kinesiologo.objects.bulk_create(lote)
+                lote = []
+        kinesiologo.objects.bulk_create(lote)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_kinesiologo')
+        self.stdout.write(f"{filas} kinesiólogos creados en {time.perf_counter() - t0:.1f}s\n")
+
+        vista = KinesiologosPublicosView()
+        vista.format_kwarg = None
+        fabrica = APIRequestFactory()
+
+        def queryset(query):
+            vista.request = vista.initialize_request(fabrica.get(f'/api/public/kinesiologos/?{query}'))
+            return vista.get_queryset()[:20]
+
+        casos = [
+            ("comuna__icontains (antes)", lambda: kinesiologo.objects.filter(
+                estado_verificacion='aprobado', comuna__icontains='nuñoa').order_by('apellido', 'id')[:20]),
+            ("comuna=<id> (FK del catálogo)", lambda: queryset(f"comuna={normalizar_ubicacion(comuna='Ñuñoa')[1].id}")),
+            ("q=ñuñoa (texto completo)", lambda: queryset('q=ñuñoa')),
+            ("q=sepulveda deportiva", lambda: queryset('q=sepulveda+deportiva')),
+            ("q=traumatolog (prefijo)", lambda: queryset('q=traumatolog')),
+            ("q=hernandes (prefijo con stemming)", lambda: queryset('q=hernandes')),
+            ("q=gonsales (error de tipeo, trigramas)", lambda: queryset('q=gonsales')),
+        ]
+        for nombre, construir in casos:
+            plan = construir().explain(analyze=True)
+            indices = sorted(set(re.findall(r'Index Scan (?:Backward )?(?:using|on) (\w+)', plan)))
+            tiempo = re.search(r'Execution Time: ([\d.]+) ms', plan)
+            secuencial = 'Seq Scan' in plan
+            self.stdout.write(
+                f"{nombre:<38}{float(tiempo.group(1)) if tiempo else 0:>9.1f} ms  "
+                f"índices: {', '.join(indices) or '-'}{'  (Seq Scan)' if secuencial else ''}"
+            )
+            if planes:
+                self.stdout.write(plan + "\n")
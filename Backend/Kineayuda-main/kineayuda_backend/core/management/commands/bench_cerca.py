@@ -0,0 +1,104 @@
+import random
+import re
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+from core.models import comunaChile, kinesiologo
+from core.utils.bench import revertir, vista_sin_cache
+from core.utils.directorio import filtrar_cerca
+from core.utils.geocodificacion import caja
+from core.views import KinesiologosPublicosView
+
+# Puntos de búsqueda: centro de Santiago (denso), Temuco (medio) y Coyhaique (casi vacío)
+PUNTOS = [('Santiago', -33.45, -70.66), ('Temuco', -38.74, -72.60), ('Coyhaique', -45.57, -72.07)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide ?cerca=lat,lon&radio_km= con N kinesiólogos repartidos por las comunas del catálogo "
+        "(la mitad en la RM): caja por índice + haversine contra haversine sobre toda la tabla. "
+        "Los datos se revierten al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+        parser.add_argument('--radios', type=str, default='5,20,50', help="Radios en km separados por coma.")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with revertir():
+            self.correr(options['filas'], [float(r) for r in options['radios'].split(',')],
+                        options['repeticiones'])
+
+    def poblar(self, filas):
+        azar = random.Random(7)
+        comunas = list(comunaChile.objects.exclude(latitud__isnull=True))
+        metropolitanas = [c for c in comunas if c.region.codigo == 'RM']
+        t0 = time.perf_counter()
+        lote = []
+        for i in range(filas):
+            comuna = azar.choice(metropolitanas if i % 2 else comunas)
+            lote.append(kinesiologo(
+                nombre='Kine', apellido=f'Apellido {i}', email=f'cerca{i}@example.com', rut=f'cerca-{i}',
+                nro_titulo=str(i), doc_verificacion='', especialidad='deportiva',
+                comuna=comuna.nombre, comuna_ref=comuna, region_ref_id=comuna.region_id,
+                latitud=comuna.latitud + azar.uniform(-0.03, 0.03),
+                longitud=comuna.longitud + azar.uniform(-0.03, 0.03),
+                atiende_domicilio=bool(i % 3), radio_domicilio_km=azar.choice([5, 10, 20]),
+                estado_verificacion='aprobado' if i % 10 else 'pendiente',
+            ))
+            if len(lote) == 5000:
+                kinesiologo.objects.bulk_create(lote)
+                lote = []
+        kinesiologo.objects.bulk_create(lote)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_kinesiologo')
+        self.stdout.write(f"{filas} kinesiólogos creados en {time.perf_counter() - t0:.1f}s\n")
+
+    def medir(self, funcion, repeticiones):
+        tiempos, resultado = [], None
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            resultado = funcion()
+            tiempos.append(time.perf_counter() - t0)
+        return statistics.median(tiempos) * 1000, resultado
+
+    def correr(self, filas, radios, repeticiones):
+        self.poblar(filas)
+        base = kinesiologo.objects.filter(estado_verificacion='aprobado')
+        vista = vista_sin_cache(KinesiologosPublicosView)  # sin la cache de respuestas, que serviría la misma URL
+        fabrica = APIRequestFactory()
+
+        def sin_caja(lat, lon, radio):
+            # La misma distancia, pero sin el prefiltro: haversine en cada fila aprobada
+            qset = filtrar_cerca(base, lat, lon, 20000)
+            return list(qset.filter(distancia_km__lte=radio).order_by('distancia_km', 'id')[:20])
+
+        def con_caja(lat, lon, radio):
+            return list(filtrar_cerca(base, lat, lon, radio).order_by('distancia_km', 'id')[:20])
+
+        def endpoint(lat, lon, radio):
+            respuesta = vista(fabrica.get('/api/public/kinesiologos/',
+                                          {'cerca': f'{lat},{lon}', 'radio_km': radio, 'page_size': 20}))
+            return respuesta.render().data['results']
+
+        self.stdout.write(f"{'punto':<11}{'radio':>7}{'en caja':>9}{'sin caja':>12}{'con caja':>12}{'endpoint':>12}  índice")
+        for nombre, lat, lon in PUNTOS:
+            for radio in radios:
+                lat_min, lat_max, lon_min, lon_max = caja(lat, lon, radio)
+                en_caja = base.filter(latitud__range=(lat_min, lat_max), longitud__range=(lon_min, lon_max)).count()
+                ms_sin, esperado = self.medir(lambda: sin_caja(lat, lon, radio), max(1, repeticiones // 4))
+                ms_con, obtenido = self.medir(lambda: con_caja(lat, lon, radio), repeticiones)
+                ms_endpoint, _ = self.medir(lambda: endpoint(lat, lon, radio), repeticiones)
+                if [k.id for k in obtenido] != [k.id for k in esperado]:
+                    self.stderr.write(f"¡{nombre} {radio} km: la caja cambió el resultado!")
+                indices = '-'
+                if connection.vendor == 'postgresql':
+                    plan = filtrar_cerca(base, lat, lon, radio).order_by('distancia_km', 'id')[:20].explain()
+                    indices = ', '.join(sorted(set(re.findall(r'Index (?:Only )?Scan (?:Backward )?(?:using|on) (\w+)', plan)))) or 'Seq Scan'
+                self.stdout.write(
+                    f"{nombre:<11}{radio:>5.0f}km{en_caja:>9}{ms_sin:>10.1f}ms{ms_con:>10.1f}ms{ms_endpoint:>10.1f}ms  {indices}"
+                )
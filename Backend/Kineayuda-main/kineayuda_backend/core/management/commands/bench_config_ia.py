@@ -0,0 +1,62 @@
+import itertools
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.ia.backends import configurar_hilos
+from core.ia.corpus_ejemplo import TEXTOS
+from core.ia.registro import obtener_backend
+from core.modulo_ia import warmup
+from core.utils.bench import percentil
+
+
+def _lista(valor, tipo=int):
+    return [tipo(v) for v in valor.split(',') if v.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Barre hilos de torch, max_length y buckets de largo midiendo la latencia p50/p99 "
+        "de un texto suelto (el caso de validar_sentimiento_resena)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', default='1,2,4', help="Valores de torch.set_num_threads a probar.")
+        parser.add_argument('--max-length', default='128,256')
+        parser.add_argument('--buckets', default='sin,32-64-128-256', help="'sin' = relleno al más largo; si no, largos separados por '-'.")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        backend = obtener_backend()
+        t_warmup = warmup()
+        self.stdout.write(f"Backend {backend.nombre}, warm-up inicial {t_warmup:.2f}s")
+        if backend.nombre == 'onnx':
+            self.stdout.write("onnxruntime fija sus hilos al crear la sesión: se usará IA_TORCH_HILOS para todas las filas.")
+
+        configuraciones = itertools.product(
+            _lista(options['hilos']),
+            _lista(options['max_length']),
+            [() if b == 'sin' else tuple(_lista(b.replace('-', ','))) for b in options['buckets'].split(',')],
+        )
+        buckets_originales = backend.buckets
+        self.stdout.write(f"{'hilos':>6}{'max_len':>9}  {'buckets':<20}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        try:
+            for hilos, largo, buckets in configuraciones:
+                if backend.nombre != 'onnx':
+                    configurar_hilos(hilos)
+                backend.buckets = buckets
+                for texto in TEXTOS:  # primera pasada con esta configuración, no se mide
+                    backend.probabilidades([texto], largo)
+                latencias = []
+                for _ in range(options['repeticiones']):
+                    for texto in TEXTOS:
+                        t0 = time.perf_counter()
+                        backend.probabilidades([texto], largo)
+                        latencias.append(time.perf_counter() - t0)
+                nombre_buckets = '-'.join(map(str, buckets)) or 'sin'
+                self.stdout.write(
+                    f"{hilos:>6}{largo:>9}  {nombre_buckets:<20}"
+                    f"{percentil(latencias, 50) * 1000:>10.1f}{percentil(latencias, 99) * 1000:>10.1f}"
+                )
+        finally:
+            backend.buckets = buckets_originales
+            configurar_hilos(settings.IA_TORCH_HILOS)
@@ -0,0 +1,82 @@
+import base64
+import json
+import statistics
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from core.models import kinesiologo
+from core.serializer import kinesiologoSerializer
+from core.utils.bench import revertir, vista_sin_cache
+from core.views import KinesiologosPublicosView
+
+
+class Command(BaseCommand):
+    help = (
+        "Tiempo y tamaño de respuesta del directorio público (/api/public/kinesiologos/) con N kinesiólogos: "
+        "serializer completo anterior vs lista liviana vs páginas por cursor. Los datos se crean en una "
+        "transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', default='10000,100000', help="Cantidades de kinesiólogos separadas por coma.")
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def medir(self, funcion, repeticiones):
+        tiempos, tamano = [], 0
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            tamano = len(funcion())
+            tiempos.append(time.perf_counter() - t0)
+        return statistics.median(tiempos), tamano
+
+    def handle(self, *args, **options):
+        for filas in [int(n) for n in options['filas'].split(',')]:
+            with revertir():
+                self.correr(filas, options['repeticiones'])
+
+    def correr(self, filas, repeticiones):
+        kinesiologo.objects.bulk_create([
+            kinesiologo(
+                nombre=f'Kine {i}', apellido=f'Apellido {i % 5000}', email=f'bench{i}@example.com',
+                firebase_ide=f'bench-{i}', nro_titulo=str(i), rut=f'bench-{i}', doc_verificacion='',
+                especialidad=('deportiva', 'respiratoria', 'neurológica')[i % 3], estado_verificacion='aprobado',
+                precio_consulta=15000 + (i % 20) * 1000, comuna='Santiago', region='Metropolitana',
+                resenas_total=i % 7, rating=Decimal(3 + (i * 7919 % 2000) / 1000).quantize(Decimal('0.001')),
+            )
+            for i in range(filas)
+        ], batch_size=5000)
+        vista = vista_sin_cache(KinesiologosPublicosView)  # se mide la query, no la cache de respuestas
+        vista_cacheada = vista_sin_cache(KinesiologosPublicosView, version=f'bench-{uuid.uuid4().hex}')
+        fabrica = APIRequestFactory()
+
+        def pedir(query, cacheada=False):
+            respuesta = (vista_cacheada if cacheada else vista)(fabrica.get(f'/api/public/kinesiologos/?{query}', HTTP_HOST='localhost'))
+            if hasattr(respuesta, 'render'):  # desde la cache llega un HttpResponse ya renderizado
+                respuesta.render()
+            return respuesta.content
+
+        def completo_anterior():
+            qset = kinesiologo.objects.filter(estado_verificacion='aprobado').order_by('apellido')
+            return JSONRenderer().render(kinesiologoSerializer(qset, many=True).data)
+
+        # Cursor a ~90% del directorio, para medir una página "profunda"
+        profundo = kinesiologo.objects.order_by('apellido', 'id').values_list('apellido', 'id')[int(filas * 0.9)]
+        cursor = base64.urlsafe_b64encode(json.dumps(list(profundo)).encode()).decode()
+
+        casos = [
+            ("completo (serializer anterior)", completo_anterior),
+            ("lista liviana sin paginar", lambda: pedir('ordering=apellido')),
+            ("lista liviana fields=id,nombre", lambda: pedir('ordering=apellido&fields=id,nombre,apellido')),
+            ("primera página (20)", lambda: pedir('ordering=apellido&page_size=20')),
+            ("primera página (20), cacheada", lambda: pedir('ordering=apellido&page_size=20', cacheada=True)),
+            ("página al 90% (20)", lambda: pedir(f'ordering=apellido&page_size=20&cursor={cursor}')),
+            ("mejor rating, primera página (20)", lambda: pedir('ordering=-rating&page_size=20')),
+            ("rating_min=4.8 (20)", lambda: pedir('rating_min=4.8&ordering=-rating&page_size=20')),
+        ]
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{filas} kinesiólogos"))
+        for nombre, funcion in casos:
+            segundos, tamano = self.medir(funcion, repeticiones)
+            self.stdout.write(f"  {nombre:<34}{segundos * 1000:>10.1f} ms{tamano / 1024:>12.1f} KiB")
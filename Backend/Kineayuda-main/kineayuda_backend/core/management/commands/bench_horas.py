@@ -0,0 +1,85 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from core.models import agenda, kinesiologo
+from core.utils.agenda import expandir_regla
+from core.utils.bench import revertir, vista_sin_cache
+from core.views import HorasDisponiblesView
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea un kinesiólogo con un año de horarios disponibles (lunes a viernes, 9:00 a 18:00, 45 min) y "
+        "compara GET /public/kinesiologos/<id>/horas/ como era antes (todas las horas futuras, instanciando "
+        "modelos) con la ventana por defecto y el formato compacto. Informa bytes, tiempo y queries, sin "
+        "cache de respuestas. Los datos se revierten al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=365)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with revertir():
+            self.correr(options['dias'], options['repeticiones'])
+
+    def correr(self, dias, repeticiones):
+        kx = kinesiologo.objects.create(
+            nombre='Kine', apellido='Bench', email='bench-horas@example.com', firebase_ide='bench-horas',
+            nro_titulo='1', rut='bench-horas', doc_verificacion='', especialidad='deportiva',
+            estado_verificacion='aprobado',
+        )
+        desde = timezone.localdate() + datetime.timedelta(days=1)
+        horarios = expandir_regla([0, 1, 2, 3, 4], datetime.time(9), datetime.time(18), 45,
+                                  desde, desde + datetime.timedelta(days=dias))
+        agenda.objects.bulk_create([agenda(kinesiologo=kx, inicio=i, fin=f) for i, f in horarios], batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_agenda')
+
+        fabrica = APIRequestFactory()
+        vista = vista_sin_cache(HorasDisponiblesView)
+        hasta = (desde + datetime.timedelta(days=dias)).isoformat()
+
+        def anterior():
+            # La vista antes de ?desde/?hasta: todas las horas futuras como instancias del modelo
+            slots = agenda.objects.filter(kinesiologo_id=kx.id, estado='disponible',
+                                          inicio__gte=timezone.now()).order_by('inicio')
+            return JSONRenderer().render([{
+                'id': slot.id,
+                'fecha': slot.inicio.date().isoformat(),
+                'hora_inicio': slot.inicio.time().isoformat()[:5],
+                'hora_fin': slot.fin.time().isoformat()[:5],
+                'inicio': slot.inicio.isoformat(),
+                'fin': slot.fin.isoformat(),
+            } for slot in slots])
+
+        def actual(params):
+            def get():
+                request = fabrica.get(f'/public/kinesiologos/{kx.id}/horas/', params)
+                respuesta = vista(request, kinesiologo_id=kx.id)
+                assert respuesta.status_code == 200, respuesta.status_code
+                return respuesta.render().content
+            return get
+
+        casos = [
+            ("antes: todo, modelos", anterior),
+            ("lista, ventana por defecto", actual({})),
+            ("compacto, ventana por defecto", actual({'formato': 'compacto'})),
+            ("lista, un año", actual({'hasta': hasta})),
+            ("compacto, un año", actual({'hasta': hasta, 'formato': 'compacto'})),
+        ]
+        self.stdout.write(f"{len(horarios)} horarios disponibles en {dias} días")
+        self.stdout.write(f"  {'caso':<32}{'bytes':>10}{'ms':>10}{'queries':>9}")
+        for nombre, get in casos:
+            tiempos = []
+            for _ in range(repeticiones):
+                with CaptureQueriesContext(connection) as queries:
+                    t0 = time.perf_counter()
+                    contenido = get()
+                    tiempos.append(time.perf_counter() - t0)
+            self.stdout.write(f"  {nombre:<32}{len(contenido):>10}{min(tiempos) * 1000:>10.1f}{len(queries):>9}")
@@ -0,0 +1,54 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from core.ia.corpus_ejemplo import TEXTOS
+from core.ia.lotes import AgrupadorLotes
+from core.modulo_ia import _inferir_lote, precargar_modelo
+from core.utils.bench import percentil
+
+
+class Command(BaseCommand):
+    help = "Throughput y latencia p50/p99 del agrupador de micro-lotes según el tamaño máximo de lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='1,4,8,16,32', help="Tamaños máximos de lote separados por coma.")
+        parser.add_argument('--clientes', type=int, default=32, help="Hilos concurrentes simulando requests.")
+        parser.add_argument('--peticiones', type=int, default=8, help="Textos enviados por cada cliente.")
+        parser.add_argument('--espera-ms', type=float, default=5)
+
+    def correr(self, max_lote, clientes, peticiones, espera_ms):
+        agrupador = AgrupadorLotes(_inferir_lote, max_lote=max_lote, espera_ms=espera_ms)
+        latencias = []
+        lock = threading.Lock()
+
+        def cliente(n):
+            propias = []
+            for i in range(peticiones):
+                texto = TEXTOS[(n + i) % len(TEXTOS)]
+                t0 = time.perf_counter()
+                agrupador.analizar(texto)
+                propias.append(time.perf_counter() - t0)
+            with lock:
+                latencias.extend(propias)
+
+        hilos = [threading.Thread(target=cliente, args=(n,)) for n in range(clientes)]
+        t0 = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        total = time.perf_counter() - t0
+        return len(latencias) / total, latencias
+
+    def handle(self, *args, **options):
+        tamanos = [int(t) for t in options['tamanos'].split(',') if t.strip()]
+        precargar_modelo()
+        _inferir_lote(TEXTOS)  # calentamiento
+
+        self.stdout.write(f"{'lote':>6}{'textos/s':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+        for max_lote in tamanos:
+            throughput, latencias = self.correr(max_lote, options['clientes'], options['peticiones'], options['espera_ms'])
+            self.stdout.write(
+                f"{max_lote:>6}{throughput:>12.1f}"
+                f"{percentil(latencias, 50) * 1000:>12.1f}{percentil(latencias, 99) * 1000:>12.1f}"
+            )
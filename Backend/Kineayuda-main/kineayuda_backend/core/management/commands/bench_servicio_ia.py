@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.utils.bench import rss_mb
+
+# Cada "worker" es un proceso aparte. Espera a que todos estén listos (archivo 'go')
+# antes de medir, para que la carga del modelo no cuente en el throughput.
+CODIGO_WORKER = """
+import json, os, sys, time
+import django
+django.setup()
+from core.ia.corpus_ejemplo import TEXTOS
+from core.utils.bench import rss_mb
+
+modo, peticiones, carpeta, idx, socket = sys.argv[1], int(sys.argv[2]), sys.argv[3], sys.argv[4], sys.argv[5]
+if modo == 'local':
+    from core.modulo_ia import _inferir_lote, precargar_modelo
+    precargar_modelo()
+    analizar = lambda texto: _inferir_lote([texto])
+else:
+    from core.ia.servicio import ClienteServicioIA
+    cliente = ClienteServicioIA(socket, timeout=30)
+    analizar = lambda texto: cliente.detalle_batch([texto])
+analizar(TEXTOS[0])
+
+open(os.path.join(carpeta, f'listo-{idx}'), 'w').close()
+while not os.path.exists(os.path.join(carpeta, 'go')):
+    time.sleep(0.01)
+
+t0 = time.perf_counter()
+for i in range(peticiones):
+    analizar(TEXTOS[i % len(TEXTOS)])
+print(json.dumps({'segundos': time.perf_counter() - t0, 'rss_mb': rss_mb()}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Carga con N workers: RSS total y throughput con N copias del modelo vs un servicio IA compartido."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--peticiones', type=int, default=50, help="Textos analizados por cada worker.")
+        parser.add_argument('--modos', default='local,servicio')
+
+    def correr_workers(self, modo, workers, peticiones, socket, carpeta):
+        procesos = [
+            subprocess.Popen(
+                [sys.executable, '-c', CODIGO_WORKER, modo, str(peticiones), carpeta, str(i), socket],
+                cwd=settings.BASE_DIR, env=dict(os.environ, IA_SERVICIO_SOCKET=''),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            for i in range(workers)
+        ]
+        while sum(os.path.exists(os.path.join(carpeta, f'listo-{i}')) for i in range(workers)) < workers:
+            if any(p.poll() not in (None, 0) for p in procesos):
+                raise CommandError(procesos[0].communicate()[1][-2000:])
+            time.sleep(0.05)
+        t0 = time.perf_counter()
+        open(os.path.join(carpeta, 'go'), 'w').close()
+        resultados = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procesos]
+        return time.perf_counter() - t0, resultados
+
+    def medir(self, modo, workers, peticiones):
+        with tempfile.TemporaryDirectory() as carpeta:
+            socket = os.path.join(carpeta, 'ia.sock')
+            servidor = None
+            try:
+                if modo == 'servicio':
+                    servidor = subprocess.Popen(
+                        [sys.executable, 'manage.py', 'servidor_ia', '--socket', socket],
+                        cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    )
+                    while not os.path.exists(socket):
+                        if servidor.poll() is not None:
+                            raise CommandError(servidor.stderr.read().decode()[-2000:])
+                        time.sleep(0.1)
+                segundos, resultados = self.correr_workers(modo, workers, peticiones, socket, carpeta)
+                rss_total = sum(r['rss_mb'] for r in resultados)
+                if servidor:
+                    rss_total += rss_mb(servidor.pid)
+            finally:
+                if servidor:
+                    servidor.terminate()
+                    servidor.wait()
+        return workers * peticiones / segundos, rss_total
+
+    def handle(self, *args, **options):
+        workers, peticiones = options['workers'], options['peticiones']
+        self.stdout.write(f"{workers} workers x {peticiones} textos")
+        self.stdout.write(f"{'modo':<10}{'textos/s':>10}{'RSS total (MB)':>16}")
+        for modo in [m.strip() for m in options['modos'].split(',') if m.strip()]:
+            throughput, rss_total = self.medir(modo, workers, peticiones)
+            self.stdout.write(f"{modo:<10}{throughput:>10.1f}{rss_total:>16.1f}")
@@ -0,0 +1,76 @@
+import datetime
+import json
+import os
+import tempfile
+import time
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.core.management.base import BaseCommand
+from core.utils.verificador_jwt import VerificadorFirebase
+from core.utils.bench import percentil
+
+PROYECTO = 'bench-kineayuda'
+
+
+def _llave_y_certificado():
+    llave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'bench')])
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    certificado = (x509.CertificateBuilder()
+                   .subject_name(nombre).issuer_name(nombre)
+                   .public_key(llave.public_key())
+                   .serial_number(x509.random_serial_number())
+                   .not_valid_before(ahora - datetime.timedelta(days=1))
+                   .not_valid_after(ahora + datetime.timedelta(days=1))
+                   .sign(llave, hashes.SHA256()))
+    return llave, certificado.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Verificaciones de ID tokens por segundo y por núcleo con core.utils.verificador_jwt "
+        "(llaves RS256 locales, sin red: mide solo el costo de CPU de la firma y los claims)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=200, help="Tokens distintos firmados para la prueba.")
+        parser.add_argument('--segundos', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        llave, pem = _llave_y_certificado()
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'certs.json')
+            with open(ruta, 'w') as f:
+                json.dump({'vence': time.time() + 3600, 'certificados': {'bench': pem}}, f)
+            # URL inalcanzable: si el verificador intentara usar la red, el benchmark fallaría
+            verificador = VerificadorFirebase(PROYECTO, url='http://127.0.0.1:9/sin-red', ruta=ruta)
+
+            ahora = int(time.time())
+            tokens = [
+                jwt.encode({
+                    'iss': f"https://securetoken.google.com/{PROYECTO}", 'aud': PROYECTO,
+                    'sub': f"uid-{i}", 'iat': ahora, 'exp': ahora + 3600,
+                }, llave, algorithm='RS256', headers={'kid': 'bench'})
+                for i in range(options['tokens'])
+            ]
+            verificador.verificar(tokens[0])
+
+            latencias = []
+            cpu0, t0 = time.process_time(), time.perf_counter()
+            while time.perf_counter() - t0 < options['segundos']:
+                for token in tokens:
+                    inicio = time.perf_counter()
+                    verificador.verificar(token)
+                    latencias.append(time.perf_counter() - inicio)
+            cpu, total = time.process_time() - cpu0, time.perf_counter() - t0
+
+        n = len(latencias)
+        self.stdout.write(f"{n} verificaciones en {total:.2f}s ({n / total:.0f}/s en un hilo)")
+        self.stdout.write(f"CPU: {cpu:.2f}s -> {n / cpu:.0f} verificaciones/s por núcleo")
+        self.stdout.write(
+            f"Latencia p50 {percentil(latencias, 50) * 1e6:.0f} µs, p99 {percentil(latencias, 99) * 1e6:.0f} µs"
+        )
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from core.utils.suscripciones import expirar_suscripciones, recalcular_vencimientos
+
+
+class Command(BaseCommand):
+    help = (
+        "Marca como 'expirado' los pagos de suscripción vencidos (una vez, o periódicamente con --continuo). "
+        "Pensado para cron o un proceso aparte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help="Pagos actualizados por transacción.")
+        parser.add_argument('--recalcular', action='store_true',
+                            help="Reconstruye kinesiologo.suscripcion_vence desde los pagos (tras editarlos a mano).")
+        parser.add_argument('--continuo', action='store_true', help="No termina: repite cada --intervalo segundos.")
+        parser.add_argument('--intervalo', type=float, default=3600.0)
+
+    def handle(self, *args, **options):
+        if options['recalcular']:
+            self.stdout.write(f"{recalcular_vencimientos()} kinesiólogos recalculados.")
+
+        while True:
+            expirados = expirar_suscripciones(tamano_lote=options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"{expirados} pagos de suscripción marcados como expirados."))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
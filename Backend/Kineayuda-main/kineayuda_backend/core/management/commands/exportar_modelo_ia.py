@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.ia.backends import crear_backend, exportar_onnx
+from core.ia.corpus_ejemplo import TEXTOS
+from core.ia.registro import nombre_modelo, revision_modelo
+from core.modulo_ia import max_length
+
+
+def _argmax(fila):
+    return max(range(len(fila)), key=fila.__getitem__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el modelo de sentimiento a ONNX y valida que los backends alternativos "
+        "(torch_int8, onnx) entreguen las mismas etiquetas que el modelo de referencia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruta', default=settings.IA_ONNX_RUTA, help="Destino del archivo .onnx.")
+        parser.add_argument('--solo-validar', action='store_true', help="No exporta; valida un .onnx existente.")
+        parser.add_argument('--corpus', help="Archivo de texto con una reseña por línea (por defecto el corpus de ejemplo).")
+        parser.add_argument('--backends', default='torch_int8,onnx')
+        parser.add_argument('--min-acuerdo', type=float, default=0.95, help="Fracción mínima de etiquetas iguales a la referencia.")
+
+    def leer_corpus(self, ruta):
+        if not ruta:
+            return list(TEXTOS)
+        with open(ruta, encoding='utf-8') as f:
+            return [linea.strip() for linea in f if linea.strip()]
+
+    def handle(self, *args, **options):
+        nombre, revision = nombre_modelo(), revision_modelo()
+        corpus = self.leer_corpus(options['corpus'])
+        referencia = crear_backend('torch', nombre, revision)
+
+        if not options['solo_validar']:
+            exportar_onnx(referencia, options['ruta'])
+            self.stdout.write(self.style.SUCCESS(f"Modelo exportado a {options['ruta']}"))
+
+        probs_ref = referencia.probabilidades(corpus, max_length())
+        etiquetas_ref = [_argmax(fila) for fila in probs_ref]
+
+        fallidos = []
+        for tipo in [b.strip() for b in options['backends'].split(',') if b.strip()]:
+            backend = crear_backend(tipo, nombre, revision, ruta_onnx=options['ruta'])
+            probs = backend.probabilidades(corpus, max_length())
+            iguales = sum(1 for fila, ref in zip(probs, etiquetas_ref) if _argmax(fila) == ref)
+            acuerdo = iguales / len(corpus)
+            max_dif = max(abs(a - b) for fila, ref in zip(probs, probs_ref) for a, b in zip(fila, ref))
+            linea = f"{tipo:<12} acuerdo={acuerdo:.1%} ({iguales}/{len(corpus)})  máx |Δp|={max_dif:.4f}"
+            if acuerdo < options['min_acuerdo']:
+                fallidos.append(tipo)
+                self.stdout.write(self.style.ERROR(linea))
+            else:
+                self.stdout.write(self.style.SUCCESS(linea))
+
+        if fallidos:
+            raise CommandError(f"Acuerdo bajo {options['min_acuerdo']:.0%} en: {', '.join(fallidos)}")
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from core.ia.cola import procesar_pendientes
+from core.models import reseña
+
+
+class Command(BaseCommand):
+    help = "Calcula el sentimiento de las reseñas pendientes (drena la cola una vez o queda escuchando con --continuo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help="Reseñas por lote (por defecto IA_LOTE_MAX).")
+        parser.add_argument('--backfill', action='store_true',
+                            help="Vuelve a encolar toda reseña sin sentimiento (incluye las que quedaron en 'error').")
+        parser.add_argument('--continuo', action='store_true', help="No termina: revisa la cola cada --intervalo segundos.")
+        parser.add_argument('--intervalo', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            encoladas = (reseña.objects.filter(sentimiento__isnull=True)
+                         .exclude(estado_sentimiento__in=['pendiente', 'procesando'])
+                         .update(estado_sentimiento='pendiente'))
+            self.stdout.write(f"{encoladas} reseñas vueltas a encolar.")
+
+        while True:
+            t0 = time.perf_counter()
+            procesadas = procesar_pendientes(tamano_lote=options['lote'])
+            if procesadas:
+                segundos = time.perf_counter() - t0
+                self.stdout.write(f"{procesadas} reseñas procesadas en {segundos:.1f}s ({procesadas / segundos:.1f}/s)")
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        pendientes = reseña.objects.filter(estado_sentimiento='pendiente').count()
+        errores = reseña.objects.filter(estado_sentimiento='error').count()
+        self.stdout.write(self.style.SUCCESS(f"Cola vacía. Pendientes: {pendientes}, con error: {errores}."))
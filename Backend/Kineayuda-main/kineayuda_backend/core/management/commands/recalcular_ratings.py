@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Avg
+from core.models import reseña
+from core.utils.calificaciones import prior, recalcular_resumenes
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el resumen de reseñas de cada kinesiólogo (conteos, sentimientos y rating bayesiano) "
+        "desde la tabla de reseñas y corrige las filas que no calzan. Necesario tras cambiar "
+        "RATING_MEDIA_PREVIA / RATING_PESO_PREVIO o editar reseñas con SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help="Kinesiólogos por transacción.")
+        parser.add_argument('--ids', type=str, default='', help="Solo estos kinesiólogos (ids separados por coma).")
+
+    def handle(self, *args, **options):
+        ids = [int(i) for i in options['ids'].split(',') if i.strip()] or None
+        media, peso = prior()
+        promedio = reseña.objects.aggregate(promedio=Avg('calificacion'))['promedio']
+        self.stdout.write(
+            f"Media previa {media} con peso {peso}; promedio actual de todas las reseñas: "
+            f"{round(promedio, 2) if promedio is not None else '-'}"
+        )
+        t0 = time.perf_counter()
+        corregidos = recalcular_resumenes(ids, tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{corregidos} kinesiólogos corregidos en {time.perf_counter() - t0:.1f}s."
+        ))
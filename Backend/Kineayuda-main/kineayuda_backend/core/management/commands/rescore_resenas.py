@@ -0,0 +1,109 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.ia.cola import CAMPOS_SENTIMIENTO, aplicar_detalle
+from core.models import reseña
+from core.utils.calificaciones import recalcular_por_resenas
+
+
+def _iniciar_worker(hilos):
+    # Cada proceso usa su parte de los núcleos para que los pools de torch no compitan
+    from core.ia.backends import configurar_hilos
+    configurar_hilos(hilos)
+
+
+def _puntuar(textos):
+    from core.modulo_ia import analizar_sentimiento_detalle_batch
+    return analizar_sentimiento_detalle_batch(textos, usar_cache=False)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula reseña.sentimiento para toda la tabla (p.ej. tras cambiar de modelo) "
+        "leyendo en streaming, infiriendo en lotes y escribiendo con bulk_update. Reanudable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=512, help="Filas leídas, inferidas y escritas por tanda.")
+        parser.add_argument('--procesos', type=int, default=1, help="Procesos de inferencia en paralelo (1 = en este proceso).")
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.rescore_resenas.checkpoint'),
+                            help="Archivo donde se guarda el último id procesado.")
+        parser.add_argument('--reanudar', action='store_true', help="Continúa desde el id guardado en --checkpoint.")
+        parser.add_argument('--desde-id', type=int, default=0, help="Procesa solo reseñas con id mayor a este.")
+
+    def leer_checkpoint(self, ruta):
+        try:
+            with open(ruta) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def guardar_checkpoint(self, ruta, ultimo_id):
+        tmp = f"{ruta}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(str(ultimo_id))
+        os.replace(tmp, ruta)
+
+    def tandas(self, desde_id, chunk):
+        # iterator() usa un cursor del lado del servidor: la memoria no depende del tamaño de la tabla
+        filas = (reseña.objects.filter(id__gt=desde_id).order_by('id')
+                 .values_list('id', 'comentario').iterator(chunk_size=chunk))
+        tanda = []
+        for fila in filas:
+            tanda.append(fila)
+            if len(tanda) >= chunk:
+                yield tanda
+                tanda = []
+        if tanda:
+            yield tanda
+
+    def escribir(self, tanda, detalles):
+        objetos = [aplicar_detalle(reseña(id=id_), detalle) for (id_, _), detalle in zip(tanda, detalles)]
+        with transaction.atomic():
+            reseña.objects.bulk_update(objetos, CAMPOS_SENTIMIENTO)
+            recalcular_por_resenas([r.id for r in objetos])
+
+    def handle(self, *args, **options):
+        chunk = options['chunk']
+        procesos = max(1, options['procesos'])
+        ruta = options['checkpoint']
+        desde_id = max(options['desde_id'], self.leer_checkpoint(ruta) if options['reanudar'] else 0)
+        if desde_id:
+            self.stdout.write(f"Reanudando desde la reseña id>{desde_id}")
+
+        total = 0
+        t0 = time.perf_counter()
+
+        def registrar(tanda, detalles):
+            nonlocal total
+            self.escribir(tanda, detalles)
+            self.guardar_checkpoint(ruta, tanda[-1][0])
+            total += len(tanda)
+            segundos = time.perf_counter() - t0
+            self.stdout.write(f"{total} reseñas (id≤{tanda[-1][0]}) - {total / segundos:.1f} filas/s")
+
+        if procesos == 1:
+            for tanda in self.tandas(desde_id, chunk):
+                registrar(tanda, _puntuar([texto for _, texto in tanda]))
+        else:
+            hilos = max(1, (os.cpu_count() or procesos) // procesos)
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker, initargs=(hilos,)) as pool:
+                # Se mantienen a lo más 2 tandas por proceso en vuelo (memoria acotada) y se
+                # escriben en orden de id para que el checkpoint sea siempre monotónico.
+                en_vuelo = deque()
+                for tanda in self.tandas(desde_id, chunk):
+                    en_vuelo.append((tanda, pool.submit(_puntuar, [texto for _, texto in tanda])))
+                    if len(en_vuelo) >= procesos * 2:
+                        tanda_lista, futuro = en_vuelo.popleft()
+                        registrar(tanda_lista, futuro.result())
+                while en_vuelo:
+                    tanda_lista, futuro = en_vuelo.popleft()
+                    registrar(tanda_lista, futuro.result())
+
+        segundos = time.perf_counter() - t0
+        velocidad = total / segundos if segundos else 0
+        self.stdout.write(self.style.SUCCESS(f"Listo: {total} reseñas en {segundos:.1f}s ({velocidad:.1f} filas/s)"))
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.ia.lotes import AgrupadorLotes
+from core.ia.registro import identificador_modelo, precargar_modelo
+from core.ia.servicio import ServidorIA
+from core.modulo_ia import _inferir_lote, warmup
+
+
+class Command(BaseCommand):
+    help = "Levanta el servicio local de inferencia de sentimiento en un socket Unix (ver core/ia/servicio.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.IA_SERVICIO_SOCKET or '/tmp/kineayuda-ia.sock')
+        parser.add_argument('--lote-max', type=int, default=settings.IA_LOTE_MAX)
+        parser.add_argument('--espera-ms', type=float, default=settings.IA_LOTE_ESPERA_MS or 5)
+        parser.add_argument('--hilos', type=int, default=None, help="Hilos intra-op de torch (por defecto IA_TORCH_HILOS).")
+
+    def handle(self, *args, **options):
+        if options['hilos']:
+            from core.ia.backends import configurar_hilos
+            configurar_hilos(options['hilos'])
+
+        precargar_modelo()
+        self.stdout.write(f"Warm-up en {warmup():.1f}s")
+
+        agrupador = AgrupadorLotes(_inferir_lote, max_lote=options['lote_max'], espera_ms=options['espera_ms'])
+        servidor = ServidorIA(options['socket'], agrupador, identificador_modelo())
+        try:
+            servidor.servir(listo=lambda: self.stdout.write(
+                self.style.SUCCESS(f"Servicio IA ({identificador_modelo()}) escuchando en {options['socket']}")
+            ))
+        except KeyboardInterrupt:
+            self.stdout.write("Servicio IA detenido.")
@@ -0,0 +1,98 @@
+import datetime
+import random
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from core.models import agenda, cita, kinesiologo, paciente, reseña
+from core.utils.bench import revertir
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga un set de datos fijo (semilla 7) y revisa con EXPLAIN ANALYZE que las consultas más "
+        "frecuentes de agenda, citas y reseñas usen su índice. Falla si alguna no lo usa. Los datos "
+        "se revierten al final. Solo PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kinesiologos', type=int, default=300)
+        parser.add_argument('--horarios', type=int, default=300, help="Horarios por kinesiólogo (un año hacia atrás y uno hacia adelante).")
+        parser.add_argument('--citas', type=int, default=100, help="Citas por kinesiólogo.")
+        parser.add_argument('--pacientes', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("verificar_indices necesita PostgreSQL.")
+        with revertir():
+            fallas = self.correr(options)
+        if fallas:
+            raise CommandError(f"Sin su índice: {', '.join(fallas)}")
+
+    def poblar(self, n_kines, n_horarios, n_citas, n_pacientes):
+        azar = random.Random(7)
+        ahora = timezone.now()
+        kines = kinesiologo.objects.bulk_create([
+            kinesiologo(nombre='Kine', apellido=f'Indices {i}', email=f'idx{i}@example.com', rut=f'idx-{i}',
+                        nro_titulo=str(i), doc_verificacion='', especialidad='deportiva', estado_verificacion='aprobado')
+            for i in range(n_kines)
+        ])
+        pacientes = paciente.objects.bulk_create([
+            paciente(nombre='Paciente', apellido=str(i), rut=f'idx-{i}', email=f'idx-p{i}@example.com',
+                     telefono='1', fecha_nacimiento=datetime.date(1990, 1, 1))
+            for i in range(n_pacientes)
+        ])
+        paso = datetime.timedelta(days=730) / n_horarios
+        horarios = []
+        for kx in kines:
+            for i in range(n_horarios):
+                inicio = ahora - datetime.timedelta(days=365) + i * paso
+                estado = azar.choices(['disponible', 'reservado', 'no_disponible', 'expirado'], [70, 20, 5, 5])[0]
+                horarios.append(agenda(kinesiologo=kx, inicio=inicio, fin=inicio + datetime.timedelta(minutes=45), estado=estado))
+        agenda.objects.bulk_create(horarios, batch_size=5000)
+        citas = cita.objects.bulk_create([
+            cita(paciente=azar.choice(pacientes), kinesiologo=kx, estado='completada',
+                 fecha_hora=ahora - datetime.timedelta(days=azar.uniform(0, 730)))
+            for kx in kines for _ in range(n_citas)
+        ], batch_size=5000)
+        reseña.objects.bulk_create([
+            reseña(cita=c, comentario='ok', calificacion=azar.randint(1, 5), estado_sentimiento='procesado')
+            for c in citas if azar.random() < 0.6
+        ], batch_size=5000)
+        with connection.cursor() as cursor:
+            # fecha_creacion es auto_now_add: repartirla en dos años para que el filtro por fecha sea realista
+            cursor.execute("UPDATE core_reseña SET fecha_creacion = now() - random() * interval '730 days'")
+            for tabla in ('core_kinesiologo', 'core_paciente', 'core_agenda', 'core_cita', 'core_reseña'):
+                cursor.execute(f'ANALYZE "{tabla}"')
+        self.stdout.write(f"{n_kines} kinesiólogos, {len(horarios)} horarios, {len(citas)} citas\n")
+        return azar.choice(kines), azar.choice(pacientes), ahora
+
+    def correr(self, options):
+        kx, pac, ahora = self.poblar(options['kinesiologos'], options['horarios'], options['citas'], options['pacientes'])
+        slot = agenda.objects.filter(kinesiologo=kx).order_by('inicio').values_list('inicio', flat=True)[10]
+        consultas = [
+            # (nombre, queryset tal como lo arma la vista, índice que debe usar)
+            ("horas disponibles", agenda.objects.filter(kinesiologo_id=kx.id, estado='disponible', inicio__gte=ahora,
+                                                        inicio__lt=ahora + datetime.timedelta(days=60))
+             .order_by('inicio').values_list('id', 'inicio', 'fin'), 'agenda_disponible_idx'),
+            ("horario del retorno Webpay", agenda.objects.filter(kinesiologo=kx, inicio=slot), 'agenda_kine_inicio_idx'),
+            ("citas por RUT", cita.objects.filter(paciente=pac).order_by('-fecha_hora'), 'cita_paciente_fecha_idx'),
+            ("reseñas del kinesiólogo", reseña.objects.filter(cita__kinesiologo_id=kx.id), 'resena_cita_fecha_idx'),
+            ("reseñas últimos 12 meses", reseña.objects.filter(
+                cita__kinesiologo_id=kx.id, fecha_creacion__gte=ahora - datetime.timedelta(days=365)), 'resena_cita_fecha_idx'),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW random_page_cost')
+            self.stdout.write(f"random_page_cost = {cursor.fetchone()[0]}")
+        fallas = []
+        self.stdout.write(f"{'consulta':<30}{'tiempo':>10}  índices usados")
+        for nombre, qset, esperado in consultas:
+            plan = qset.explain(analyze=True)
+            indices = sorted(set(re.findall(r'Index (?:Only )?Scan (?:Backward )?(?:using|on) (\w+)', plan)))
+            tiempo = re.search(r'Execution Time: ([\d.]+) ms', plan)
+            ok = esperado in indices
+            if not ok:
+                fallas.append(nombre)
+            linea = f"{nombre:<30}{tiempo.group(1) if tiempo else '-':>8}ms  {', '.join(indices) or 'Seq Scan'}"
+            self.stdout.write(self.style.SUCCESS(linea) if ok else self.style.ERROR(f"{linea}  (esperado {esperado})"))
+        return fallas
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def marcar_procesadas(apps, schema_editor):
+    # Las reseñas que ya tienen sentimiento se calcularon de forma síncrona al crearlas
+    Reseña = apps.get_model('core', 'reseña')
+    Reseña.objects.filter(sentimiento__isnull=False).update(estado_sentimiento='procesado')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_reseña_calificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reseña',
+            name='estado_sentimiento',
+            field=models.CharField(choices=[('pendiente', 'pendiente'), ('procesado', 'procesado'), ('error', 'error')], db_index=True, default='pendiente', help_text='El sentimiento se calcula en segundo plano después de guardar la reseña', max_length=10),
+        ),
+        migrations.RunPython(marcar_procesadas, migrations.RunPython.noop),
+    ]
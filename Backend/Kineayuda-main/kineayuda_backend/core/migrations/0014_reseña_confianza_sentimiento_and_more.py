@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_reseña_estado_sentimiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reseña',
+            name='confianza_sentimiento',
+            field=models.FloatField(blank=True, help_text='Probabilidad de la clase ganadora', null=True),
+        ),
+        migrations.AddField(
+            model_name='reseña',
+            name='modelo_sentimiento',
+            field=models.CharField(blank=True, help_text='Modelo@revisión/backend que calculó el sentimiento', max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='reseña',
+            name='probabilidades_sentimiento',
+            field=models.JSONField(blank=True, help_text='Probabilidad por clase', null=True),
+        ),
+    ]
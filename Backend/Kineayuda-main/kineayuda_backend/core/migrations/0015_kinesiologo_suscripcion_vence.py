@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def calcular_vencimientos(apps, schema_editor):
+    # Vencimiento del último pago aprobado de cada kinesiologo (lo que antes se consultaba en cada request)
+    Kinesiologo = apps.get_model('core', 'kinesiologo')
+    PagoSuscripcion = apps.get_model('core', 'pagoSuscripcion')
+    ultimo = (PagoSuscripcion.objects
+              .filter(kinesiologo=OuterRef('pk'), estado='pagado')
+              .values('kinesiologo')
+              .annotate(vence=Max('fecha_expiracion'))
+              .values('vence'))
+    Kinesiologo.objects.update(suscripcion_vence=Subquery(ultimo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_reseña_confianza_sentimiento_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='suscripcion_vence',
+            field=models.DateTimeField(blank=True, help_text='Vencimiento del último pago de suscripción aprobado (se actualiza en webpay_retorno)', null=True),
+        ),
+        migrations.RunPython(calcular_vencimientos, migrations.RunPython.noop),
+    ]
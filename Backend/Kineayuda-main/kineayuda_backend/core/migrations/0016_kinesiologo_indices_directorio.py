@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_kinesiologo_suscripcion_vence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=models.Index(fields=['estado_verificacion', 'apellido', 'id'], name='core_kinesi_estado__374750_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=models.Index(fields=['estado_verificacion', 'precio_consulta', 'id'], name='core_kinesi_estado__4860bb_idx'),
+        ),
+    ]
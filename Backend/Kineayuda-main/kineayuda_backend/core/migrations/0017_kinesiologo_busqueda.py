@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations, models
+
+# Configuración de texto 'es_unaccent': la de español, pero sin tildes (unaccent antes del stemmer)
+CONFIGURACION_SQL = """
+CREATE TEXT SEARCH CONFIGURATION public.es_unaccent (COPY = pg_catalog.spanish);
+ALTER TEXT SEARCH CONFIGURATION public.es_unaccent
+    ALTER MAPPING FOR hword, hword_part, word WITH public.unaccent, spanish_stem;
+"""
+
+# El trigger mantiene las columnas de búsqueda en todo INSERT/UPDATE, también en bulk_create y .update()
+TRIGGER_SQL = """
+CREATE FUNCTION core_kinesiologo_busqueda() RETURNS trigger AS $$
+BEGIN
+    NEW.busqueda :=
+        setweight(to_tsvector('public.es_unaccent', concat_ws(' ', NEW.nombre, NEW.apellido)), 'A') ||
+        setweight(to_tsvector('public.es_unaccent', coalesce(NEW.especialidad, '')), 'B') ||
+        setweight(to_tsvector('public.es_unaccent', concat_ws(' ', NEW.comuna, NEW.region)), 'C');
+    NEW.busqueda_texto := lower(public.unaccent('public.unaccent',
+        concat_ws(' ', NEW.nombre, NEW.apellido, NEW.especialidad, NEW.comuna, NEW.region)));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_kinesiologo_busqueda_trg
+    BEFORE INSERT OR UPDATE ON core_kinesiologo
+    FOR EACH ROW EXECUTE FUNCTION core_kinesiologo_busqueda();
+
+UPDATE core_kinesiologo SET id = id;
+"""
+
+TRIGGER_REVERSA_SQL = """
+DROP TRIGGER IF EXISTS core_kinesiologo_busqueda_trg ON core_kinesiologo;
+DROP FUNCTION IF EXISTS core_kinesiologo_busqueda();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_kinesiologo_indices_directorio'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunSQL(CONFIGURACION_SQL, 'DROP TEXT SEARCH CONFIGURATION IF EXISTS public.es_unaccent;'),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='busqueda_texto',
+            field=models.TextField(blank=True, editable=False, help_text='nombre, apellido, especialidad, comuna y región sin tildes y en minúsculas (trigramas)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='kine_busqueda_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda_texto'], name='kine_busqueda_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(TRIGGER_SQL, TRIGGER_REVERSA_SQL),
+    ]
@@ -0,0 +1,192 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:17
+
+import django.db.models.deletion
+import re
+import unicodedata
+from django.db import migrations, models
+
+# Regiones de norte a sur: (código, nombre, comunas). Misma lista que Frontend/.../regionesYComunas.ts
+REGIONES = [
+    ('XV', 'Arica y Parinacota', [
+        'Arica', 'Camarones', 'Putre', 'General Lagos',
+    ]),
+    ('I', 'Tarapacá', [
+        'Iquique', 'Alto Hospicio', 'Pozo Almonte', 'Camiña', 'Colchane', 'Huara', 'Pica',
+    ]),
+    ('II', 'Antofagasta', [
+        'Antofagasta', 'Mejillones', 'Sierra Gorda', 'Taltal', 'Calama', 'Ollagüe', 'San Pedro de Atacama',
+        'Tocopilla', 'María Elena',
+    ]),
+    ('III', 'Atacama', [
+        'Copiapó', 'Caldera', 'Tierra Amarilla', 'Chañaral', 'Diego de Almagro', 'Vallenar',
+        'Alto del Carmen', 'Freirina', 'Huasco',
+    ]),
+    ('IV', 'Coquimbo', [
+        'La Serena', 'Coquimbo', 'Andacollo', 'La Higuera', 'Paiguano', 'Vicuña', 'Illapel', 'Canela',
+        'Los Vilos', 'Salamanca', 'Ovalle', 'Combarbalá', 'Monte Patria', 'Punitaqui', 'Río Hurtado',
+    ]),
+    ('V', 'Valparaíso', [
+        'Valparaíso', 'Casablanca', 'Concón', 'Juan Fernández', 'Puchuncaví', 'Quintero', 'Viña del Mar',
+        'Isla de Pascua', 'Los Andes', 'Calle Larga', 'Rinconada', 'San Esteban', 'La Ligua', 'Cabildo',
+        'Papudo', 'Petorca', 'Zapallar', 'Quillota', 'Calera', 'Hijuelas', 'La Cruz', 'Nogales',
+        'San Antonio', 'Algarrobo', 'Cartagena', 'El Quisco', 'El Tabo', 'Santo Domingo', 'San Felipe',
+        'Catemu', 'Llaillay', 'Panquehue', 'Putaendo', 'Santa María', 'Quilpué', 'Limache', 'Olmué',
+        'Villa Alemana',
+    ]),
+    ('RM', 'Metropolitana de Santiago', [
+        'Cerrillos', 'Cerro Navia', 'Conchalí', 'El Bosque', 'Estación Central', 'Huechuraba',
+        'Independencia', 'La Cisterna', 'La Florida', 'La Granja', 'La Pintana', 'La Reina', 'Las Condes',
+        'Lo Barnechea', 'Lo Espejo', 'Lo Prado', 'Macul', 'Maipú', 'Ñuñoa', 'Pedro Aguirre Cerda',
+        'Peñalolén', 'Providencia', 'Pudahuel', 'Quilicura', 'Quinta Normal', 'Recoleta', 'Renca',
+        'San Joaquín', 'San Miguel', 'San Ramón', 'Santiago', 'Vitacura', 'Puente Alto', 'Pirque',
+        'San José de Maipo', 'Colina', 'Lampa', 'Tiltil', 'San Bernardo', 'Buin', 'Calera de Tango', 'Paine',
+        'Melipilla', 'Alhué', 'Curacaví', 'María Pinto', 'San Pedro', 'Talagante', 'El Monte',
+        'Isla de Maipo', 'Padre Hurtado', 'Peñaflor',
+    ]),
+    ('VI', "Libertador General Bernardo O'Higgins", [
+        'Rancagua', 'Codegua', 'Coinco', 'Coltauco', 'Doñihue', 'Graneros', 'Las Cabras', 'Machalí', 'Malloa',
+        'Mostazal', 'Olivar', 'Peumo', 'Pichidegua', 'Quinta de Tilcoco', 'Rengo', 'Requínoa', 'San Vicente',
+        'Pichilemu', 'La Estrella', 'Litueche', 'Marchihue', 'Navidad', 'Paredones', 'San Fernando',
+        'Chépica', 'Chimbarongo', 'Lolol', 'Nancagua', 'Palmilla', 'Peralillo', 'Placilla', 'Pumanque',
+        'Santa Cruz',
+    ]),
+    ('VII', 'Maule', [
+        'Talca', 'Constitución', 'Curepto', 'Empedrado', 'Maule', 'Pelarco', 'Pencahue', 'Río Claro',
+        'San Clemente', 'San Rafael', 'Cauquenes', 'Chanco', 'Pelluhue', 'Curicó', 'Hualañé', 'Licantén',
+        'Molina', 'Rauco', 'Romeral', 'Sagrada Familia', 'Teno', 'Vichuquén', 'Linares', 'Colbún', 'Longaví',
+        'Parral', 'Retiro', 'San Javier', 'Villa Alegre', 'Yerbas Buenas',
+    ]),
+    ('XVI', 'Ñuble', [
+        'Chillán', 'Bulnes', 'Cobquecura', 'Coelemu', 'Coihueco', 'Chillán Viejo', 'El Carmen', 'Ninhue',
+        'Ñiquén', 'Pemuco', 'Pinto', 'Portezuelo', 'Quillón', 'Quirihue', 'Ránquil', 'San Carlos',
+        'San Fabián', 'San Ignacio', 'San Nicolás', 'Treguaco', 'Yungay',
+    ]),
+    ('VIII', 'Biobío', [
+        'Concepción', 'Coronel', 'Chiguayante', 'Florida', 'Hualqui', 'Lota', 'Penco', 'San Pedro de la Paz',
+        'Santa Juana', 'Talcahuano', 'Tomé', 'Hualpén', 'Lebu', 'Arauco', 'Cañete', 'Contulmo', 'Curanilahue',
+        'Los Álamos', 'Tirúa', 'Los Ángeles', 'Antuco', 'Cabrero', 'Laja', 'Mulchén', 'Nacimiento', 'Negrete',
+        'Quilaco', 'Quilleco', 'San Rosendo', 'Santa Bárbara', 'Tucapel', 'Yumbel', 'Alto Biobío',
+    ]),
+    ('IX', 'La Araucanía', [
+        'Temuco', 'Carahue', 'Cunco', 'Curarrehue', 'Freire', 'Galvarino', 'Gorbea', 'Lautaro', 'Loncoche',
+        'Melipeuco', 'Nueva Imperial', 'Padre Las Casas', 'Perquenco', 'Pitrufquén', 'Pucón', 'Saavedra',
+        'Teodoro Schmidt', 'Toltén', 'Vilcún', 'Villarrica', 'Cholchol', 'Angol', 'Collipulli', 'Curacautín',
+        'Ercilla', 'Lonquimay', 'Los Sauces', 'Lumaco', 'Purén', 'Renaico', 'Traiguén', 'Victoria',
+    ]),
+    ('XIV', 'Los Ríos', [
+        'Valdivia', 'Corral', 'Lanco', 'Los Lagos', 'Máfil', 'Mariquina', 'Paillaco', 'Panguipulli',
+        'La Unión', 'Futrono', 'Lago Ranco', 'Río Bueno',
+    ]),
+    ('X', 'Los Lagos', [
+        'Puerto Montt', 'Calbuco', 'Cochamó', 'Fresia', 'Frutillar', 'Los Muermos', 'Llanquihue', 'Maullín',
+        'Puerto Varas', 'Castro', 'Ancud', 'Chonchi', 'Curaco de Vélez', 'Dalcahue', 'Puqueldón', 'Queilén',
+        'Quellón', 'Quemchi', 'Quinchao', 'Osorno', 'Puerto Octay', 'Purranque', 'Puyehue', 'Río Negro',
+        'San Juan de la Costa', 'San Pablo', 'Chaitén', 'Futaleufú', 'Hualaihué', 'Palena',
+    ]),
+    ('XI', 'Aysén del General Carlos Ibáñez del Campo', [
+        'Coyhaique', 'Lago Verde', 'Aysén', 'Cisnes', 'Guaitecas', 'Cochrane', "O'Higgins", 'Tortel',
+        'Chile Chico', 'Río Ibáñez',
+    ]),
+    ('XII', 'Magallanes y de la Antártica Chilena', [
+        'Punta Arenas', 'Laguna Blanca', 'Río Verde', 'San Gregorio', 'Cabo de Hornos (Ex Navarino)',
+        'Antártica', 'Porvenir', 'Primavera', 'Timaukel', 'Natales', 'Torres del Paine',
+    ]),
+]
+
+
+def _clave(texto):
+    descompuesto = unicodedata.normalize('NFKD', (texto or '').lower())
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    sin_tildes = re.sub(r'^\s*region\s+(de\s+la\s+|del\s+|de\s+)?', '', sin_tildes)
+    return re.sub(r'[^a-z0-9]', '', sin_tildes)
+
+
+def cargar_catalogo(apps, schema_editor):
+    regionChile = apps.get_model('core', 'regionChile')
+    comunaChile = apps.get_model('core', 'comunaChile')
+    for orden, (codigo, nombre, comunas) in enumerate(REGIONES, start=1):
+        region = regionChile.objects.create(codigo=codigo, nombre=nombre, orden=orden)
+        comunaChile.objects.bulk_create([comunaChile(nombre=c, region=region) for c in comunas])
+
+
+def vincular_kinesiologos(apps, schema_editor):
+    """Enlaza los textos ya guardados con el catálogo; los que no calzan quedan sin FK."""
+    kinesiologo = apps.get_model('core', 'kinesiologo')
+    regionChile = apps.get_model('core', 'regionChile')
+    comunaChile = apps.get_model('core', 'comunaChile')
+    regiones = {_clave(r.nombre): r for r in regionChile.objects.all()}
+    regiones.update({_clave(r.codigo): r for r in regiones.values()})
+    regiones['metropolitana'] = regiones['rm']
+    comunas = {_clave(c.nombre): c for c in comunaChile.objects.all()}
+    for kx in kinesiologo.objects.exclude(comuna__isnull=True, region__isnull=True).iterator():
+        comuna = comunas.get(_clave(kx.comuna))
+        region = regiones.get(_clave(kx.region))
+        if comuna is not None and (region is None or region.id == comuna.region_id):
+            kx.comuna_ref, kx.region_ref = comuna, comuna.region
+            kx.comuna, kx.region = comuna.nombre, comuna.region.nombre
+        elif region is not None:
+            kx.region_ref, kx.region = region, region.nombre
+        else:
+            continue
+        kx.save(update_fields=['comuna', 'region', 'comuna_ref', 'region_ref'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_kinesiologo_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='comunaChile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='regionChile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=5, unique=True)),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('orden', models.PositiveSmallIntegerField(help_text='De norte a sur')),
+            ],
+            options={
+                'ordering': ['orden'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='kinesiologo',
+            name='core_kinesi_comuna_e102b7_idx',
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='comuna_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='kinesiologos', to='core.comunachile'),
+        ),
+        migrations.AddField(
+            model_name='comunachile',
+            name='region',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='comunas', to='core.regionchile'),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='region_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='kinesiologos', to='core.regionchile'),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=models.Index(fields=['comuna_ref', 'estado_verificacion'], name='core_kinesi_comuna__4f380b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=models.Index(fields=['region_ref', 'estado_verificacion'], name='core_kinesi_region__5c211d_idx'),
+        ),
+        migrations.RunPython(cargar_catalogo, migrations.RunPython.noop),
+        migrations.RunPython(vincular_kinesiologos, migrations.RunPython.noop),
+    ]
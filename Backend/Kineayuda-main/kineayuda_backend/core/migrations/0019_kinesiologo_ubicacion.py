@@ -0,0 +1,188 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:21
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Centroides aproximados de cada comuna (latitud, longitud), con dos decimales (~1 km)
+CENTROIDES = {
+    # Arica y Parinacota
+    'Arica': (-18.48, -70.31), 'Camarones': (-19.02, -69.86), 'Putre': (-18.20, -69.56), 'General Lagos': (-17.65, -69.63),
+    # Tarapacá
+    'Iquique': (-20.22, -70.14), 'Alto Hospicio': (-20.27, -70.10), 'Pozo Almonte': (-20.26, -69.79),
+    'Camiña': (-19.31, -69.43), 'Colchane': (-19.28, -68.64), 'Huara': (-19.99, -69.77), 'Pica': (-20.49, -69.33),
+    # Antofagasta
+    'Antofagasta': (-23.65, -70.40), 'Mejillones': (-23.10, -70.45), 'Sierra Gorda': (-22.89, -69.32),
+    'Taltal': (-25.41, -70.49), 'Calama': (-22.46, -68.93), 'Ollagüe': (-21.22, -68.25),
+    'San Pedro de Atacama': (-22.91, -68.20), 'Tocopilla': (-22.09, -70.20), 'María Elena': (-22.35, -69.67),
+    # Atacama
+    'Copiapó': (-27.37, -70.33), 'Caldera': (-27.07, -70.82), 'Tierra Amarilla': (-27.48, -70.27),
+    'Chañaral': (-26.35, -70.62), 'Diego de Almagro': (-26.37, -70.05), 'Vallenar': (-28.58, -70.76),
+    'Alto del Carmen': (-28.75, -70.49), 'Freirina': (-28.51, -71.08), 'Huasco': (-28.47, -71.22),
+    # Coquimbo
+    'La Serena': (-29.91, -71.25), 'Coquimbo': (-29.95, -71.34), 'Andacollo': (-30.23, -71.08),
+    'La Higuera': (-29.50, -71.26), 'Paiguano': (-30.02, -70.52), 'Vicuña': (-30.03, -70.71), 'Illapel': (-31.63, -71.17),
+    'Canela': (-31.40, -71.46), 'Los Vilos': (-31.91, -71.51), 'Salamanca': (-31.78, -70.96), 'Ovalle': (-30.60, -71.20),
+    'Combarbalá': (-31.18, -71.00), 'Monte Patria': (-30.69, -70.96), 'Punitaqui': (-30.83, -71.26),
+    'Río Hurtado': (-30.28, -70.70),
+    # Valparaíso
+    'Valparaíso': (-33.05, -71.62), 'Casablanca': (-33.32, -71.41), 'Concón': (-32.92, -71.52),
+    'Juan Fernández': (-33.64, -78.83), 'Puchuncaví': (-32.72, -71.41), 'Quintero': (-32.78, -71.53),
+    'Viña del Mar': (-33.02, -71.55), 'Isla de Pascua': (-27.12, -109.35), 'Los Andes': (-32.83, -70.60),
+    'Calle Larga': (-32.86, -70.63), 'Rinconada': (-32.84, -70.71), 'San Esteban': (-32.80, -70.58),
+    'La Ligua': (-32.45, -71.23), 'Cabildo': (-32.43, -71.07), 'Papudo': (-32.51, -71.45), 'Petorca': (-32.25, -70.93),
+    'Zapallar': (-32.55, -71.46), 'Quillota': (-32.88, -71.25), 'Calera': (-32.79, -71.19), 'Hijuelas': (-32.80, -71.14),
+    'La Cruz': (-32.83, -71.23), 'Nogales': (-32.72, -71.20), 'San Antonio': (-33.59, -71.61),
+    'Algarrobo': (-33.36, -71.67), 'Cartagena': (-33.55, -71.61), 'El Quisco': (-33.40, -71.70),
+    'El Tabo': (-33.46, -71.67), 'Santo Domingo': (-33.64, -71.63), 'San Felipe': (-32.75, -70.72),
+    'Catemu': (-32.78, -70.96), 'Llaillay': (-32.84, -70.96), 'Panquehue': (-32.81, -70.84), 'Putaendo': (-32.63, -70.72),
+    'Santa María': (-32.75, -70.66), 'Quilpué': (-33.05, -71.44), 'Limache': (-33.00, -71.27), 'Olmué': (-33.00, -71.19),
+    'Villa Alemana': (-33.04, -71.37),
+    # Metropolitana de Santiago
+    'Cerrillos': (-33.50, -70.71), 'Cerro Navia': (-33.42, -70.74), 'Conchalí': (-33.38, -70.67),
+    'El Bosque': (-33.56, -70.67), 'Estación Central': (-33.46, -70.70), 'Huechuraba': (-33.37, -70.64),
+    'Independencia': (-33.42, -70.66), 'La Cisterna': (-33.53, -70.66), 'La Florida': (-33.52, -70.59),
+    'La Granja': (-33.54, -70.62), 'La Pintana': (-33.58, -70.63), 'La Reina': (-33.45, -70.54),
+    'Las Condes': (-33.41, -70.57), 'Lo Barnechea': (-33.35, -70.52), 'Lo Espejo': (-33.52, -70.69),
+    'Lo Prado': (-33.44, -70.72), 'Macul': (-33.49, -70.60), 'Maipú': (-33.51, -70.76), 'Ñuñoa': (-33.45, -70.60),
+    'Pedro Aguirre Cerda': (-33.49, -70.67), 'Peñalolén': (-33.48, -70.55), 'Providencia': (-33.43, -70.61),
+    'Pudahuel': (-33.44, -70.76), 'Quilicura': (-33.36, -70.73), 'Quinta Normal': (-33.43, -70.70),
+    'Recoleta': (-33.41, -70.64), 'Renca': (-33.40, -70.73), 'San Joaquín': (-33.50, -70.63),
+    'San Miguel': (-33.50, -70.65), 'San Ramón': (-33.54, -70.64), 'Santiago': (-33.45, -70.66),
+    'Vitacura': (-33.39, -70.57), 'Puente Alto': (-33.61, -70.58), 'Pirque': (-33.67, -70.57),
+    'San José de Maipo': (-33.64, -70.35), 'Colina': (-33.20, -70.67), 'Lampa': (-33.28, -70.88),
+    'Tiltil': (-33.08, -70.93), 'San Bernardo': (-33.59, -70.70), 'Buin': (-33.73, -70.74),
+    'Calera de Tango': (-33.63, -70.78), 'Paine': (-33.81, -70.74), 'Melipilla': (-33.69, -71.21),
+    'Alhué': (-34.03, -71.10), 'Curacaví': (-33.40, -71.13), 'María Pinto': (-33.52, -71.12),
+    'San Pedro': (-33.90, -71.46), 'Talagante': (-33.66, -70.93), 'El Monte': (-33.68, -71.00),
+    'Isla de Maipo': (-33.75, -70.90), 'Padre Hurtado': (-33.57, -70.81), 'Peñaflor': (-33.61, -70.88),
+    # Libertador General Bernardo O'Higgins
+    'Rancagua': (-34.17, -70.74), 'Codegua': (-34.04, -70.67), 'Coinco': (-34.27, -70.96), 'Coltauco': (-34.29, -71.08),
+    'Doñihue': (-34.23, -70.97), 'Graneros': (-34.07, -70.73), 'Las Cabras': (-34.29, -71.31), 'Machalí': (-34.18, -70.65),
+    'Malloa': (-34.45, -70.95), 'Mostazal': (-33.98, -70.71), 'Olivar': (-34.21, -70.82), 'Peumo': (-34.40, -71.17),
+    'Pichidegua': (-34.36, -71.28), 'Quinta de Tilcoco': (-34.35, -70.96), 'Rengo': (-34.41, -70.86),
+    'Requínoa': (-34.29, -70.82), 'San Vicente': (-34.44, -71.08), 'Pichilemu': (-34.39, -72.00),
+    'La Estrella': (-34.20, -71.66), 'Litueche': (-34.11, -71.72), 'Marchihue': (-34.40, -71.61),
+    'Navidad': (-33.96, -71.83), 'Paredones': (-34.65, -71.90), 'San Fernando': (-34.59, -70.99),
+    'Chépica': (-34.73, -71.27), 'Chimbarongo': (-34.71, -71.04), 'Lolol': (-34.73, -71.64), 'Nancagua': (-34.66, -71.17),
+    'Palmilla': (-34.60, -71.36), 'Peralillo': (-34.48, -71.48), 'Placilla': (-34.61, -71.12), 'Pumanque': (-34.61, -71.66),
+    'Santa Cruz': (-34.64, -71.37),
+    # Maule
+    'Talca': (-35.43, -71.66), 'Constitución': (-35.33, -72.41), 'Curepto': (-35.09, -72.02), 'Empedrado': (-35.60, -72.28),
+    'Maule': (-35.53, -71.70), 'Pelarco': (-35.37, -71.33), 'Pencahue': (-35.40, -71.83), 'Río Claro': (-35.28, -71.27),
+    'San Clemente': (-35.54, -71.49), 'San Rafael': (-35.29, -71.53), 'Cauquenes': (-35.97, -72.32),
+    'Chanco': (-35.73, -72.53), 'Pelluhue': (-35.82, -72.57), 'Curicó': (-34.98, -71.24), 'Hualañé': (-34.98, -71.81),
+    'Licantén': (-34.98, -72.00), 'Molina': (-35.11, -71.28), 'Rauco': (-34.93, -71.31), 'Romeral': (-34.96, -71.12),
+    'Sagrada Familia': (-35.00, -71.38), 'Teno': (-34.87, -71.16), 'Vichuquén': (-34.86, -72.01), 'Linares': (-35.85, -71.59),
+    'Colbún': (-35.70, -71.41), 'Longaví': (-35.97, -71.68), 'Parral': (-36.14, -71.83), 'Retiro': (-36.05, -71.76),
+    'San Javier': (-35.59, -71.73), 'Villa Alegre': (-35.69, -71.67), 'Yerbas Buenas': (-35.75, -71.58),
+    # Ñuble
+    'Chillán': (-36.61, -72.10), 'Bulnes': (-36.74, -72.30), 'Cobquecura': (-36.13, -72.79), 'Coelemu': (-36.49, -72.70),
+    'Coihueco': (-36.62, -71.83), 'Chillán Viejo': (-36.62, -72.13), 'El Carmen': (-36.90, -72.02), 'Ninhue': (-36.40, -72.40),
+    'Ñiquén': (-36.30, -71.90), 'Pemuco': (-36.98, -72.10), 'Pinto': (-36.70, -71.89), 'Portezuelo': (-36.53, -72.43),
+    'Quillón': (-36.74, -72.47), 'Quirihue': (-36.28, -72.54), 'Ránquil': (-36.65, -72.61), 'San Carlos': (-36.42, -71.96),
+    'San Fabián': (-36.55, -71.55), 'San Ignacio': (-36.80, -71.99), 'San Nicolás': (-36.50, -72.21),
+    'Treguaco': (-36.43, -72.67), 'Yungay': (-37.12, -72.02),
+    # Biobío
+    'Concepción': (-36.83, -73.05), 'Coronel': (-37.03, -73.16), 'Chiguayante': (-36.93, -73.02), 'Florida': (-36.82, -72.66),
+    'Hualqui': (-37.00, -72.94), 'Lota': (-37.09, -73.16), 'Penco': (-36.74, -72.99), 'San Pedro de la Paz': (-36.84, -73.11),
+    'Santa Juana': (-37.17, -72.94), 'Talcahuano': (-36.72, -73.12), 'Tomé': (-36.62, -72.96), 'Hualpén': (-36.79, -73.10),
+    'Lebu': (-37.61, -73.65), 'Arauco': (-37.25, -73.32), 'Cañete': (-37.80, -73.40), 'Contulmo': (-38.01, -73.23),
+    'Curanilahue': (-37.47, -73.35), 'Los Álamos': (-37.63, -73.46), 'Tirúa': (-38.34, -73.50), 'Los Ángeles': (-37.47, -72.35),
+    'Antuco': (-37.33, -71.68), 'Cabrero': (-37.03, -72.40), 'Laja': (-37.28, -72.72), 'Mulchén': (-37.72, -72.24),
+    'Nacimiento': (-37.50, -72.67), 'Negrete': (-37.59, -72.53), 'Quilaco': (-37.68, -72.01), 'Quilleco': (-37.47, -71.97),
+    'San Rosendo': (-37.26, -72.72), 'Santa Bárbara': (-37.67, -72.02), 'Tucapel': (-37.29, -71.95), 'Yumbel': (-37.10, -72.56),
+    'Alto Biobío': (-37.87, -71.61),
+    # La Araucanía
+    'Temuco': (-38.74, -72.60), 'Carahue': (-38.71, -73.17), 'Cunco': (-38.93, -72.03), 'Curarrehue': (-39.36, -71.59),
+    'Freire': (-38.95, -72.62), 'Galvarino': (-38.41, -72.78), 'Gorbea': (-39.10, -72.68), 'Lautaro': (-38.53, -72.43),
+    'Loncoche': (-39.37, -72.63), 'Melipeuco': (-38.85, -71.69), 'Nueva Imperial': (-38.74, -72.95),
+    'Padre Las Casas': (-38.77, -72.60), 'Perquenco': (-38.42, -72.38), 'Pitrufquén': (-38.99, -72.64),
+    'Pucón': (-39.28, -71.98), 'Saavedra': (-38.78, -73.39), 'Teodoro Schmidt': (-38.99, -73.09), 'Toltén': (-39.21, -73.21),
+    'Vilcún': (-38.67, -72.23), 'Villarrica': (-39.28, -72.23), 'Cholchol': (-38.60, -72.85), 'Angol': (-37.80, -72.71),
+    'Collipulli': (-37.95, -72.43), 'Curacautín': (-38.44, -71.89), 'Ercilla': (-38.06, -72.38), 'Lonquimay': (-38.45, -71.37),
+    'Los Sauces': (-37.98, -72.83), 'Lumaco': (-38.15, -72.90), 'Purén': (-38.03, -73.07), 'Renaico': (-37.67, -72.57),
+    'Traiguén': (-38.25, -72.67), 'Victoria': (-38.23, -72.33),
+    # Los Ríos
+    'Valdivia': (-39.81, -73.25), 'Corral': (-39.89, -73.43), 'Lanco': (-39.45, -72.78), 'Los Lagos': (-39.86, -72.81),
+    'Máfil': (-39.67, -72.95), 'Mariquina': (-39.54, -72.96), 'Paillaco': (-40.07, -72.87), 'Panguipulli': (-39.64, -72.33),
+    'La Unión': (-40.29, -73.08), 'Futrono': (-40.13, -72.39), 'Lago Ranco': (-40.31, -72.50), 'Río Bueno': (-40.33, -72.96),
+    # Los Lagos
+    'Puerto Montt': (-41.47, -72.94), 'Calbuco': (-41.77, -73.13), 'Cochamó': (-41.49, -72.30), 'Fresia': (-41.15, -73.42),
+    'Frutillar': (-41.13, -73.06), 'Los Muermos': (-41.40, -73.46), 'Llanquihue': (-41.26, -73.01), 'Maullín': (-41.62, -73.60),
+    'Puerto Varas': (-41.32, -72.98), 'Castro': (-42.48, -73.76), 'Ancud': (-41.87, -73.83), 'Chonchi': (-42.62, -73.77),
+    'Curaco de Vélez': (-42.44, -73.60), 'Dalcahue': (-42.38, -73.65), 'Puqueldón': (-42.60, -73.67), 'Queilén': (-42.90, -73.48),
+    'Quellón': (-43.12, -73.62), 'Quemchi': (-42.14, -73.48), 'Quinchao': (-42.47, -73.49), 'Osorno': (-40.57, -73.14),
+    'Puerto Octay': (-40.97, -72.88), 'Purranque': (-40.91, -73.17), 'Puyehue': (-40.68, -72.60), 'Río Negro': (-40.79, -73.23),
+    'San Juan de la Costa': (-40.52, -73.40), 'San Pablo': (-40.41, -73.01), 'Chaitén': (-42.92, -72.71),
+    'Futaleufú': (-43.19, -71.87), 'Hualaihué': (-42.10, -72.40), 'Palena': (-43.62, -71.80),
+    # Aysén del General Carlos Ibáñez del Campo
+    'Coyhaique': (-45.57, -72.07), 'Lago Verde': (-44.23, -71.84), 'Aysén': (-45.40, -72.70), 'Cisnes': (-44.73, -72.68),
+    'Guaitecas': (-43.88, -73.75), 'Cochrane': (-47.25, -72.57), "O'Higgins": (-48.47, -72.56), 'Tortel': (-47.80, -73.53),
+    'Chile Chico': (-46.54, -71.73), 'Río Ibáñez': (-46.29, -71.93),
+    # Magallanes y de la Antártica Chilena
+    'Punta Arenas': (-53.16, -70.91), 'Laguna Blanca': (-52.25, -71.17), 'Río Verde': (-52.65, -71.47),
+    'San Gregorio': (-52.31, -69.68), 'Cabo de Hornos (Ex Navarino)': (-54.93, -67.61), 'Antártica': (-62.20, -58.96),
+    'Porvenir': (-53.30, -70.37), 'Primavera': (-52.71, -69.25), 'Timaukel': (-53.67, -69.90), 'Natales': (-51.73, -72.51),
+    'Torres del Paine': (-51.13, -72.54),
+}
+
+
+def cargar_centroides(apps, schema_editor):
+    comunaChile = apps.get_model('core', 'comunaChile')
+    comunas = list(comunaChile.objects.all())
+    for c in comunas:
+        c.latitud, c.longitud = CENTROIDES.get(c.nombre, (None, None))
+    comunaChile.objects.bulk_update(comunas, ['latitud', 'longitud'])
+
+
+def ubicar_kinesiologos(apps, schema_editor):
+    """Los kinesiólogos ya registrados quedan en el centroide de su comuna."""
+    kinesiologo = apps.get_model('core', 'kinesiologo')
+    comunaChile = apps.get_model('core', 'comunaChile')
+    comuna = comunaChile.objects.filter(id=OuterRef('comuna_ref_id'))
+    kinesiologo.objects.filter(latitud__isnull=True, comuna_ref__isnull=False).update(
+        latitud=Subquery(comuna.values('latitud')[:1]),
+        longitud=Subquery(comuna.values('longitud')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_geografia_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comunachile',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='comunachile',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='radio_domicilio_km',
+            field=models.PositiveSmallIntegerField(default=10, help_text='Distancia máxima (km) que recorre para atender a domicilio', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=models.Index(fields=['estado_verificacion', 'latitud', 'longitud'], name='core_kinesi_estado__654df4_idx'),
+        ),
+        migrations.RunPython(cargar_centroides, migrations.RunPython.noop),
+        migrations.RunPython(ubicar_kinesiologos, migrations.RunPython.noop),
+    ]
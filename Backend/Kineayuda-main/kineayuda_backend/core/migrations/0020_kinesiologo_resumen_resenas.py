@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:25
+
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def calcular_resumenes(apps, schema_editor):
+    """Mismo cálculo que core.utils.calificaciones.recalcular_resumenes, para las reseñas existentes."""
+    kinesiologo = apps.get_model('core', 'kinesiologo')
+    reseña = apps.get_model('core', 'reseña')
+    media = Decimal(str(getattr(settings, 'RATING_MEDIA_PREVIA', 4.0)))
+    peso = int(getattr(settings, 'RATING_PESO_PREVIO', 5))
+    grupos = (reseña.objects.values('cita__kinesiologo_id')
+              .annotate(total=Count('id'), suma=Sum('calificacion'),
+                        positivas=Count('id', filter=Q(sentimiento='positiva')),
+                        neutrales=Count('id', filter=Q(sentimiento='neutral')),
+                        negativas=Count('id', filter=Q(sentimiento='negativa')))
+              .order_by())
+    filas = []
+    for g in grupos:
+        filas.append(kinesiologo(
+            id=g['cita__kinesiologo_id'], resenas_total=g['total'], resenas_suma_calificaciones=g['suma'],
+            resenas_positivas=g['positivas'], resenas_neutrales=g['neutrales'], resenas_negativas=g['negativas'],
+            rating=((peso * media + g['suma']) / (peso + g['total'])).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP),
+        ))
+    kinesiologo.objects.bulk_update(filas, [
+        'resenas_total', 'resenas_suma_calificaciones', 'resenas_positivas', 'resenas_neutrales', 'resenas_negativas', 'rating',
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_kinesiologo_ubicacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='rating',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='Promedio bayesiano de calificaciones (0 sin reseñas)', max_digits=4),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='resenas_negativas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='resenas_neutrales',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='resenas_positivas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='resenas_suma_calificaciones',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='kinesiologo',
+            name='resenas_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='kinesiologo',
+            index=models.Index(fields=['estado_verificacion', 'rating', 'id'], name='core_kinesi_estado__04bce9_idx'),
+        ),
+        migrations.RunPython(calcular_resumenes, migrations.RunPython.noop),
+    ]
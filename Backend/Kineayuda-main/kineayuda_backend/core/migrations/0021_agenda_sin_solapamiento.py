@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:40
+
+import core.models
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+# Antes de la restricción: un horario 'disponible' que solapa con otro activo (reservado o
+# no_disponible, o disponible con id menor) se borra. Son cupos libres duplicados por el
+# chequeo sin bloqueo de antes; los reservados no se tocan.
+BORRAR_SOLAPADOS_SQL = """
+DELETE FROM core_agenda a
+USING core_agenda b
+WHERE a.kinesiologo_id = b.kinesiologo_id
+  AND a.id <> b.id
+  AND a.estado = 'disponible'
+  AND b.estado IN ('disponible', 'reservado', 'no_disponible')
+  AND tstzrange(a.inicio, a.fin) && tstzrange(b.inicio, b.fin)
+  AND (b.estado <> 'disponible' OR b.id < a.id);
+"""
+
+# Lo que queda solapado son horarios reservados o no_disponible entre sí (p.ej. dos cupos
+# duplicados que después se reservaron): hay citas de por medio y no se eligen a ciegas.
+SOLAPADOS_SQL = """
+SELECT a.kinesiologo_id, a.id, b.id
+FROM core_agenda a
+JOIN core_agenda b
+  ON a.kinesiologo_id = b.kinesiologo_id
+ AND a.id < b.id
+ AND tstzrange(a.inicio, a.fin) && tstzrange(b.inicio, b.fin)
+WHERE a.estado IN ('disponible', 'reservado', 'no_disponible')
+  AND b.estado IN ('disponible', 'reservado', 'no_disponible')
+ORDER BY a.kinesiologo_id, a.id, b.id;
+"""
+
+
+def verificar_sin_solapados(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(SOLAPADOS_SQL)
+        pares = cursor.fetchall()
+    if pares:
+        detalle = '\n'.join(f"  kinesiologo {kx}: agenda {a} y {b}" for kx, a, b in pares)
+        raise RuntimeError(
+            "Hay horarios reservados o no_disponible que se solapan y no se pueden corregir solos. "
+            "Resolverlos a mano (mover, cancelar o pasar a 'expirado' uno de cada par) y volver a migrar:\n"
+            + detalle
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_kinesiologo_resumen_resenas'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunSQL(BORRAR_SOLAPADOS_SQL, migrations.RunSQL.noop),
+        migrations.RunPython(verificar_sin_solapados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='agenda',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('estado__in', ['disponible', 'reservado', 'no_disponible'])), expressions=[('kinesiologo', '='), (core.models.TsTzRange('inicio', 'fin'), '&&')], name='agenda_sin_solapamiento'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Los índices simples de estas FK quedan cubiertos por los compuestos nuevos (son su
+# prefijo). Se borran solo en la BD: un AlterField volvería a crear y validar la FK.
+INDICES_REDUNDANTES = [
+    ('core_agenda', 'core_agenda_kinesiologo_id_95a77f10', 'kinesiologo_id'),
+    ('core_cita', 'core_cita_paciente_id_e54647dd', 'paciente_id'),
+    ('core_reseña', 'core_reseña_cita_id_8e5f9aa9', 'cita_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_agenda_sin_solapamiento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['kinesiologo', 'inicio'], name='agenda_kine_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(condition=models.Q(('estado', 'disponible')), fields=['kinesiologo', 'inicio'], include=('id', 'fin'), name='agenda_disponible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['paciente', '-fecha_hora'], name='cita_paciente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reseña',
+            index=models.Index(fields=['cita', 'fecha_creacion'], name='resena_cita_fecha_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='agenda',
+                    name='kinesiologo',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='agenda', to='core.kinesiologo'),
+                ),
+                migrations.AlterField(
+                    model_name='cita',
+                    name='paciente',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cita', to='core.paciente'),
+                ),
+                migrations.AlterField(
+                    model_name='reseña',
+                    name='cita',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reseña', to='core.cita'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(f'DROP INDEX IF EXISTS "{indice}";', f'CREATE INDEX "{indice}" ON "{tabla}" ("{columna}");')
+                for tabla, indice, columna in INDICES_REDUNDANTES
+            ],
+        ),
+    ]
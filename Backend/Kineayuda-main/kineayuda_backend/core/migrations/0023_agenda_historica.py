@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='agendaHistorica',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('disponible', 'disponible'), ('reservado', 'reservado'), ('no_disponible', 'no_disponible'), ('expirado', 'expirado')], max_length=20)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+                ('cita', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.cita')),
+                ('kinesiologo', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='agenda_historica', to='core.kinesiologo')),
+                ('paciente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.paciente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kinesiologo', 'inicio'], name='agenda_hist_kine_inicio_idx')],
+            },
+        ),
+    ]
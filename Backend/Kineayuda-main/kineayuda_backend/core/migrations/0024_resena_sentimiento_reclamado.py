@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_agenda_historica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reseña',
+            name='sentimiento_reclamado',
+            field=models.DateTimeField(blank=True, help_text="Cuándo un worker tomó la reseña para inferir (estado 'procesando')", null=True),
+        ),
+        migrations.AlterField(
+            model_name='reseña',
+            name='estado_sentimiento',
+            field=models.CharField(choices=[('pendiente', 'pendiente'), ('procesando', 'procesando'), ('procesado', 'procesado'), ('error', 'error')], db_index=True, default='pendiente', help_text='El sentimiento se calcula en segundo plano después de guardar la reseña', max_length=10),
+        ),
+    ]
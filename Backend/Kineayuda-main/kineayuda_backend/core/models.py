@@ -1,4 +1,9 @@
 from django.db import models
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from decimal import Decimal
 import os
@@ -6,10 +11,41 @@ import uuid
 
 # Create your models here.
 
+class TsTzRange(models.Func):
+    """tstzrange(inicio, fin): el rango [inicio, fin) de un horario, para restricciones de solapamiento."""
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
 def kx_profile_upload_path(instance, filename):
     ext = os.path.splitext(filename)[1].lower()
     return f"kinesiologos/{instance.id}/pefil{ext}"
 
+class regionChile(models.Model):
+    """Catálogo de regiones (cargado en la migración 0018)."""
+    codigo = models.CharField(max_length=5, unique=True)  # XV, I, ..., RM, ..., XII
+    nombre = models.CharField(max_length=100, unique=True)
+    orden = models.PositiveSmallIntegerField(help_text="De norte a sur")
+
+    class Meta:
+        ordering = ['orden']
+
+    def __str__(self):
+        return self.nombre
+
+class comunaChile(models.Model):
+    """Catálogo de comunas (cargado en la migración 0018)."""
+    nombre = models.CharField(max_length=100, unique=True)
+    region = models.ForeignKey(regionChile, on_delete=models.PROTECT, related_name='comunas')
+    # Centroide aproximado (migración 0019): lo usa el geocodificador local
+    latitud = models.FloatField(blank=True, null=True)
+    longitud = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['nombre']
+
+    def __str__(self):
+        return self.nombre
+
 class kinesiologo (models.Model):
     ESTADO_VERIFICACION = [
         ('pendiente', 'pendiente'),
@@ -62,17 +98,79 @@ class kinesiologo (models.Model):
         null=True,
         help_text="Región donde atiende"
     )
+    # Las mismas comuna y región en el catálogo: los filtros del directorio usan estas columnas
+    comuna_ref = models.ForeignKey(
+        comunaChile, on_delete=models.PROTECT, blank=True, null=True,
+        related_name='kinesiologos', db_index=False
+    )
+    region_ref = models.ForeignKey(
+        regionChile, on_delete=models.PROTECT, blank=True, null=True,
+        related_name='kinesiologos', db_index=False
+    )
+    # Coordenadas de la consulta (o del centroide de la comuna si no hay otras; ver core/utils/geocodificacion.py)
+    latitud = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitud = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    radio_domicilio_km = models.PositiveSmallIntegerField(
+        default=10,
+        validators=[MinValueValidator(1), MaxValueValidator(100)],
+        help_text="Distancia máxima (km) que recorre para atender a domicilio"
+    )
+    # Resumen de sus reseñas (core/utils/calificaciones.py): se suma al crear cada reseña y
+    # `manage.py recalcular_ratings` lo reconcilia con la tabla de reseñas
+    resenas_total = models.PositiveIntegerField(default=0)
+    resenas_suma_calificaciones = models.PositiveIntegerField(default=0)
+    resenas_positivas = models.PositiveIntegerField(default=0)
+    resenas_neutrales = models.PositiveIntegerField(default=0)
+    resenas_negativas = models.PositiveIntegerField(default=0)
+    rating = models.DecimalField(
+        max_digits=4,
+        decimal_places=3,
+        default=0,
+        help_text="Promedio bayesiano de calificaciones (0 sin reseñas)"
+    )
     
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     foto_perfil = models.ImageField(upload_to=kx_profile_upload_path, blank=True, null=True)
+    suscripcion_vence = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Vencimiento del último pago de suscripción aprobado (se actualiza en webpay_retorno)"
+    )
+    # Búsqueda del directorio (?q=): las mantiene un trigger de Postgres (migración 0017)
+    busqueda = SearchVectorField(blank=True, null=True, editable=False)
+    busqueda_texto = models.TextField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="nombre, apellido, especialidad, comuna y región sin tildes y en minúsculas (trigramas)"
+    )
 
     class Meta:
         indexes = [
             models.Index(fields=['precio_consulta']),
-            models.Index(fields=['comuna']),
             models.Index(fields=['especialidad']),
             models.Index(fields=['estado_verificacion']),
+            # Directorio público: filtro por aprobados + orden/cursor (campo, id)
+            models.Index(fields=['estado_verificacion', 'apellido', 'id']),
+            models.Index(fields=['estado_verificacion', 'precio_consulta', 'id']),
+            # Filtros ?comuna= / ?region= del directorio (igualdad por id)
+            models.Index(fields=['comuna_ref', 'estado_verificacion']),
+            models.Index(fields=['region_ref', 'estado_verificacion']),
+            # ?cerca= : caja de latitud/longitud antes de la distancia exacta
+            models.Index(fields=['estado_verificacion', 'latitud', 'longitud']),
+            # ordering=-rating y rating_min=
+            models.Index(fields=['estado_verificacion', 'rating', 'id']),
+            GinIndex(fields=['busqueda'], name='kine_busqueda_gin'),
+            GinIndex(fields=['busqueda_texto'], opclasses=['gin_trgm_ops'], name='kine_busqueda_trgm'),
         ]
     
     def __str__(self):
@@ -97,7 +195,7 @@ class cita(models.Model):
         ('cancelada', 'cancelada')       
     ]
 
-    paciente = models.ForeignKey(paciente, on_delete=models.CASCADE, related_name='cita')
+    paciente = models.ForeignKey(paciente, on_delete=models.CASCADE, related_name='cita', db_index=False)  # ver Meta.indexes
     kinesiologo = models.ForeignKey(kinesiologo, on_delete=models.CASCADE, related_name='cita')
     fecha_hora = models.DateTimeField()
     estado = models.CharField(max_length=20, choices=ESTADO_CITA, default='pendiente')
@@ -110,6 +208,12 @@ class cita(models.Model):
     def __str__(self):
         return f"Cita {self.id} - {self.paciente} con {self.kinesiologo}"
 
+    class Meta:
+        indexes = [
+            # Citas de un paciente, más recientes primero (CitasPorRutView)
+            models.Index(fields=['paciente', '-fecha_hora'], name='cita_paciente_fecha_idx'),
+        ]
+
 class reseña(models.Model):
     OPCIONES_SENTIMIENTO = [
         ('positiva', 'positiva'),
@@ -117,9 +221,28 @@ class reseña(models.Model):
         ('negativa', 'negativa')       
     ]
 
-    cita = models.ForeignKey(cita, on_delete=models.CASCADE, related_name='reseña')
+    ESTADO_SENTIMIENTO = [
+        ('pendiente', 'pendiente'),
+        ('procesando', 'procesando'),
+        ('procesado', 'procesado'),
+        ('error', 'error'),
+    ]
+
+    cita = models.ForeignKey(cita, on_delete=models.CASCADE, related_name='reseña', db_index=False)  # ver Meta.indexes
     comentario = models.TextField()
     sentimiento = models.CharField(max_length=10, choices=OPCIONES_SENTIMIENTO, blank=True, null=True)
+    estado_sentimiento = models.CharField(
+        max_length=10,
+        choices=ESTADO_SENTIMIENTO,
+        default='pendiente',
+        db_index=True,
+        help_text="El sentimiento se calcula en segundo plano después de guardar la reseña"
+    )
+    # Resultado completo del modelo, para ajustar umbrales sin volver a inferir
+    confianza_sentimiento = models.FloatField(blank=True, null=True, help_text="Probabilidad de la clase ganadora")
+    probabilidades_sentimiento = models.JSONField(blank=True, null=True, help_text="Probabilidad por clase")
+    modelo_sentimiento = models.CharField(max_length=200, blank=True, null=True, help_text="Modelo@revisión/backend que calculó el sentimiento")
+    sentimiento_reclamado = models.DateTimeField(blank=True, null=True, help_text="Cuándo un worker tomó la reseña para inferir (estado 'procesando')")
     calificacion = models.IntegerField(
         choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5')],
         default=5,
@@ -130,6 +253,12 @@ class reseña(models.Model):
     def __str__(self):
         return f"Reseña cita {self.cita.id} - {self.sentimiento}"
 
+    class Meta:
+        indexes = [
+            # Reseñas de las citas de un kinesiólogo y su rango de fechas (estadísticas y evolución)
+            models.Index(fields=['cita', 'fecha_creacion'], name='resena_cita_fecha_idx'),
+        ]
+
 class agenda(models.Model):
     ESTADO_HORARIO = [
         ('disponible', 'disponible'),
@@ -138,7 +267,7 @@ class agenda(models.Model):
         ('expirado', 'expirado'),
     ]
 
-    kinesiologo = models.ForeignKey(kinesiologo, on_delete=models.CASCADE, related_name='agenda')
+    kinesiologo = models.ForeignKey(kinesiologo, on_delete=models.CASCADE, related_name='agenda', db_index=False)  # ver Meta.indexes
     inicio = models.DateTimeField()
     fin = models.DateTimeField()
     estado = models.CharField(max_length=20, choices=ESTADO_HORARIO, default='disponible')
@@ -152,6 +281,48 @@ class agenda(models.Model):
     def activa_para_reserva(self):
         return (self.estado == 'disponible' and self.inicio >= timezone.now())
 
+    class Meta:
+        constraints = [
+            # Dos horarios activos del mismo kinesiólogo no pueden solaparse ([inicio, fin),
+            # así uno que termina a las 10:00 y otro que empieza a las 10:00 no chocan)
+            ExclusionConstraint(
+                name='agenda_sin_solapamiento',
+                expressions=[('kinesiologo', RangeOperators.EQUAL), (TsTzRange('inicio', 'fin'), RangeOperators.OVERLAPS)],
+                condition=models.Q(estado__in=['disponible', 'reservado', 'no_disponible']),
+            ),
+        ]
+        indexes = [
+            # Horario de un kinesiólogo por hora exacta, en cualquier estado (retorno de Webpay)
+            models.Index(fields=['kinesiologo', 'inicio'], name='agenda_kine_inicio_idx'),
+            # Horas libres de un kinesiólogo desde ahora, en orden (HorasDisponiblesView). Parcial:
+            # solo las filas 'disponible', y con id/fin incluidos se responde sin leer la tabla
+            models.Index(fields=['kinesiologo', 'inicio'], include=['id', 'fin'], condition=models.Q(estado='disponible'),
+                         name='agenda_disponible_idx'),
+        ]
+
+class agendaHistorica(models.Model):
+    """
+    Horarios ya pasados que el barrido (core.utils.agenda.archivar_horarios) saca de agenda
+    después de AGENDA_RETENCION_DIAS. Conserva el id original.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    kinesiologo = models.ForeignKey(kinesiologo, on_delete=models.CASCADE, related_name='agenda_historica', db_index=False)
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=agenda.ESTADO_HORARIO)
+    paciente = models.ForeignKey('paciente', on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    cita = models.ForeignKey('cita', on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    fecha_creacion = models.DateTimeField()
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kinesiologo_id} - {self.inicio} a {self.fin} ({self.estado}, archivado)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kinesiologo', 'inicio'], name='agenda_hist_kine_inicio_idx'),
+        ]
+
 class metodoPago(models.Model):
     nombre = models.CharField(max_length=100)
     codigo_interno = models.CharField(max_length=50, unique=True)
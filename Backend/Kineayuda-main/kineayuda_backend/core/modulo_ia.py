@@ -1,12 +1,17 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-import torch.nn.functional as F
+import logging
+import threading
+from django.conf import settings
+from .ia.registro import MODEL_NAME, obtener_backend, identificador_modelo, precargar_modelo, modelo_cargado  # noqa: F401
+from .ia.lotes import AgrupadorLotes
+from .ia.cache import cache_sentimiento
+from .ia.servicio import ServicioNoDisponible, obtener_cliente
+from .ia.corpus_ejemplo import TEXTOS
 
-# Cargamos un modelo público de sentimiento en español
-MODEL_NAME = "finiteautomata/beto-sentiment-analysis"
+# El modelo ya no se carga al importar este módulo: ver core/ia/registro.py
+# El backend de inferencia (torch, torch_int8, onnx) se elige con settings.IA_BACKEND
+# Con settings.IA_SERVICIO_SOCKET la inferencia se delega al proceso `manage.py servidor_ia`
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+logger = logging.getLogger(__name__)
 
 LABELS_MAP = {
     "NEG": "negativa",
@@ -14,31 +19,164 @@ LABELS_MAP = {
     "POS": "positiva",
 }
 
+MAX_LENGTH = 256  # por defecto; se configura con settings.IA_MAX_LENGTH
+
+
+def max_length() -> int:
+    return getattr(settings, 'IA_MAX_LENGTH', MAX_LENGTH)
+
+
+def _inferir_lote(textos: list[str]) -> list[dict]:
+    """Un único forward pass para todos los textos (padding al más largo del lote)."""
+    backend = obtener_backend()
+    modelo = identificador_modelo()
+
+    # Probabilidades (softmax) por texto según el backend configurado en IA_BACKEND
+    probs = backend.probabilidades(textos, max_length())
+
+    # Índice de la clase más probable -> etiqueta del modelo ('NEG', 'NEU', 'POS') -> etiqueta nuestra
+    resultados = []
+    for fila in probs:
+        por_clase = {
+            LABELS_MAP.get(backend.id2label[i], backend.id2label[i]): round(float(p), 4)
+            for i, p in enumerate(fila)
+        }
+        pred_idx = max(range(len(fila)), key=fila.__getitem__)
+        resultados.append({
+            'sentimiento': LABELS_MAP.get(backend.id2label[pred_idx], "neutral"),
+            'confianza': round(float(fila[pred_idx]), 4),
+            'probabilidades': por_clase,
+            'modelo': modelo,
+        })
+    return resultados
+
+
+def _inferir_ordenado(textos: list[str]) -> list[dict]:
+    """
+    Infiere en lotes de IA_LOTE_MAX, ordenando antes por largo para que cada
+    lote tenga el menor relleno posible. Retorna en el orden original.
+    """
+    max_lote = getattr(settings, 'IA_LOTE_MAX', 16)
+    orden = sorted(range(len(textos)), key=lambda i: len(textos[i]))
+    resultados = [None] * len(textos)
+    for inicio in range(0, len(orden), max_lote):
+        indices = orden[inicio:inicio + max_lote]
+        for i, detalle in zip(indices, _inferir_lote([textos[i] for i in indices])):
+            resultados[i] = detalle
+    return resultados
+
+
+def _inferir_en_servicio(textos: list[str]):
+    """Detalles calculados por el servicio IA, o None si hay que inferir en este proceso."""
+    cliente = obtener_cliente()
+    if cliente is None:
+        return None
+    try:
+        return cliente.detalle_batch(textos)
+    except ServicioNoDisponible as e:
+        if not getattr(settings, 'IA_SERVICIO_FALLBACK', True):
+            raise
+        logger.warning("Servicio IA no disponible (%s), se infiere en el proceso.", e)
+        return None
+
+
+def _inferir(textos: list[str]) -> list[dict]:
+    detalles = _inferir_en_servicio(textos)
+    return detalles if detalles is not None else _inferir_ordenado(textos)
+
+
+def analizar_sentimiento_detalle_batch(textos: list[str], usar_cache: bool = True) -> list[dict]:
+    """
+    Como analizar_sentimiento_detalle, para varios textos (mismo orden de entrada).
+    Solo pasan por el modelo los textos que no están en cache. Los procesos
+    masivos (rescore_resenas) usan usar_cache=False para no llenarla.
+    """
+    if not usar_cache:
+        return _inferir(textos)
+    resultados = [cache_sentimiento.obtener(t) for t in textos]
+    pendientes = [i for i, r in enumerate(resultados) if r is None]
+    if pendientes:
+        nuevos = _inferir([textos[i] for i in pendientes])
+        for i, detalle in zip(pendientes, nuevos):
+            resultados[i] = detalle
+            cache_sentimiento.guardar(textos[i], detalle)
+    return resultados
+
+
+def analizar_sentimiento_batch(textos: list[str], usar_cache: bool = True) -> list[str]:
+    """Analiza varios textos y retorna sus sentimientos en el mismo orden."""
+    return [d['sentimiento'] for d in analizar_sentimiento_detalle_batch(textos, usar_cache=usar_cache)]
+
+
+_agrupador = None
+_agrupador_lock = threading.Lock()
+
+
+def _obtener_agrupador():
+    global _agrupador
+    if _agrupador is None:
+        with _agrupador_lock:
+            if _agrupador is None:
+                _agrupador = AgrupadorLotes(
+                    _inferir_lote,
+                    max_lote=getattr(settings, 'IA_LOTE_MAX', 16),
+                    espera_ms=getattr(settings, 'IA_LOTE_ESPERA_MS', 5),
+                )
+    return _agrupador
+
+
+def analizar_sentimiento_detalle(texto: str) -> dict:
+    """
+    Analiza el sentimiento de un texto y retorna el resultado completo:
+    {
+        'sentimiento': 'positiva' | 'neutral' | 'negativa',
+        'confianza': probabilidad de la clase ganadora,
+        'probabilidades': {'positiva': p, 'neutral': p, 'negativa': p},
+        'modelo': identificador del modelo/revisión/backend que lo calculó,
+    }
+
+    Las llamadas concurrentes del mismo proceso (o de todos los workers, si se usa
+    el servicio IA) se agrupan en micro-lotes (IA_LOTE_ESPERA_MS / IA_LOTE_MAX);
+    con IA_LOTE_ESPERA_MS=0 se infiere directo. Un texto ya analizado (p.ej. en
+    validar_sentimiento_resena) sale de la cache.
+    """
+    detalle = cache_sentimiento.obtener(texto)
+    if detalle is not None:
+        return detalle
+    servicio = _inferir_en_servicio([texto])
+    if servicio is not None:
+        detalle = servicio[0]
+    elif getattr(settings, 'IA_LOTE_ESPERA_MS', 5) <= 0:
+        detalle = _inferir_lote([texto])[0]
+    else:
+        detalle = _obtener_agrupador().analizar(texto, timeout=getattr(settings, 'IA_LOTE_TIMEOUT_S', 60))
+    cache_sentimiento.guardar(texto, detalle)
+    return detalle
+
+
 def analizar_sentimiento(texto: str) -> str:
     """
     Analiza el sentimiento de un texto en español y retorna:
     'positiva', 'neutral' o 'negativa'.
     """
-    # Tokenizar
-    inputs = tokenizer(
-        texto,
-        return_tensors="pt",
-        truncation=True,
-        padding=True,
-        max_length=256,
-    )
-
-    # Pasar por el modelo sin gradientes
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-
-    # Softmax para probabilidades
-    probs = F.softmax(logits, dim=-1)
-
-    # Índice de la clase más probable
-    pred_idx = probs.argmax(dim=-1).item()
-
-    # Convertimos índice -> etiqueta del modelo -> etiqueta nuestra
-    raw_label = model.config.id2label[pred_idx]  # 'NEG', 'NEU', 'POS'
-    return LABELS_MAP.get(raw_label, "neutral")
+    return analizar_sentimiento_detalle(texto)['sentimiento']
+
+
+def warmup() -> float:
+    """
+    Corre inferencias representativas para que la primera request no pague la
+    inicialización de torch (allocator, kernels, pools de hilos): el corpus de
+    ejemplo y, por cada bucket de largo, un texto solo y un lote de IA_LOTE_MAX.
+    No pasa por la cache. Retorna los segundos que tomó.
+    """
+    import time
+
+    t0 = time.perf_counter()
+    backend = obtener_backend()
+    largo_maximo = max_length()
+    texto_largo = " ".join(TEXTOS)
+    for largo in [b for b in backend.buckets if b <= largo_maximo] or [largo_maximo]:
+        backend.probabilidades([texto_largo], largo)
+        backend.probabilidades([texto_largo] * getattr(settings, 'IA_LOTE_MAX', 16), largo)
+    _inferir_ordenado(TEXTOS)
+    return time.perf_counter() - t0
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PaginacionKeyset(BasePagination):
+    """
+    Paginación por cursor (keyset) para querysets ordenados por (campo, id).
+
+    El cursor guarda el (campo, id) de la última fila entregada y la página
+    siguiente se pide con WHERE (campo, id) > (valor, id): sin OFFSET, el costo
+    no crece con el número de página y las filas insertadas o borradas entre
+    páginas no producen duplicados ni saltos. El id desempata filas con el mismo
+    valor (p.ej. muchos kinesiólogos con el precio por defecto).
+
+    Para no romper a los clientes que esperan la lista completa, solo pagina
+    cuando la request trae ?cursor= o ?page_size=.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        orden = queryset.query.order_by
+        if len(orden) != 2 or orden[1].lstrip('-') not in ('id', 'pk'):
+            raise ValueError("PaginacionKeyset necesita un queryset ordenado por (campo, id).")
+        self.campo = orden[0].lstrip('-')
+        descendente = orden[0].startswith('-')
+
+        self.request = request
+        tamano = self._tamano(params.get(self.page_size_query_param))
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            valor, ultimo_id = self._decodificar(cursor)
+            op = 'lt' if descendente else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.campo}__{op}': valor}) | Q(**{self.campo: valor, f'id__{op}': ultimo_id})
+            )
+
+        filas = list(queryset[:tamano + 1])
+        self.hay_siguiente = len(filas) > tamano
+        filas = filas[:tamano]
+        self.ultima = filas[-1] if filas else None
+        return filas
+
+    def _tamano(self, valor):
+        try:
+            return max(1, min(int(valor), self.max_page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+
+    def _decodificar(self, cursor):
+        try:
+            valor, ultimo_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return valor, int(ultimo_id)
+        except (binascii.Error, UnicodeError, ValueError, TypeError):
+            raise NotFound("Cursor inválido.")
+
+    def get_next_link(self):
+        if not self.hay_siguiente:
+            return None
+        valor = getattr(self.ultima, self.campo)
+        cursor = base64.urlsafe_b64encode(json.dumps([str(valor), self.ultima.pk]).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -1,14 +1,20 @@
 from rest_framework import serializers
 from .models import kinesiologo, paciente, cita, reseña, agenda, metodoPago, pagoSuscripcion, documentoVerificacion
 from django.utils import timezone
-from .modulo_ia import analizar_sentimiento
+from .ia.cola import programar_sentimiento
 from .utils.rut import normalizar_rut, formatear_rut
+from .utils.geografia import UbicacionInvalida, normalizar_ubicacion
+from .utils.geocodificacion import obtener_geocodificador
+from .utils.agenda import expandir_regla, zona_agenda
 from django.db import transaction
+from django.conf import settings
 
 class kinesiologoSerializer(serializers.ModelSerializer):
     class Meta:
         model = kinesiologo
-        fields = '__all__'
+        exclude = ['busqueda', 'busqueda_texto']
+        read_only_fields = ['suscripcion_vence', 'comuna_ref', 'region_ref', 'resenas_total', 'resenas_suma_calificaciones',
+                            'resenas_positivas', 'resenas_neutrales', 'resenas_negativas', 'rating']
 
     def validate_estado_verificacion(self, value):
         if value not in dict(kinesiologo.ESTADO_VERIFICACION):
@@ -20,6 +26,32 @@ class kinesiologoSerializer(serializers.ModelSerializer):
             return normalizar_rut(value)
         except ValueError as e:
             raise serializers.ValidationError(str(e))
+
+    def validate(self, attrs):
+        """Comuna y región se guardan con el nombre del catálogo y su FK (comuna_ref / region_ref)."""
+        if 'comuna' in attrs or 'region' in attrs:
+            region = attrs.get('region', getattr(self.instance, 'region', None))
+            comuna = attrs.get('comuna', getattr(self.instance, 'comuna', None))
+            try:
+                region_obj, comuna_obj = normalizar_ubicacion(region, comuna)
+            except UbicacionInvalida as e:
+                raise serializers.ValidationError({e.campo: str(e)})
+            attrs['region'] = region_obj.nombre if region_obj else region
+            attrs['comuna'] = comuna_obj.nombre if comuna_obj else comuna
+            attrs['region_ref'] = region_obj
+            attrs['comuna_ref'] = comuna_obj
+        # Sin coordenadas explícitas, un cambio de ubicación se geocodifica (GEOCODIFICADOR)
+        if ({'comuna', 'region', 'direccion_consulta'} & set(attrs)
+                and 'latitud' not in attrs and 'longitud' not in attrs):
+            coordenadas = obtener_geocodificador().geocodificar(
+                attrs.get('direccion_consulta', getattr(self.instance, 'direccion_consulta', None)),
+                attrs.get('comuna', getattr(self.instance, 'comuna', None)),
+                attrs.get('region', getattr(self.instance, 'region', None)),
+            )
+            attrs['latitud'], attrs['longitud'] = coordenadas or (None, None)
+        elif ('latitud' in attrs) != ('longitud' in attrs):
+            raise serializers.ValidationError("Latitud y longitud se envían juntas.")
+        return attrs
     
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -88,6 +120,7 @@ class reseñaSerializer(serializers.ModelSerializer):
     class Meta:
         model = reseña
         fields = '__all__'
+        read_only_fields = ['estado_sentimiento', 'confianza_sentimiento', 'probabilidades_sentimiento', 'modelo_sentimiento']
     
     def validate(self, data):
         cita = data.get('cita')
@@ -101,11 +134,11 @@ class reseñaSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data): #se sobreescribe el método create para agregar el análisis de sentimiento
-        # Analizar el sentimiento del texto de la reseña utilizando el módulo de IA
-        texto = validated_data.get('comentario')
-        sentimiento = analizar_sentimiento(texto) #devuelve 'positiva', 'neutral' o 'negativa'
-        validated_data['sentimiento'] = sentimiento
-        return super().create(validated_data)
+        # Se guarda sin sentimiento y el módulo de IA lo calcula en segundo plano (ver core/ia/cola.py)
+        validated_data['sentimiento'] = None
+        nueva_reseña = super().create(validated_data)
+        programar_sentimiento(nueva_reseña)
+        return nueva_reseña
 
 class ReseñaPublicaSerializer(serializers.Serializer):
     rut = serializers.CharField(max_length=15)
@@ -151,14 +184,13 @@ class ReseñaPublicaSerializer(serializers.Serializer):
         comentario = validated_data["comentario"]
         calificacion = validated_data.get("calificacion", 5)
 
-        sentimiento = analizar_sentimiento(comentario)  # 'positiva', 'neutral' o 'negativa'
-
+        # Se guarda sin sentimiento y el módulo de IA lo calcula en segundo plano (ver core/ia/cola.py)
         nueva_reseña = reseña.objects.create(
             cita=cita_obj,
             comentario=comentario,
-            sentimiento=sentimiento,
             calificacion=calificacion,
         )
+        programar_sentimiento(nueva_reseña)
         return nueva_reseña
     
 class agendaSerializer(serializers.ModelSerializer):
@@ -181,12 +213,102 @@ class agendaSerializer(serializers.ModelSerializer):
         
         return data
 
+class AgendaRecurrenteSerializer(serializers.Serializer):
+    """
+    Regla semanal de disponibilidad (ver core.utils.agenda.expandir_regla). Al validar
+    se expande en data['horarios']; no se guarda nada.
+    """
+    dias = serializers.ListField(child=serializers.IntegerField(min_value=0, max_value=6), allow_empty=False)  # 0 = lunes
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
+    duracion_minutos = serializers.IntegerField(min_value=5, max_value=480)
+    pausa_minutos = serializers.IntegerField(min_value=0, max_value=240, default=0)
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    excluir = serializers.ListField(child=serializers.DateField(), required=False, default=list)
+    zona_horaria = serializers.CharField(required=False)
+    omitir_conflictos = serializers.BooleanField(default=True)
+
+    def validate_zona_horaria(self, value):
+        try:
+            return zona_agenda(value)
+        except (ValueError, KeyError):
+            raise serializers.ValidationError("Zona horaria desconocida.")
+
+    def validate(self, data):
+        if data['hora_inicio'] >= data['hora_fin']:
+            raise serializers.ValidationError({"hora_fin": "Debe ser posterior a hora_inicio."})
+        if data['desde'] > data['hasta']:
+            raise serializers.ValidationError({"hasta": "Debe ser igual o posterior a desde."})
+        if (data['hasta'] - data['desde']).days > getattr(settings, 'AGENDA_RECURRENTE_MAX_DIAS', 366):
+            raise serializers.ValidationError({"hasta": "El rango de fechas es demasiado largo."})
+        data['horarios'] = expandir_regla(
+            data['dias'], data['hora_inicio'], data['hora_fin'], data['duracion_minutos'], data['desde'], data['hasta'],
+            excluir=data['excluir'], pausa_minutos=data['pausa_minutos'], zona=data.get('zona_horaria'),
+        )
+        if not data['horarios']:
+            raise serializers.ValidationError("La regla no genera ningún horario.")
+        maximo = getattr(settings, 'AGENDA_RECURRENTE_MAX_HORARIOS', 2000)
+        if len(data['horarios']) > maximo:
+            raise serializers.ValidationError(f"La regla genera {len(data['horarios'])} horarios; el máximo es {maximo}.")
+        return data
+
 class metodoPagoSerializer(serializers.ModelSerializer):
     class Meta:
         model = metodoPago
         fields = '__all__'
 
 
+class KinesiologoPublicoSerializer(serializers.ModelSerializer):
+    """
+    Tarjeta del directorio público: solo los datos que se muestran al paciente
+    (sin RUT, email, documentos ni firebase_ide). Con context['campos'] (el
+    parámetro ?fields= de la vista) se devuelve solo ese subconjunto.
+    """
+    foto_url = serializers.SerializerMethodField()
+    distancia_km = serializers.SerializerMethodField()
+    calificacion_promedio = serializers.SerializerMethodField()
+
+    # Columnas del modelo que necesita cada campo calculado (para el .only() de la vista);
+    # ninguna: es una anotación del queryset (?cerca=)
+    COLUMNAS = {
+        'foto_url': ('foto_perfil',),
+        'distancia_km': (),
+        'calificacion_promedio': ('resenas_total', 'resenas_suma_calificaciones'),
+    }
+
+    class Meta:
+        model = kinesiologo
+        fields = ['id', 'nombre', 'apellido', 'especialidad', 'foto_url', 'precio_consulta',
+                  'atiende_consulta', 'atiende_domicilio', 'direccion_consulta', 'comuna', 'region',
+                  'comuna_ref', 'region_ref', 'latitud', 'longitud', 'radio_domicilio_km', 'distancia_km',
+                  'rating', 'resenas_total', 'calificacion_promedio', 'resenas_positivas', 'resenas_neutrales',
+                  'resenas_negativas']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+    @classmethod
+    def columnas(cls, campos=None):
+        """Columnas a cargar con .only() para serializar `campos` (por defecto, todos)."""
+        return {'id'} | {columna for c in (campos or cls.Meta.fields) for columna in cls.COLUMNAS.get(c, (c,))}
+
+    def get_foto_url(self, obj):
+        return obj.foto_perfil.url if obj.foto_perfil else None
+
+    def get_calificacion_promedio(self, obj):
+        if not obj.resenas_total:
+            return None
+        return round(obj.resenas_suma_calificaciones / obj.resenas_total, 2)
+
+    def get_distancia_km(self, obj):
+        distancia = getattr(obj, 'distancia_km', None)
+        return float(distancia) if distancia is not None else None
+
 class kinesiologoFotoSerializer(serializers.ModelSerializer):
     class Meta:
         model = kinesiologo
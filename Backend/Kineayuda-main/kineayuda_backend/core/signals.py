@@ -1,9 +1,14 @@
 # core/signals.py
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import kinesiologo
+from .models import kinesiologo, cita, reseña, agenda, metodoPago
+from .utils.directorio import invalidar_facetas
+from .utils.geografia import buscar_comuna, buscar_region
+from .utils.geocodificacion import obtener_geocodificador
+from .utils.calificaciones import registrar_resena, recalcular_resumenes
+from .utils.cache_respuestas import invalidar
 
 
 @receiver(pre_save, sender=kinesiologo)
@@ -24,6 +29,69 @@ def detectar_aprobacion_kinesiologo(sender, instance, **kwargs):
             pass  # Es nuevo, no hacer nada
 
 
+@receiver(pre_save, sender=kinesiologo)
+def vincular_ubicacion_catalogo(sender, instance, **kwargs):
+    """
+    El serializer ya normaliza comuna y región; esto mantiene comuna_ref /
+    region_ref al día cuando se guarda desde el admin o un script (el catálogo
+    está en memoria, no agrega queries). Lo que no está en el catálogo queda sin FK.
+    Si faltan las coordenadas se piden al geocodificador.
+    """
+    comuna = buscar_comuna(instance.comuna) if instance.comuna else None
+    region = buscar_region(instance.region) if instance.region else None
+    if comuna is not None and region is not None and comuna.region_id != region.id:
+        comuna = None
+    instance.comuna_ref_id = comuna.id if comuna else None
+    instance.region_ref_id = comuna.region_id if comuna else (region.id if region else None)
+    if instance.latitud is None or instance.longitud is None:
+        coordenadas = obtener_geocodificador().geocodificar(instance.direccion_consulta, instance.comuna, instance.region)
+        if coordenadas:
+            instance.latitud, instance.longitud = coordenadas
+
+
+@receiver(post_save, sender=kinesiologo)
+@receiver(post_delete, sender=kinesiologo)
+def invalidar_facetas_directorio(sender, instance, **kwargs):
+    """Los filtros del directorio público cambian cuando se aprueba, edita o borra un kinesiólogo."""
+    invalidar_facetas()
+    invalidar('directorio')
+
+
+@receiver(post_save, sender=reseña)
+def actualizar_resumen_resenas(sender, instance, created, **kwargs):
+    """Una reseña nueva se suma al resumen del kinesiólogo; una editada lo reconcilia."""
+    kinesiologo_id = cita.objects.filter(id=instance.cita_id).values_list('kinesiologo_id', flat=True).first()
+    if kinesiologo_id is None:
+        return
+    invalidar('resenas', kinesiologo_id)
+    if created:
+        registrar_resena(kinesiologo_id, instance.calificacion)
+        invalidar('directorio')
+    else:
+        recalcular_resumenes([kinesiologo_id])
+
+
+@receiver(post_delete, sender=reseña)
+def descontar_resena(sender, instance, **kwargs):
+    kinesiologo_id = cita.objects.filter(id=instance.cita_id).values_list('kinesiologo_id', flat=True).first()
+    if kinesiologo_id is not None:
+        invalidar('resenas', kinesiologo_id)
+        recalcular_resumenes([kinesiologo_id])
+
+
+@receiver(post_save, sender=agenda)
+@receiver(post_delete, sender=agenda)
+def invalidar_horas_disponibles(sender, instance, **kwargs):
+    """Las horas públicas del kinesiólogo (HorasDisponiblesView) se cachean por versión."""
+    invalidar('agenda', instance.kinesiologo_id)
+
+
+@receiver(post_save, sender=metodoPago)
+@receiver(post_delete, sender=metodoPago)
+def invalidar_metodos_pago(sender, instance, **kwargs):
+    invalidar('metodos_pago')
+
+
 def enviar_correo_aprobacion(kine):
     """Envía correo de aprobación al kinesiólogo"""
     asunto = '¡Tu perfil ha sido aprobado! - KineAyuda'
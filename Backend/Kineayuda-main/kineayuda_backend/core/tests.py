@@ -1,3 +1,1201 @@
-from django.test import TestCase
+import datetime
+import io
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing.connection import Listener
+from unittest import mock
 
-# Create your tests here.
+import firebase_admin
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from firebase_admin import auth, credentials
+from rest_framework.test import APIClient
+
+from core import modulo_ia
+from core.ia import registro
+from core.ia.backends import BackendTorch, crear_backend
+from core.ia.cache import CacheSentimiento
+from core.ia.cola import procesar_pendientes
+from core.ia.lotes import AgrupadorLotes
+from core.ia.servicio import ClienteServicioIA, ServicioNoDisponible, clave_servicio
+from core.models import agenda, agendaHistorica, cita, comunaChile, kinesiologo, paciente, pagoSuscripcion, regionChile, reseña
+from core.serializer import kinesiologoSerializer
+from core.views import KinesiologosPublicosView
+from core.utils.agenda import barrer_agenda, expandir_regla, publicar_recurrente, ventana_horas, zona_agenda
+from core.utils.auth_helpers import kinesio_tiene_suscripcion_activa
+from core.utils.calificaciones import puntaje_bayesiano, recalcular_por_resenas, recalcular_resumenes
+from core.utils.cache_respuestas import limpiar as limpiar_respuestas, metricas as metricas_respuestas
+from core.utils.cache_tokens import CacheTokens
+from core.utils.directorio import invalidar_facetas
+from core.utils.geocodificacion import caja, distancia_km
+from core.utils.geografia import UbicacionInvalida, normalizar_ubicacion
+from core.utils.verificador_jwt import VerificadorFirebase
+from core.utils.suscripciones import expirar_suscripciones, registrar_vencimiento
+
+PROYECTO_PRUEBA = 'kineayuda-tests'
+
+
+_numero_kinesiologo = itertools.count(1)
+
+
+def crear_kinesiologo(**datos):
+    """Kinesiólogo aprobado con los campos obligatorios; email y rut únicos salvo que se indiquen."""
+    n = next(_numero_kinesiologo)
+    return kinesiologo.objects.create(**{
+        'nombre': 'K', 'apellido': 'Prueba', 'email': f'kine{n}@example.com', 'nro_titulo': '1',
+        'rut': f'{10000000 + n}-1', 'doc_verificacion': '', 'especialidad': 'deportiva',
+        'estado_verificacion': 'aprobado', **datos,
+    })
+
+
+class _CredencialAnonima(credentials.Base):
+    def get_credential(self):
+        from google.auth.credentials import AnonymousCredentials
+        return AnonymousCredentials()
+
+
+class _ServidorCertificados:
+    """Reemplazo local del endpoint de certificados públicos de Firebase (sin red)."""
+
+    def __init__(self):
+        self.llave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'tests')])
+        ahora = datetime.datetime.now(datetime.timezone.utc)
+        certificado = (x509.CertificateBuilder()
+                       .subject_name(nombre).issuer_name(nombre)
+                       .public_key(self.llave.public_key())
+                       .serial_number(x509.random_serial_number())
+                       .not_valid_before(ahora - datetime.timedelta(days=1))
+                       .not_valid_after(ahora + datetime.timedelta(days=1))
+                       .sign(self.llave, hashes.SHA256()))
+        cuerpo = json.dumps({'kid-tests': certificado.public_bytes(serialization.Encoding.PEM).decode()}).encode()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.pedidos += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', 'public, max-age=3600')
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.pedidos = 0
+        self.http = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.http.server_port}/certs"
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+    def token(self, uid='kine-1', dura_s=3600, iat=None, proyecto=PROYECTO_PRUEBA, kid='kid-tests'):
+        iat = int(time.time()) - 5 if iat is None else iat
+        claims = {
+            'iss': f"https://securetoken.google.com/{proyecto}",
+            'aud': proyecto,
+            'sub': uid,
+            'iat': iat,
+            'auth_time': iat,
+            'exp': iat + dura_s,
+            'email': f"{uid}@example.com",
+        }
+        return jwt.encode(claims, self.llave, algorithm='RS256', headers={'kid': kid})
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+class CacheTokensTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = _ServidorCertificados()
+        cls.app = firebase_admin.initialize_app(_CredencialAnonima(), {'projectId': PROYECTO_PRUEBA}, name='tests-tokens')
+        cls.ajustes = override_settings(FIREBASE_CERTS_URL=cls.servidor.url, FIREBASE_CERTS_RUTA='',
+                                        FIREBASE_REVISAR_REVOCACION_S=0)
+        cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        firebase_admin.delete_app(cls.app)
+        cls.servidor.cerrar()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = CacheTokens(app=self.app)
+
+    def test_segunda_verificacion_sale_de_cache(self):
+        token = self.servidor.token()
+        primero = self.cache.verificar(token)
+        segundo = self.cache.verificar(token)
+        self.assertEqual(primero['uid'], 'kine-1')
+        self.assertIs(primero, segundo)
+        stats = self.cache.estadisticas()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['tasa_aciertos'], 0.5)
+        self.assertGreaterEqual(self.servidor.pedidos, 1)  # certificados del servidor local
+
+    def test_token_invalido_no_se_guarda(self):
+        with self.assertRaises(auth.InvalidIdTokenError):
+            self.cache.verificar(self.servidor.token() + 'x')
+        self.assertEqual(self.cache.estadisticas()['entradas'], 0)
+
+    def test_entrada_vence_en_exp(self):
+        token = self.servidor.token(dura_s=60)
+        self.cache.verificar(token)
+        self.cache.verificar(token)
+        with mock.patch('core.utils.cache_tokens.time.time', return_value=time.time() + 120):
+            self.cache.verificar(token)  # vencida en la cache: se verifica de nuevo
+        stats = self.cache.estadisticas()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    @override_settings(FIREBASE_TOKEN_CACHE_MAX=2)
+    def test_limite_de_entradas(self):
+        for uid in ('a', 'b', 'c'):
+            self.cache.verificar(self.servidor.token(uid=uid))
+        self.assertEqual(self.cache.estadisticas()['entradas'], 2)
+
+    @override_settings(FIREBASE_VERIFICACION_LOCAL=False)
+    def test_verificacion_con_firebase_admin(self):
+        with mock.patch('firebase_admin.auth.verify_id_token', return_value={'uid': 'x', 'exp': time.time() + 60}) as sdk:
+            self.cache.verificar('token')
+            self.cache.verificar('token')
+        sdk.assert_called_once_with('token', app=self.app)
+
+    def test_revision_de_revocacion(self):
+        iat = int(time.time()) - 5
+        token = self.servidor.token(iat=iat)
+        usuario = mock.Mock(disabled=False, tokens_valid_after_timestamp=(iat - 60) * 1000)
+        with override_settings(FIREBASE_REVISAR_REVOCACION_S=1), \
+                mock.patch('firebase_admin.auth.get_user', return_value=usuario):
+            self.cache.verificar(token)
+            self.cache.verificar(token)  # dentro del intervalo: no consulta a Firebase
+            usuario.tokens_valid_after_timestamp = (iat + 1) * 1000
+            with mock.patch('core.utils.cache_tokens.time.time', return_value=time.time() + 2):
+                with self.assertRaises(auth.RevokedIdTokenError):
+                    self.cache.verificar(token)
+        self.assertEqual(self.cache.estadisticas()['entradas'], 0)
+
+
+
+class VerificadorFirebaseTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = _ServidorCertificados()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.cerrar()
+        super().tearDownClass()
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'certs.json')
+        self.verificador = VerificadorFirebase(PROYECTO_PRUEBA, url=self.servidor.url, ruta=self.ruta)
+
+    def test_verifica_sin_red_despues_de_la_primera_descarga(self):
+        pedidos = self.servidor.pedidos
+        for uid in ('a', 'b', 'c'):
+            self.assertEqual(self.verificador.verificar(self.servidor.token(uid=uid))['uid'], uid)
+        self.assertEqual(self.servidor.pedidos, pedidos + 1)
+
+    def test_llaves_en_disco_sirven_a_otro_proceso(self):
+        self.verificador.verificar(self.servidor.token())
+        pedidos = self.servidor.pedidos
+        otro = VerificadorFirebase(PROYECTO_PRUEBA, url='http://127.0.0.1:9/sin-red', ruta=self.ruta)
+        self.assertEqual(otro.verificar(self.servidor.token())['uid'], 'kine-1')
+        self.assertEqual(self.servidor.pedidos, pedidos)
+
+    def test_rechaza_tokens_invalidos(self):
+        with self.assertRaises(auth.ExpiredIdTokenError):
+            self.verificador.verificar(self.servidor.token(iat=int(time.time()) - 7200))
+        with self.assertRaises(auth.InvalidIdTokenError):
+            self.verificador.verificar(self.servidor.token(proyecto='otro-proyecto'))
+        with self.assertRaises(auth.InvalidIdTokenError):
+            self.verificador.verificar(self.servidor.token(kid='kid-desconocido'))
+
+    def test_refresco_con_max_age_menor_que_el_margen_no_es_continuo(self):
+        # max-age 0: sin pausa mínima el hilo pediría las llaves sin parar
+        self.verificador._vence = time.time()
+        pausas = []
+
+        def dormir(segundos):
+            pausas.append(segundos)
+            if len(pausas) == 3:
+                raise InterruptedError
+
+        with mock.patch('core.utils.verificador_jwt.time.sleep', side_effect=dormir), \
+                mock.patch.object(self.verificador, 'refrescar') as refrescar, self.assertRaises(InterruptedError):
+            self.verificador._bucle_refresco()
+        self.assertEqual(refrescar.call_count, 2)
+        self.assertTrue(all(p >= 60 for p in pausas))
+
+
+class AgrupadorLotesTests(SimpleTestCase):
+
+    def agrupador(self, funcion, **opciones):
+        llamadas = []
+
+        def funcion_lote(textos):
+            llamadas.append(list(textos))
+            return funcion(textos)
+
+        return AgrupadorLotes(funcion_lote, **opciones), llamadas
+
+    def test_envios_concurrentes_comparten_una_llamada(self):
+        agrupador, llamadas = self.agrupador(lambda textos: [t.upper() for t in textos], max_lote=3, espera_ms=1000)
+        futuros = [agrupador.enviar(t) for t in ('a', 'b', 'c')]
+        self.assertEqual([f.result(timeout=5) for f in futuros], ['A', 'B', 'C'])
+        self.assertEqual(llamadas, [['a', 'b', 'c']])
+
+    def test_error_y_resultados_faltantes_llegan_a_todos(self):
+        for funcion, error in ((mock.Mock(side_effect=ValueError('falla')), ValueError),
+                               (lambda textos: textos[:1], RuntimeError)):
+            agrupador, _ = self.agrupador(funcion, max_lote=2, espera_ms=1000)
+            futuros = [agrupador.enviar(t) for t in ('a', 'b')]
+            for futuro in futuros:
+                with self.assertRaises(error):
+                    futuro.result(timeout=5)
+
+    def test_analizar_no_espera_para_siempre(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        agrupador, _ = self.agrupador(lambda textos: liberar.wait() and textos, espera_ms=0)
+        with self.assertRaises(FuturesTimeout):
+            agrupador.analizar('a', timeout=0.05)
+
+
+class ClienteServicioIATests(SimpleTestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+
+    def test_socket_inexistente_y_espera_antes_de_reintentar(self):
+        cliente = ClienteServicioIA(os.path.join(self.directorio, 'no-existe.sock'), timeout=0.1, reintento_s=30)
+        with self.assertRaises(ServicioNoDisponible):
+            cliente.detalle_batch(['hola'])
+        with mock.patch('core.ia.servicio.Client', side_effect=FileNotFoundError) as conectar:
+            with self.assertRaises(ServicioNoDisponible):
+                cliente.detalle_batch(['hola'])  # dentro de IA_SERVICIO_REINTENTO_S: ni lo intenta
+            conectar.assert_not_called()
+            with mock.patch('core.ia.servicio.time.monotonic', return_value=time.monotonic() + 31):
+                with self.assertRaises(ServicioNoDisponible):
+                    cliente.detalle_batch(['hola'])
+            conectar.assert_called_once()
+
+    def test_servicio_que_no_responde(self):
+        direccion = os.path.join(self.directorio, 'mudo.sock')
+        listener = Listener(direccion, family='AF_UNIX', authkey=clave_servicio())
+        self.addCleanup(listener.close)
+        conexiones = []
+        hilo = threading.Thread(target=lambda: conexiones.append(listener.accept()), daemon=True)
+        hilo.start()
+        cliente = ClienteServicioIA(direccion, timeout=0.1)
+        t0 = time.monotonic()
+        with self.assertRaisesMessage(ServicioNoDisponible, 'Sin respuesta del servicio IA'):
+            cliente.detalle_batch(['hola'])
+        self.assertLess(time.monotonic() - t0, 2)
+        hilo.join(1)
+        for conn in conexiones:
+            conn.close()
+
+    def test_fallback_a_inferencia_local(self):
+        direccion = os.path.join(self.directorio, 'caido.sock')
+        with self.settings(IA_SERVICIO_SOCKET=direccion, IA_SERVICIO_TIMEOUT=0.1, IA_SERVICIO_FALLBACK=True):
+            self.assertIsNone(modulo_ia._inferir_en_servicio(['hola']))  # None: se infiere en el proceso
+        with self.settings(IA_SERVICIO_SOCKET=direccion + '2', IA_SERVICIO_FALLBACK=False):
+            with self.assertRaises(ServicioNoDisponible):
+                modulo_ia._inferir_en_servicio(['hola'])
+
+
+class CargaPerezosaModeloTests(SimpleTestCase):
+
+    def test_importar_no_carga_el_modelo(self):
+        # En un intérprete nuevo: con transformers/torch bloqueados, cualquier carga al importar fallaría
+        codigo = (
+            "import sys; sys.modules['transformers'] = sys.modules['torch'] = None\n"
+            "import django; django.setup()\n"
+            "import core.modulo_ia, core.serializer, core.views\n"
+            "from core.ia import registro\n"
+            "assert not registro.modelo_cargado()\n"
+            "print('perezoso')\n"
+        )
+        proyecto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        resultado = subprocess.run([sys.executable, '-c', codigo], cwd=proyecto, capture_output=True, text=True, timeout=60)
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        self.assertEqual(resultado.stdout.strip(), 'perezoso')
+
+    def test_primer_uso_carga_una_vez(self):
+        registro.descargar_modelo()
+        self.addCleanup(registro.descargar_modelo)
+        with mock.patch('core.ia.registro._cargar', return_value=object()) as cargar:
+            self.assertFalse(modulo_ia.modelo_cargado())
+            backend = registro.obtener_backend()
+            self.assertIs(registro.obtener_backend(), backend)
+            self.assertTrue(modulo_ia.modelo_cargado())
+        cargar.assert_called_once()
+
+
+class _TokenizerFalso:
+    """Un token por palabra; pad() deja registrado a qué largo se rellenó."""
+
+    def __init__(self):
+        self.rellenos = []
+
+    def __call__(self, textos, truncation=False, max_length=None, **kwargs):
+        ids = [list(range(len(t.split())))[:max_length] for t in textos]
+        if kwargs.get('padding') == 'longest':
+            self.rellenos.append(('longest', max(len(i) for i in ids)))
+        return {'input_ids': ids}
+
+    def pad(self, codificado, padding, max_length, return_tensors):
+        assert all(len(ids) <= max_length for ids in codificado['input_ids'])
+        self.rellenos.append((padding, max_length))
+        return codificado
+
+
+class BucketsLongitudTests(SimpleTestCase):
+
+    def rellenar(self, largos, max_length, buckets=(16, 64)):
+        backend = BackendTorch(_TokenizerFalso(), mock.Mock())
+        backend.buckets = buckets
+        backend.tokenizar([' '.join(['x'] * n) for n in largos], max_length, 'pt')
+        return backend.tokenizer.rellenos[-1]
+
+    def test_lote_se_rellena_al_bucket_de_su_texto_mas_largo(self):
+        self.assertEqual(self.rellenar([3, 10], 256), ('max_length', 16))
+        self.assertEqual(self.rellenar([3, 16], 256), ('max_length', 16))
+        self.assertEqual(self.rellenar([3, 17], 256), ('max_length', 64))
+
+    def test_respeta_max_length(self):
+        self.assertEqual(self.rellenar([100], 128), ('max_length', 128))  # ningún bucket alcanza
+        self.assertEqual(self.rellenar([40], 32), ('max_length', 32))     # el bucket 64 supera max_length
+        self.assertEqual(self.rellenar([300], 256), ('max_length', 256))
+
+    def test_sin_buckets_rellena_al_mas_largo(self):
+        self.assertEqual(self.rellenar([3, 10], 256, buckets=()), ('longest', 10))
+
+
+class CrearBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        # transformers falso: solo importa qué se carga y con qué revisión
+        self.transformers = mock.Mock()
+        self.transformers.AutoConfig.from_pretrained.return_value.id2label = {0: 'NEG', 1: 'NEU', 2: 'POS'}
+        parche = mock.patch.dict(sys.modules, {'transformers': self.transformers})
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def crear(self, tipo, **kwargs):
+        with mock.patch('core.ia.backends.configurar_hilos'):
+            return crear_backend(tipo, 'modelo/prueba', 'c' * 40, **kwargs)
+
+    def test_torch(self):
+        backend = self.crear('torch', buckets=(64, 16))
+        self.assertIs(type(backend), BackendTorch)
+        self.assertIs(backend.model, self.transformers.AutoModelForSequenceClassification.from_pretrained.return_value)
+        self.transformers.AutoModelForSequenceClassification.from_pretrained.assert_called_once_with('modelo/prueba', revision='c' * 40)
+        self.assertEqual(backend.buckets, (16, 64))
+
+    def test_torch_int8(self):
+        with mock.patch('core.ia.backends.BackendTorchInt8') as int8:
+            self.assertIs(self.crear('torch_int8'), int8.return_value)
+        int8.assert_called_once()
+
+    def test_onnx_no_carga_los_pesos_de_torch(self):
+        with mock.patch('core.ia.backends.BackendOnnx') as onnx:
+            self.assertIs(self.crear('onnx', ruta_onnx='/tmp/modelo.onnx', hilos=2), onnx.return_value)
+        onnx.assert_called_once_with(self.transformers.AutoTokenizer.from_pretrained.return_value, '/tmp/modelo.onnx',
+                                     {0: 'NEG', 1: 'NEU', 2: 'POS'}, hilos=2)
+        self.transformers.AutoModelForSequenceClassification.from_pretrained.assert_not_called()
+
+    def test_backend_desconocido(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "no 'tensorflow'"):
+            self.crear('tensorflow')
+        self.transformers.AutoTokenizer.from_pretrained.assert_not_called()
+
+    def test_backend_desconocido_en_settings(self):
+        registro.descargar_modelo()
+        self.addCleanup(registro.descargar_modelo)
+        with self.settings(IA_BACKEND='tensorflow', IA_MODELO_REVISION='c' * 40):
+            with self.assertRaises(ImproperlyConfigured):
+                registro.obtener_backend()
+        self.assertFalse(registro.modelo_cargado())
+
+
+class RevisionModeloTests(SimpleTestCase):
+    """La clave de la cache de sentimiento y modelo_sentimiento usan el commit, no el nombre de la rama."""
+
+    def setUp(self):
+        registro.descargar_modelo()
+        self.addCleanup(registro.descargar_modelo)
+
+    def test_rama_se_resuelve_al_commit(self):
+        sha = 'a' * 40
+        with self.settings(IA_MODELO_REVISION='main'), \
+                mock.patch('core.ia.registro._resolver_revision', return_value=sha) as resolver:
+            self.assertEqual(registro.revision_modelo(), sha)
+            self.assertIn(f'@{sha}/', registro.identificador_modelo())
+        self.assertEqual(resolver.call_count, 1)  # una vez por proceso
+        with self.settings(IA_MODELO_REVISION='b' * 40), mock.patch('core.ia.registro._resolver_revision') as resolver:
+            self.assertEqual(registro.revision_modelo(), 'b' * 40)
+        resolver.assert_not_called()
+
+
+@override_settings(IA_MODELO_REVISION='c' * 40, IA_CACHE_MAX=2, IA_CACHE_BACKEND='', CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'ia': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ia-tests'},
+})
+class CacheSentimientoTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = CacheSentimiento()
+
+    def test_lru_acotado_y_contadores(self):
+        for texto in ('a', 'b'):
+            self.cache.guardar(texto, {'sentimiento': texto})
+        self.assertEqual(self.cache.obtener('a'), {'sentimiento': 'a'})  # 'a' pasa a ser la más reciente
+        self.cache.guardar('c', {'sentimiento': 'c'})                     # sale 'b'
+        self.assertIsNone(self.cache.obtener('b'))
+        self.assertEqual(self.cache.obtener('c'), {'sentimiento': 'c'})
+        stats = self.cache.estadisticas()
+        self.assertEqual((stats['entradas_memoria'], stats['hits_memoria'], stats['misses']), (2, 2, 1))
+        self.assertEqual(stats['tasa_aciertos'], 0.667)
+        with self.settings(IA_CACHE_MAX=0):
+            self.cache.limpiar()
+            self.cache.guardar('a', {'sentimiento': 'a'})
+            self.assertIsNone(self.cache.obtener('a'))
+
+    def test_clave_normaliza_texto(self):
+        self.cache.guardar('Muy  buena\natención', {'sentimiento': 'positiva'})
+        self.assertEqual(self.cache.obtener(' Muy buena atencio\u0301n '), {'sentimiento': 'positiva'})
+        self.assertIsNone(self.cache.obtener('muy buena atención'))  # mayúsculas sí cuentan para el tokenizer
+        with self.settings(IA_MODELO_REVISION='d' * 40):
+            self.assertIsNone(self.cache.obtener('Muy buena atención'))  # otro modelo, otra clave
+
+    def test_nivel_compartido(self):
+        with self.settings(IA_CACHE_BACKEND='ia'):
+            self.cache.guardar('bien', {'sentimiento': 'positiva'})  # escribe también en el compartido
+            otro_worker = CacheSentimiento()
+            self.assertEqual(otro_worker.obtener('bien'), {'sentimiento': 'positiva'})
+            self.assertEqual(otro_worker.obtener('bien'), {'sentimiento': 'positiva'})  # ya en su LRU
+            stats = otro_worker.estadisticas()
+            self.assertEqual((stats['hits_compartido'], stats['hits_memoria']), (1, 1))
+        self.assertIsNone(CacheSentimiento().obtener('bien'))  # sin IA_CACHE_BACKEND solo memoria
+
+
+class ConsultasPorRequestTests(TestCase):
+    """
+    Cantidad de queries por endpoint autenticado: el kinesiologo y su suscripción
+    se resuelven una sola vez por request, sin importar cuántos permisos/helpers
+    los consulten.
+    """
+
+    def setUp(self):
+        self.kx = crear_kinesiologo(nombre='Ana', apellido='Pérez', email='ana@example.com', firebase_ide='uid-ana',
+                                    rut='11111111-1')
+        vence = timezone.now() + datetime.timedelta(days=30)
+        pagoSuscripcion.objects.create(kinesiologo=self.kx, monto=4990, estado='pagado', fecha_expiracion=vence)
+        kinesiologo.objects.filter(pk=self.kx.pk).update(suscripcion_vence=vence)
+        inicio = timezone.now() + datetime.timedelta(days=1)
+        self.slot = agenda.objects.create(kinesiologo=self.kx, inicio=inicio, fin=inicio + datetime.timedelta(hours=1))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer token-de-prueba')
+        verificar = mock.patch('core.authentication.cache_tokens.verificar',
+                               return_value={'uid': 'uid-ana', 'email': 'ana@example.com'})
+        verificar.start()
+        self.addCleanup(verificar.stop)
+
+    def _horario(self, dias):
+        inicio = timezone.now() + datetime.timedelta(days=dias)
+        return {'inicio': inicio.isoformat(), 'fin': (inicio + datetime.timedelta(hours=1)).isoformat()}
+
+    def test_agenda_listar(self):
+        # kinesiologo + horarios
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/agendas/').status_code, 200)
+
+    def test_agenda_crear(self):
+        # kinesiologo + savepoint + insert + release: el solapamiento lo revisa la restricción de la BD
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.post('/api/agendas/', self._horario(2), format='json').status_code, 201)
+
+    def test_agenda_solapada(self):
+        inicio = self.slot.inicio + datetime.timedelta(minutes=30)
+        r = self.client.post('/api/agendas/', {'inicio': inicio.isoformat(),
+                                               'fin': (inicio + datetime.timedelta(hours=1)).isoformat()}, format='json')
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json(), ['El horario solapa con otro existente.'])
+        # Uno que empieza justo cuando termina el otro no solapa
+        r = self.client.post('/api/agendas/', {'inicio': self.slot.fin.isoformat(),
+                                               'fin': (self.slot.fin + datetime.timedelta(hours=1)).isoformat()}, format='json')
+        self.assertEqual(r.status_code, 201)
+
+    def test_agenda_recurrente(self):
+        # kinesiologo + solapamiento + savepoint + un insert con todos los horarios + release
+        desde = timezone.localdate() + datetime.timedelta(days=7)
+        regla = {'dias': [0, 2, 4], 'hora_inicio': '09:00', 'hora_fin': '13:00', 'duracion_minutos': 45,
+                 'desde': desde.isoformat(), 'hasta': (desde + datetime.timedelta(days=30)).isoformat()}
+        with self.assertNumQueries(5):
+            r = self.client.post('/api/agendas/recurrente/', regla, format='json')
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json()['creados'], agenda.objects.filter(kinesiologo=self.kx).count() - 1)
+
+    def test_agenda_actualizar(self):
+        # kinesiologo + horario + savepoint + update + release
+        with self.assertNumQueries(5):
+            r = self.client.patch(f'/api/agendas/{self.slot.id}/', self._horario(3), format='json')
+            self.assertEqual(r.status_code, 200)
+
+    def test_agenda_eliminar(self):
+        # kinesiologo + horario + delete
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.delete(f'/api/agendas/{self.slot.id}/').status_code, 204)
+
+    def test_me(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/me/').status_code, 200)
+
+    def test_estado_suscripcion(self):
+        # la suscripción sale de kinesiologo.suscripcion_vence
+        with self.assertNumQueries(1):
+            r = self.client.get('/api/pagos/estado/')
+        self.assertTrue(r.data['activa'])
+
+    def test_citas_listar(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/citas/').status_code, 200)
+
+    def test_documentos_listar(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/documentos/').status_code, 200)
+
+
+class SuscripcionesTests(TestCase):
+
+    def setUp(self):
+        self.kx = crear_kinesiologo(nombre='Ana', apellido='Pérez', email='ana@example.com', firebase_ide='uid-ana',
+                                    rut='11111111-1', estado_verificacion='pendiente')
+
+    def test_registrar_vencimiento_no_retrocede(self):
+        ahora = timezone.now()
+        registrar_vencimiento(self.kx.id, ahora + datetime.timedelta(days=30))
+        registrar_vencimiento(self.kx.id, ahora + datetime.timedelta(days=10))
+        self.kx.refresh_from_db()
+        self.assertEqual(self.kx.suscripcion_vence, ahora + datetime.timedelta(days=30))
+        self.assertTrue(kinesio_tiene_suscripcion_activa(self.kx))
+
+    def test_expirar_suscripciones(self):
+        ahora = timezone.now()
+        for dias in (-3, -1, 5):
+            pagoSuscripcion.objects.create(kinesiologo=self.kx, monto=4990, estado='pagado',
+                                           fecha_expiracion=ahora + datetime.timedelta(days=dias))
+        self.assertEqual(expirar_suscripciones(tamano_lote=1), 2)
+        self.assertEqual(pagoSuscripcion.objects.filter(estado='expirado').count(), 2)
+        self.assertEqual(expirar_suscripciones(), 0)
+
+
+class DirectorioPublicoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        kinesiologo.objects.bulk_create([
+            kinesiologo(
+                nombre=f'Kine {i}', apellido=f'Apellido {i % 4}', email=f'k{i}@example.com',
+                firebase_ide=f'uid-{i}', nro_titulo=str(i), rut=f'{10000000 + i}-1', doc_verificacion='',
+                especialidad='deportiva', estado_verificacion='aprobado', precio_consulta=20000 + (i % 3) * 5000,
+            )
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        limpiar_respuestas()  # la cache no vuelve atrás con el rollback de cada test
+
+    def _recorrer(self, url):
+        ids = []
+        while url:
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            ids += [k['id'] for k in r.json()['results']]
+            url = r.json()['next']
+        return ids
+
+    def test_cursor_recorre_todo_sin_duplicados(self):
+        for ordering in KinesiologosPublicosView.ORDENAMIENTOS:
+            todos = [k['id'] for k in self.client.get(f'/api/public/kinesiologos/?ordering={ordering}').json()]
+            paginados = self._recorrer(f'/api/public/kinesiologos/?ordering={ordering}&page_size=7')
+            self.assertEqual(paginados, todos, ordering)
+            self.assertEqual(len(set(paginados)), 25)
+
+    def test_proyeccion_de_campos(self):
+        r = self.client.get('/api/public/kinesiologos/?fields=id,nombre,rut&page_size=1')
+        self.assertEqual(set(r.json()['results'][0]), {'id', 'nombre'})
+
+    def test_sin_datos_privados(self):
+        kine = self.client.get('/api/public/kinesiologos/').json()[0]
+        self.assertFalse({'rut', 'email', 'firebase_ide', 'doc_verificacion'} & set(kine))
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get('/api/public/kinesiologos/?cursor=xx').status_code, 404)
+
+
+class FacetasDirectorioTests(TestCase):
+
+    def setUp(self):
+        invalidar_facetas()
+        for i, (especialidad, comuna, domicilio) in enumerate([('deportiva', 'Ñuñoa', True), ('respiratoria', '', False),
+                                                               ('deportiva', 'Providencia', False)]):
+            crear_kinesiologo(especialidad=especialidad, comuna=comuna, region='Metropolitana',
+                              atiende_domicilio=domicilio, precio_consulta=20000 + i * 1000)
+
+        self.rm = regionChile.objects.get(codigo='RM')
+        self.nunoa, self.providencia = comunaChile.objects.get(nombre='Ñuñoa'), comunaChile.objects.get(nombre='Providencia')
+
+    def test_una_query_y_luego_cache(self):
+        with self.assertNumQueries(1):
+            r = self.client.get('/api/public/kinesiologos/estadisticas/')
+        self.assertEqual(r.json(), {
+            'especialidades': ['deportiva', 'respiratoria'],
+            'comunas': [{'id': self.providencia.id, 'nombre': 'Providencia', 'region': self.rm.id},
+                        {'id': self.nunoa.id, 'nombre': 'Ñuñoa', 'region': self.rm.id}],
+            'regiones': [{'id': self.rm.id, 'nombre': 'Metropolitana de Santiago'}],
+            'precioRango': {'min': 20000, 'max': 22000},
+            'modalidades': {'domicilio': 1, 'consulta': 3},
+        })
+        with self.assertNumQueries(0):
+            self.client.get('/api/public/kinesiologos/estadisticas/')
+
+    def test_etag_y_invalidacion(self):
+        r = self.client.get('/api/public/kinesiologos/estadisticas/')
+        etag = r['ETag']
+        self.assertEqual(self.client.get('/api/public/kinesiologos/estadisticas/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        kinesiologo.objects.filter(comuna='Ñuñoa').first().delete()
+        r = self.client.get('/api/public/kinesiologos/estadisticas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], etag)
+
+
+class BusquedaDirectorioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        datos = [
+            ('José', 'Núñez', 'Kinesiología deportiva', 'Ñuñoa', 'Metropolitana'),
+            ('María', 'González', 'Kinesiología respiratoria', 'Valparaíso', 'Valparaíso'),
+            ('Pedro', 'Soto', 'Neurológica', 'Concepción', 'Biobío'),
+        ]
+        for nombre, apellido, especialidad, comuna, region in datos:
+            crear_kinesiologo(nombre=nombre, apellido=apellido, especialidad=especialidad, comuna=comuna, region=region)
+
+    def setUp(self):
+        limpiar_respuestas()
+
+    def buscar(self, q):
+        return [k['apellido'] for k in self.client.get('/api/public/kinesiologos/', {'q': q}).json()]
+
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.buscar('nunez'), ['Núñez'])
+        self.assertEqual(self.buscar('VALPARAISO'), ['González'])
+
+    def test_stemming_y_trigramas(self):
+        self.assertEqual(self.buscar('deportivo'), ['Núñez'])
+        self.assertEqual(self.buscar('respirat'), ['González'])
+        self.assertEqual(self.buscar('concepion'), ['Soto'])
+
+    def test_relevancia_y_paginacion(self):
+        # Ambos son de kinesiología; el apellido pesa más, así que Núñez va primero
+        self.assertEqual(self.buscar('kinesiologia nunez')[0], 'Núñez')
+        primera = self.client.get('/api/public/kinesiologos/', {'q': 'kinesiologia', 'page_size': 1}).json()
+        segunda = self.client.get(primera['next']).json()
+        self.assertEqual(len(primera['results']) + len(segunda['results']), 2)
+        self.assertIsNone(segunda['next'])
+        self.assertEqual(self.buscar('xyzzy'), [])
+
+
+class GeografiaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kine = crear_kinesiologo(nombre='Ana', apellido='Rojas', comuna='nunoa', region='Region Metropolitana')
+        cls.otro = crear_kinesiologo(nombre='Luis', apellido='Soto', comuna='Temuco', region='Araucanía')
+
+    def setUp(self):
+        limpiar_respuestas()
+
+    def test_catalogo_completo(self):
+        self.assertEqual(regionChile.objects.count(), 16)
+        self.assertEqual(comunaChile.objects.count(), 346)
+
+    def test_serializer_normaliza(self):
+        s = kinesiologoSerializer(self.kine, data={'comuna': 'VIÑA DEL MAR', 'region': 'Región de Valparaíso'}, partial=True)
+        self.assertTrue(s.is_valid(), s.errors)
+        kx = s.save()
+        self.assertEqual((kx.comuna, kx.region), ('Viña del Mar', 'Valparaíso'))
+        self.assertEqual(kx.comuna_ref.nombre, 'Viña del Mar')
+        self.assertEqual(kx.region_ref.codigo, 'V')
+        # Solo la comuna: la región se deduce
+        s = kinesiologoSerializer(self.kine, data={'comuna': 'Temuco', 'region': ''}, partial=True)
+        self.assertTrue(s.is_valid(), s.errors)
+        self.assertEqual(s.save().region, 'La Araucanía')
+
+    def test_serializer_rechaza_desconocidas(self):
+        s = kinesiologoSerializer(self.kine, data={'comuna': 'Gotham'}, partial=True)
+        self.assertFalse(s.is_valid())
+        self.assertIn('comuna', s.errors)
+        s = kinesiologoSerializer(self.kine, data={'comuna': 'Temuco', 'region': 'Maule'}, partial=True)
+        self.assertFalse(s.is_valid())
+        self.assertEqual(set(s.errors), {'comuna'})
+        s = kinesiologoSerializer(self.kine, data={'comuna': 'Temuco', 'region': 'Mordor'}, partial=True)
+        self.assertFalse(s.is_valid())
+        self.assertEqual(set(s.errors), {'region'})
+        with self.assertRaises(UbicacionInvalida) as error:
+            normalizar_ubicacion('Maule', 'Temuco')
+        self.assertEqual(error.exception.campo, 'comuna')
+
+    def test_orm_vincula_catalogo(self):
+        self.assertEqual(self.kine.comuna_ref.nombre, 'Ñuñoa')
+        self.assertEqual(self.kine.region_ref.codigo, 'RM')
+
+    def test_filtros_por_id_o_nombre(self):
+        nunoa = comunaChile.objects.get(nombre='Ñuñoa')
+        for params in ({'comuna': nunoa.id}, {'comuna': 'ñuñoa'}, {'region': nunoa.region_id}, {'region': 'RM'}):
+            r = self.client.get('/api/public/kinesiologos/', params)
+            self.assertEqual([k['apellido'] for k in r.json()], ['Rojas'], params)
+        self.assertEqual(self.client.get('/api/public/kinesiologos/', {'comuna': 'Gotham'}).json(), [])
+        self.assertEqual(self.client.get('/api/public/kinesiologos/', {'comuna': 99999}).json(), [])
+
+
+class CercaniaTests(TestCase):
+    NUNOA = (-33.45, -70.60)
+    MAIPU = (-33.51, -70.76)
+
+    @classmethod
+    def setUpTestData(cls):
+        datos = [
+            ('Rojas', 'Ñuñoa', False, 10),
+            ('Soto', 'Providencia', True, 5),
+            ('Díaz', 'Maipú', True, 20),
+            ('Pérez', 'Valparaíso', True, 100),
+        ]
+        for apellido, comuna, domicilio, radio in datos:
+            crear_kinesiologo(apellido=apellido, comuna=comuna, atiende_domicilio=domicilio, radio_domicilio_km=radio)
+
+    def setUp(self):
+        limpiar_respuestas()
+
+    def cerca(self, punto, **params):
+        params['cerca'] = f'{punto[0]},{punto[1]}'
+        return self.client.get('/api/public/kinesiologos/', params)
+
+    def test_geocodifica_con_centroide(self):
+        kx = kinesiologo.objects.get(apellido='Rojas')
+        self.assertEqual((kx.latitud, kx.longitud), self.NUNOA)
+        s = kinesiologoSerializer(kx, data={'comuna': 'Maipú'}, partial=True)
+        self.assertTrue(s.is_valid(), s.errors)
+        self.assertEqual((s.save().latitud, kx.longitud), self.MAIPU)
+
+    def test_radio_y_orden_por_distancia(self):
+        r = self.cerca(self.NUNOA, radio_km=10).json()
+        self.assertEqual([k['apellido'] for k in r], ['Rojas', 'Soto'])
+        self.assertEqual(r[0]['distancia_km'], 0)
+        self.assertAlmostEqual(r[1]['distancia_km'], distancia_km(*self.NUNOA, -33.43, -70.61), places=2)
+        self.assertEqual([k['apellido'] for k in self.cerca(self.NUNOA, radio_km=20).json()], ['Rojas', 'Soto', 'Díaz'])
+
+    def test_domicilio_dentro_del_radio_de_cada_uno(self):
+        r = self.cerca(self.MAIPU, radio_km=100, atiende_domicilio='true').json()
+        # Soto (Providencia) está a ~15 km pero solo va a 5 km; Pérez (Valparaíso) a ~95 km y va hasta 100
+        self.assertEqual([k['apellido'] for k in r], ['Díaz', 'Pérez'])
+
+    def test_paginacion_por_distancia(self):
+        primera = self.cerca(self.NUNOA, radio_km=50, page_size=2).json()
+        segunda = self.client.get(primera['next']).json()
+        self.assertEqual([k['apellido'] for k in primera['results'] + segunda['results']], ['Rojas', 'Soto', 'Díaz'])
+        self.assertIsNone(segunda['next'])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/public/kinesiologos/', {'cerca': 'x,1'}).status_code, 400)
+        self.assertEqual(self.cerca((123, 0)).status_code, 400)
+
+    def test_caja_contiene_el_circulo(self):
+        lat_min, lat_max, lon_min, lon_max = caja(*self.NUNOA, 10)
+        self.assertAlmostEqual(distancia_km(*self.NUNOA, lat_max, self.NUNOA[1]), 10, places=6)
+        self.assertGreaterEqual(distancia_km(*self.NUNOA, self.NUNOA[0], lon_max), 10)
+        # Cerca del polo, con un radio de más de un cuarto de vuelta o al cruzar el antimeridiano la
+        # caja tiene que contener la longitud opuesta
+        for lat, lon, radio, opuesta in ((89.99, -70, 10, 150), (-38.7, -72.6, 20000, 150), (-17, 179.9, 50, -179.9)):
+            _, _, lon_min, lon_max = caja(lat, lon, radio)
+            self.assertTrue(lon_min <= opuesta <= lon_max, (lat, lon, radio))
+
+
+@override_settings(RATING_MEDIA_PREVIA=4.0, RATING_PESO_PREVIO=5)
+class RatingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pac = paciente.objects.create(nombre='P', apellido='Q', rut='60000000-1', email='p@example.com',
+                                          telefono='1', fecha_nacimiento=datetime.date(1990, 1, 1))
+        cls.kines = [crear_kinesiologo(apellido=apellido) for apellido in ['Uno', 'Dos', 'Tres']]
+
+    def setUp(self):
+        limpiar_respuestas()
+
+    def resenar(self, kx, calificacion, sentimiento=None):
+        c = cita.objects.create(paciente=self.pac, kinesiologo=kx, fecha_hora=timezone.now(), estado='completada')
+        return reseña.objects.create(cita=c, comentario='ok', calificacion=calificacion, sentimiento=sentimiento)
+
+    def test_incremental_y_bayesiano(self):
+        uno = self.kines[0]
+        self.resenar(uno, 5)
+        self.resenar(uno, 3)
+        uno.refresh_from_db()
+        self.assertEqual((uno.resenas_total, uno.resenas_suma_calificaciones), (2, 8))
+        self.assertEqual(uno.rating, puntaje_bayesiano(2, 8))
+        self.assertEqual(uno.rating, Decimal('4.000'))  # (5*4 + 8) / 7
+
+    def test_sentimiento_y_reconciliacion(self):
+        dos = self.kines[1]
+        resenas = [self.resenar(dos, 4), self.resenar(dos, 2)]
+        for r, s in zip(resenas, ['positiva', 'negativa']):
+            r.sentimiento = s
+        reseña.objects.bulk_update(resenas, ['sentimiento'])  # como la cola de IA
+        recalcular_por_resenas([r.id for r in resenas])
+        dos.refresh_from_db()
+        self.assertEqual((dos.resenas_positivas, dos.resenas_negativas, dos.resenas_neutrales), (1, 1, 0))
+        # Un resumen desalineado (p.ej. SQL a mano) se corrige y el resto no se toca
+        kinesiologo.objects.filter(id=dos.id).update(resenas_total=9, rating=1)
+        self.assertEqual(recalcular_resumenes(), 1)
+        dos.refresh_from_db()
+        self.assertEqual((dos.resenas_total, dos.rating), (2, puntaje_bayesiano(2, 6)))
+        resenas[0].delete()
+        dos.refresh_from_db()
+        self.assertEqual((dos.resenas_total, dos.resenas_positivas), (1, 0))
+
+    def test_rescore_reconcilia_resumen(self):
+        tres = self.kines[2]
+        resenas = [self.resenar(tres, 5), self.resenar(tres, 1)]
+        detalle = lambda s: {'sentimiento': s, 'confianza': 0.9, 'probabilidades': {s: 0.9}, 'modelo': 'm'}
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('core.management.commands.rescore_resenas._puntuar',
+                           return_value=[detalle('positiva'), detalle('negativa')]):
+            call_command('rescore_resenas', checkpoint=os.path.join(tmp, 'ck'), stdout=io.StringIO())
+        self.assertEqual(list(reseña.objects.filter(id__in=[r.id for r in resenas]).order_by('id')
+                              .values_list('sentimiento', flat=True)), ['positiva', 'negativa'])
+        tres.refresh_from_db()
+        self.assertEqual((tres.resenas_positivas, tres.resenas_negativas, tres.resenas_total), (1, 1, 2))
+
+    def test_orden_y_filtro_en_directorio(self):
+        uno, dos, _ = self.kines
+        for _ in range(10):
+            self.resenar(uno, 5)
+        self.resenar(dos, 5)  # una sola reseña: queda cerca de la media previa
+        r = self.client.get('/api/public/kinesiologos/', {'ordering': '-rating'}).json()
+        self.assertEqual([k['apellido'] for k in r], ['Uno', 'Dos', 'Tres'])
+        self.assertEqual(r[0]['calificacion_promedio'], 5.0)
+        self.assertIsNone(r[2]['calificacion_promedio'])
+        r = self.client.get('/api/public/kinesiologos/', {'rating_min': '4.5'}).json()
+        self.assertEqual([k['apellido'] for k in r], ['Uno'])
+        primera = self.client.get('/api/public/kinesiologos/', {'ordering': '-rating', 'page_size': 2}).json()
+        self.assertEqual([k['apellido'] for k in self.client.get(primera['next']).json()['results']], ['Tres'])
+        self.assertEqual(self.client.get('/api/public/kinesiologos/', {'rating_min': 'x'}).status_code, 400)
+
+
+@override_settings(IA_SENTIMIENTO_MODO='cola')
+class ColaSentimientoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kx = crear_kinesiologo(apellido='Cola')
+        cls.pac = paciente.objects.create(nombre='P', apellido='Q', rut='75000001-1', email='pcola@example.com',
+                                          telefono='1', fecha_nacimiento=datetime.date(1990, 1, 1))
+
+    def setUp(self):
+        # Cerraría la conexión de la transacción del test (como hace el cliente de pruebas con request_started)
+        parche = mock.patch('core.ia.cola.close_old_connections')
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def resenar(self, comentario):
+        c = cita.objects.create(paciente=self.pac, kinesiologo=self.kx, fecha_hora=timezone.now(), estado='completada')
+        return reseña.objects.create(cita=c, comentario=comentario, calificacion=4)
+
+    @staticmethod
+    def detalles(textos):
+        return [{'sentimiento': 'positiva' if 'bien' in t else 'negativa', 'confianza': 0.9,
+                 'probabilidades': {}, 'modelo': 'm'} for t in textos]
+
+    def estados(self):
+        return dict(reseña.objects.values_list('comentario', 'estado_sentimiento'))
+
+    def test_drena_en_lotes_e_infiere_con_las_filas_tomadas(self):
+        for comentario in ('bien', 'mal', 'muy bien'):
+            self.resenar(comentario)
+        vistos = []
+
+        def inferir(textos):
+            # Durante la inferencia el lote ya está tomado y ningún bloqueo sigue abierto
+            vistos.append(dict(self.estados()))
+            return self.detalles(textos)
+
+        with mock.patch('core.modulo_ia.analizar_sentimiento_detalle_batch', side_effect=inferir) as batch:
+            self.assertEqual(procesar_pendientes(tamano_lote=2), 3)
+        self.assertEqual(batch.call_count, 2)
+        self.assertEqual(vistos[0], {'bien': 'procesando', 'mal': 'procesando', 'muy bien': 'pendiente'})
+        self.assertEqual(dict(reseña.objects.values_list('comentario', 'sentimiento')),
+                         {'bien': 'positiva', 'mal': 'negativa', 'muy bien': 'positiva'})
+        self.assertFalse(reseña.objects.filter(sentimiento_reclamado__isnull=False).exists())
+        self.kx.refresh_from_db()
+        self.assertEqual((self.kx.resenas_positivas, self.kx.resenas_negativas), (2, 1))
+        r = self.client.get(f'/api/public/resenas/{reseña.objects.get(comentario="mal").id}/sentimiento/').json()
+        self.assertEqual((r['sentimiento'], r['estado_sentimiento']), ('negativa', 'procesado'))
+
+    def test_falla_del_modelo_devuelve_el_lote_a_la_cola(self):
+        self.resenar('bien')
+        with mock.patch('core.modulo_ia.analizar_sentimiento_detalle_batch', side_effect=RuntimeError('sin modelo')):
+            self.assertEqual(procesar_pendientes(), 0)
+        with mock.patch('core.modulo_ia.analizar_sentimiento_detalle_batch', return_value=[]):
+            self.assertEqual(procesar_pendientes(), 0)  # menos resultados que reseñas
+        self.assertEqual(self.estados(), {'bien': 'pendiente'})
+
+    def test_reclamo_vencido_se_retoma(self):
+        vieja, tomada = self.resenar('bien'), self.resenar('mal')
+        reseña.objects.filter(id=vieja.id).update(
+            estado_sentimiento='procesando', sentimiento_reclamado=timezone.now() - datetime.timedelta(hours=1))
+        reseña.objects.filter(id=tomada.id).update(estado_sentimiento='procesando', sentimiento_reclamado=timezone.now())
+        with self.settings(IA_COLA_RECLAMO_S=300), \
+                mock.patch('core.modulo_ia.analizar_sentimiento_detalle_batch', side_effect=self.detalles):
+            self.assertEqual(procesar_pendientes(), 1)
+        self.assertEqual(self.estados(), {'bien': 'procesado', 'mal': 'procesando'})
+
+    def test_comando_procesar_sentimientos(self):
+        self.resenar('bien')
+        error = self.resenar('mal')
+        reseña.objects.filter(id=error.id).update(estado_sentimiento='error')
+        salida = io.StringIO()
+        with mock.patch('core.modulo_ia.analizar_sentimiento_detalle_batch', side_effect=self.detalles):
+            call_command('procesar_sentimientos', backfill=True, stdout=salida)
+        self.assertIn('1 reseñas vueltas a encolar', salida.getvalue())
+        self.assertEqual(self.estados(), {'bien': 'procesado', 'mal': 'procesado'})
+
+
+class CacheRespuestasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kx = crear_kinesiologo(apellido='Cache')
+        cls.pac = paciente.objects.create(nombre='P', apellido='Q', rut='70000001-1', email='pc@example.com',
+                                          telefono='1', fecha_nacimiento=datetime.date(1990, 1, 1))
+
+    def setUp(self):
+        limpiar_respuestas()
+        metricas_respuestas.limpiar()
+
+    def crear_slot(self, dias):
+        inicio = timezone.now() + datetime.timedelta(days=dias)
+        return agenda.objects.create(kinesiologo=self.kx, inicio=inicio, fin=inicio + datetime.timedelta(hours=1))
+
+    def test_acierto_y_304(self):
+        self.crear_slot(1)
+        url = f'/api/public/kinesiologos/{self.kx.id}/horas/'
+        primera = self.client.get(url)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url)
+            no_modificada = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+        self.assertEqual(no_modificada.status_code, 304)
+        self.assertEqual(no_modificada.content, b'')
+        stats = metricas_respuestas.estadisticas()['vistas']['HorasDisponiblesView']
+        self.assertEqual((stats['fallos'], stats['aciertos'], stats['no_modificados']), (1, 1, 1))
+        self.assertEqual(stats['tasa_aciertos'], 0.667)
+
+    def test_escritura_invalida_solo_ese_recurso(self):
+        url = f'/api/public/kinesiologos/{self.kx.id}/horas/'
+        etag = self.client.get(url)['ETag']
+        etag_directorio = self.client.get('/api/public/kinesiologos/')['ETag']
+        slot = self.crear_slot(2)
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([h['id'] for h in r.json()], [slot.id])
+        self.assertEqual(self.client.get('/api/public/kinesiologos/', HTTP_IF_NONE_MATCH=etag_directorio).status_code, 304)
+
+    def test_resena_invalida_resenas_y_directorio(self):
+        url = f'/api/public/kinesiologos/{self.kx.id}/resenas/'
+        self.assertEqual(self.client.get(url).json(), [])
+        self.client.get('/api/public/kinesiologos/')
+        c = cita.objects.create(paciente=self.pac, kinesiologo=self.kx, fecha_hora=timezone.now(), estado='completada')
+        reseña.objects.create(cita=c, comentario='ok', calificacion=5)
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        self.assertEqual(self.client.get('/api/public/kinesiologos/').json()[0]['resenas_total'], 1)
+
+    @override_settings(RESPUESTAS_CACHE_TTL=0, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'web'},
+        'otro': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'otro'},
+    })
+    def test_escritura_de_otro_proceso_no_deja_304_viejo(self):
+        url = f'/api/public/kinesiologos/{self.kx.id}/resenas/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)  # mismo contenido
+        # La escritura invalida en la cache de otro proceso (p.ej. un comando): la versión de este no cambia
+        with self.settings(RESPUESTAS_CACHE_BACKEND='otro'):
+            c = cita.objects.create(paciente=self.pac, kinesiologo=self.kx, fecha_hora=timezone.now(), estado='completada')
+            reseña.objects.create(cita=c, comentario='ok', calificacion=5)
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json()), 1)
+
+    def test_estadisticas_conserva_su_etag(self):
+        r = self.client.get('/api/public/kinesiologos/estadisticas/')
+        self.assertIn('Last-Modified', r)
+        self.assertNotIn('KinesiologosPublicosView', metricas_respuestas.estadisticas()['vistas'])
+
+
+class AgendaRecurrenteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kx = crear_kinesiologo(apellido='Agenda')
+
+    def regla(self, **cambios):
+        lunes = timezone.localdate() + datetime.timedelta(days=7 - timezone.localdate().weekday())
+        regla = dict(dias=[0, 3], hora_inicio=datetime.time(9), hora_fin=datetime.time(12), duracion_minutos=45,
+                     desde=lunes, hasta=lunes + datetime.timedelta(days=13), zona=zona_agenda('America/Santiago'))
+        regla.update(cambios)
+        return expandir_regla(**regla)
+
+    def test_expansion(self):
+        horarios = self.regla()
+        # 2 lunes + 2 jueves, 4 bloques de 45 min entre 9:00 y 12:00
+        self.assertEqual(len(horarios), 16)
+        self.assertEqual({h[0].weekday() for h in horarios}, {0, 3})
+        self.assertEqual(horarios[0][0].time(), datetime.time(9))
+        self.assertEqual(horarios[3][1].time(), datetime.time(12))
+        lunes = horarios[0][0].date()
+        self.assertEqual(len(self.regla(excluir=[lunes], pausa_minutos=15)), 9)  # 3 días x 3 bloques
+
+    def test_conflictos_por_horario(self):
+        horarios = self.regla()
+        ocupado = agenda.objects.create(kinesiologo=self.kx, inicio=horarios[1][0] + datetime.timedelta(minutes=30),
+                                        fin=horarios[1][1] + datetime.timedelta(minutes=30), estado='reservado')
+        agenda.objects.create(kinesiologo=self.kx, inicio=horarios[5][0], fin=horarios[5][1], estado='expirado')
+        creados, conflictos = publicar_recurrente(self.kx, horarios, omitir_conflictos=False)
+        self.assertEqual(creados, [])
+        self.assertEqual([(c['motivo'], c['agenda_id']) for c in conflictos], [('solapa', ocupado.id)] * 2)
+        self.assertEqual([c['inicio'] for c in conflictos], [horarios[1][0], horarios[2][0]])
+        creados, conflictos = publicar_recurrente(self.kx, horarios)
+        self.assertEqual((len(creados), len(conflictos)), (14, 2))
+        # Publicar la misma regla de nuevo no duplica nada
+        creados, conflictos = publicar_recurrente(self.kx, horarios)
+        self.assertEqual((len(creados), len(conflictos)), (0, 16))
+        ayer = [(h[0] - datetime.timedelta(days=30), h[1] - datetime.timedelta(days=30)) for h in horarios[:1]]
+        self.assertEqual(publicar_recurrente(self.kx, ayer)[1][0]['motivo'], 'pasado')
+
+    def test_barrido(self):
+        ahora = timezone.now()
+
+        def horario(dias, estado):
+            inicio = ahora + datetime.timedelta(days=dias)
+            return agenda.objects.create(kinesiologo=self.kx, inicio=inicio, fin=inicio + datetime.timedelta(hours=1),
+                                         estado=estado)
+
+        pasado, reservado, futuro = horario(-1, 'disponible'), horario(-2, 'reservado'), horario(1, 'disponible')
+        antiguos = [horario(-400, 'disponible'), horario(-300, 'reservado')]
+        with self.settings(AGENDA_RETENCION_DIAS=180):
+            self.assertEqual(barrer_agenda(tamano_lote=1), {'expirados': 2, 'archivados': 2})
+            self.assertEqual(barrer_agenda(), {'expirados': 0, 'archivados': 0})
+        estados = dict(agenda.objects.values_list('id', 'estado'))
+        self.assertEqual(estados, {pasado.id: 'expirado', reservado.id: 'reservado', futuro.id: 'disponible'})
+        self.assertEqual(dict(agendaHistorica.objects.values_list('id', 'estado')),
+                         {antiguos[0].id: 'expirado', antiguos[1].id: 'reservado'})
+
+    def test_ventana_horas(self):
+        zona = zona_agenda('America/Santiago')
+        ahora = datetime.datetime(2026, 3, 10, 15, tzinfo=datetime.timezone.utc)
+        with self.settings(HORAS_DISPONIBLES_DIAS=30, HORAS_DISPONIBLES_MAX_DIAS=90):
+            self.assertEqual(ventana_horas(ahora=ahora, zona=zona), (ahora, ahora + datetime.timedelta(days=30)))
+            desde, hasta = ventana_horas('2026-03-12', '2026-03-13', ahora=ahora, zona=zona)
+            self.assertEqual((desde.astimezone(zona).date(), hasta.astimezone(zona).date()),
+                             (datetime.date(2026, 3, 12), datetime.date(2026, 3, 14)))
+            # Lo pasado se corta en ahora y la ventana no pasa del máximo
+            self.assertEqual(ventana_horas('2026-01-01', ahora=ahora, zona=zona)[0], ahora)
+            self.assertEqual(ventana_horas(hasta='2027-12-31', ahora=ahora, zona=zona)[1], ahora + datetime.timedelta(days=90))
+            for desde, hasta in (('mañana', None), ('2026-03-12', '2026-03-11'), (None, '2026-03-01')):
+                with self.assertRaises(ValueError):
+                    ventana_horas(desde, hasta, ahora=ahora, zona=zona)
+
+    def test_horas_disponibles_rango_y_compacto(self):
+        limpiar_respuestas()
+        zona = zona_agenda()
+        horarios = self.regla()
+        publicar_recurrente(self.kx, horarios)
+        agenda.objects.filter(inicio=horarios[0][0]).update(estado='reservado')
+        url = f'/api/public/kinesiologos/{self.kx.id}/horas/'
+        lunes = horarios[0][0].astimezone(zona).date()
+        with self.assertNumQueries(1):
+            lista = self.client.get(url, {'desde': lunes.isoformat(), 'hasta': lunes.isoformat()}).json()
+        self.assertEqual([h['inicio'] for h in lista], [i.astimezone(datetime.timezone.utc).isoformat() for i, _ in horarios[1:4]])  # 9:00 reservado
+        compacto = self.client.get(url, {'formato': 'compacto', 'hasta': (lunes + datetime.timedelta(days=3)).isoformat()}).json()
+        self.assertEqual(compacto['zona'], zona.key)
+        self.assertEqual([d['fecha'] for d in compacto['dias']], [lunes.isoformat(), (lunes + datetime.timedelta(days=3)).isoformat()])
+        self.assertEqual(compacto['dias'][0]['horas'], [[h['id'], m, m + 45] for h, m in zip(lista, (585, 630, 675))])
+        self.assertEqual(len(self.client.get(url).json()), 15)
+        self.assertEqual(self.client.get(url, {'hasta': 'ayer'}).status_code, 400)
+
+
+class AgendaConcurrenciaTests(TransactionTestCase):
+    """Publicaciones simultáneas de horarios que se solapan: la restricción de la BD deja pasar una sola."""
+    serialized_rollback = True
+
+    def test_inserts_paralelos(self):
+        kx = crear_kinesiologo(apellido='Paralelo', firebase_ide='uid-paralelo',
+                               suscripcion_vence=timezone.now() + datetime.timedelta(days=30))
+        inicio = timezone.now() + datetime.timedelta(days=3)
+        hilos = 8
+        barrera = threading.Barrier(hilos)
+        resultados = []
+
+        def publicar(i):
+            try:
+                cliente = APIClient()
+                cliente.credentials(HTTP_AUTHORIZATION='Bearer token-de-prueba')
+                desde = inicio + datetime.timedelta(minutes=5 * i)
+                barrera.wait()
+                r = cliente.post('/api/agendas/', {'inicio': desde.isoformat(),
+                                                   'fin': (desde + datetime.timedelta(hours=1)).isoformat()}, format='json')
+                resultados.append(r.status_code)
+            finally:
+                connection.close()
+
+        with mock.patch('core.authentication.cache_tokens.verificar',
+                        return_value={'uid': 'uid-paralelo', 'email': 'paralelo@example.com'}):
+            trabajadores = [threading.Thread(target=publicar, args=(i,)) for i in range(hilos)]
+            for t in trabajadores:
+                t.start()
+            for t in trabajadores:
+                t.join()
+        self.assertEqual(sorted(resultados), [201] + [400] * (hilos - 1))
+        self.assertEqual(agenda.objects.filter(kinesiologo=kx).count(), 1)
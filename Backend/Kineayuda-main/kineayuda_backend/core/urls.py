@@ -4,7 +4,7 @@ from .views import (kinesiologoViewSet, pacienteViewSet, citaViewSet, reseñaVie
                     AgendarCitaView, HorasDisponiblesView, KinesiologosPublicosView, ReseñasPublicasView, lista_metodos_pago,
                     estado_suscripcion, webpay_iniciar_suscripcion, webpay_retorno, DocumentoVerificacionViewSet, webpay_iniciar_pago_cita,
                     webpay_retorno_pago_cita, CitasPorRutView, CrearReseñaPorCitaView, consultar_cita_publica,
-                    validar_sentimiento_resena, estadisticas_resenas_kine, evolucion_resenas_kine, palabras_clave_resenas)
+                    validar_sentimiento_resena, estado_sentimiento_resena, estado_ia, estado_auth, estado_cache, estadisticas_resenas_kine, evolucion_resenas_kine, palabras_clave_resenas)
 
 router = routers.DefaultRouter()
 router.register(r'kinesiologos', kinesiologoViewSet, basename='kinesiologo')
@@ -26,6 +26,7 @@ urlpatterns = [
     path('public/paciente/<str:rut>/citas/', CitasPorRutView.as_view()),
     path('public/citas/<int:cita_id>/', consultar_cita_publica, name='consultar-cita'),
     path('public/citas/<int:cita_id>/resena/', CrearReseñaPorCitaView.as_view(), name='crear-resena-por-cita'),
+    path('public/resenas/<int:resena_id>/sentimiento/', estado_sentimiento_resena, name='estado-sentimiento-resena'),
     path('pagos/metodos/', lista_metodos_pago),
     #path('pagos/webhook/<str:proveedor>/', webhook_pago),
     path('pagos/estado/', estado_suscripcion),
@@ -35,6 +36,9 @@ urlpatterns = [
     path('pagos/citas/webpay/retorno/', webpay_retorno_pago_cita),
     # Fase 1: Validación IA y Estadísticas
     path('public/validar-sentimiento/', validar_sentimiento_resena, name='validar-sentimiento'),
+    path('ia/estado/', estado_ia, name='estado-ia'),
+    path('auth/estado/', estado_auth, name='estado-auth'),
+    path('cache/estado/', estado_cache, name='estado-cache'),
     path('kine/resenas/estadisticas/', estadisticas_resenas_kine, name='estadisticas-resenas'),
     # Fase 2: Gráficos y Analytics
     path('kine/resenas/evolucion/', evolucion_resenas_kine, name='evolucion-resenas'),
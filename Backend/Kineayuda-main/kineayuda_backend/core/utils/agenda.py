@@ -0,0 +1,287 @@
+import datetime
+import logging
+import threading
+import time
+from bisect import bisect_left
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from core.models import agenda, agendaHistorica
+from core.utils.cache_respuestas import invalidar
+
+logger = logging.getLogger(__name__)
+
+# Estados que ocupan el horario: uno nuevo no puede solaparse con estos (restricción
+# agenda_sin_solapamiento en la BD)
+ESTADOS_OCUPADOS = ['disponible', 'reservado', 'no_disponible']
+RESTRICCION_SOLAPAMIENTO = 'agenda_sin_solapamiento'
+
+
+class HorarioSolapado(Exception):
+    pass
+
+
+def es_solapamiento(error: IntegrityError) -> bool:
+    """True si el IntegrityError viene de la restricción de exclusión de agenda."""
+    diag = getattr(error.__cause__, 'diag', None)
+    return getattr(diag, 'constraint_name', None) == RESTRICCION_SOLAPAMIENTO
+
+
+def guardar_horario(serializer, **datos):
+    """
+    serializer.save() dejando el chequeo de solapamiento a la BD: sin query previa y
+    sin carrera entre dos publicaciones simultáneas. Lanza HorarioSolapado.
+    """
+    try:
+        with transaction.atomic():
+            return serializer.save(**datos)
+    except IntegrityError as e:
+        if es_solapamiento(e):
+            raise HorarioSolapado() from e
+        raise
+
+
+def zona_agenda(nombre=None) -> ZoneInfo:
+    """Zona en que se interpretan las horas de una regla (settings.AGENDA_ZONA_HORARIA)."""
+    return ZoneInfo(nombre or getattr(settings, 'AGENDA_ZONA_HORARIA', 'America/Santiago'))
+
+
+def expandir_regla(dias, hora_inicio, hora_fin, duracion_minutos, desde, hasta,
+                   excluir=(), pausa_minutos=0, zona=None) -> list:
+    """
+    Horarios [(inicio, fin)] de una regla semanal: en cada fecha entre desde y hasta
+    cuyo weekday() está en `dias` (0 = lunes) y que no está en `excluir`, bloques de
+    duracion_minutos (más pausa_minutos entre uno y otro) dentro de [hora_inicio, hora_fin].
+    Las horas son de reloj en `zona`, así un cambio de horario no corre los bloques.
+    """
+    zona = zona or zona_agenda()
+    dias, excluir = set(dias), set(excluir)
+    duracion = datetime.timedelta(minutes=duracion_minutos)
+    paso = duracion + datetime.timedelta(minutes=pausa_minutos)
+    horarios = []
+    fecha = desde
+    while fecha <= hasta:
+        if fecha.weekday() in dias and fecha not in excluir:
+            inicio = datetime.datetime.combine(fecha, hora_inicio, tzinfo=zona)
+            limite = datetime.datetime.combine(fecha, hora_fin, tzinfo=zona)
+            while inicio + duracion <= limite:
+                horarios.append((inicio, inicio + duracion))
+                inicio += paso
+        fecha += datetime.timedelta(days=1)
+    return horarios
+
+
+def _instante(valor: str, zona, campo: str):
+    """'AAAA-MM-DD' (medianoche en `zona`) o fecha y hora ISO; (datetime, es_fecha)."""
+    # parse_datetime también acepta una fecha sola (como medianoche sin zona): la fecha va primero
+    try:
+        fecha = parse_date(valor)
+        fecha_hora = None if fecha else parse_datetime(valor)
+    except ValueError:
+        fecha_hora = fecha = None
+    if fecha is not None:
+        return datetime.datetime.combine(fecha, datetime.time(), tzinfo=zona), True
+    if fecha_hora is None:
+        raise ValueError(f"{campo}: use AAAA-MM-DD o fecha y hora ISO.")
+    return (fecha_hora if timezone.is_aware(fecha_hora) else fecha_hora.replace(tzinfo=zona)), False
+
+
+def ventana_horas(desde=None, hasta=None, ahora=None, zona=None):
+    """
+    (desde, hasta) de las horas públicas: por defecto desde ahora y por
+    settings.HORAS_DISPONIBLES_DIAS días; una fecha sola en `hasta` incluye ese día
+    completo. Lo anterior a ahora no se muestra y la ventana se recorta a
+    HORAS_DISPONIBLES_MAX_DIAS. Lanza ValueError con un mensaje para el usuario.
+    """
+    zona = zona or zona_agenda()
+    ahora = ahora or timezone.now()
+    inicio = max(_instante(desde, zona, 'desde')[0], ahora) if desde else ahora
+    if hasta:
+        fin, es_fecha = _instante(hasta, zona, 'hasta')
+        if es_fecha:
+            fin = datetime.datetime.combine(fin.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=zona)
+    else:
+        fin = inicio + datetime.timedelta(days=getattr(settings, 'HORAS_DISPONIBLES_DIAS', 60))
+    if fin <= inicio:
+        raise ValueError("hasta: debe ser posterior a desde (y a la hora actual).")
+    return inicio, min(fin, inicio + datetime.timedelta(days=getattr(settings, 'HORAS_DISPONIBLES_MAX_DIAS', 366)))
+
+
+def horas_por_dia(filas, zona=None) -> list:
+    """
+    Formato compacto de horas: [{'fecha', 'horas': [[id, inicio, fin], ...]}] por día
+    en `zona`, con inicio/fin en minutos desde la medianoche de ese día (fin puede
+    pasar de 1440). `filas` son (id, inicio, fin) ordenadas por inicio.
+    """
+    zona = zona or zona_agenda()
+    dias, actual = [], None
+    for id_, inicio, fin in filas:
+        inicio, fin = inicio.astimezone(zona), fin.astimezone(zona)
+        fecha = inicio.date()
+        if actual is None or actual['fecha'] != fecha:
+            actual = {'fecha': fecha, 'horas': []}
+            dias.append(actual)
+        minuto = inicio.hour * 60 + inicio.minute
+        actual['horas'].append([id_, minuto, minuto + round((fin - inicio).total_seconds() / 60)])
+    for dia in dias:
+        dia['fecha'] = dia['fecha'].isoformat()
+    return dias
+
+
+def buscar_conflictos(kinesiologo_id, horarios) -> dict:
+    """
+    {posición en horarios: id del horario existente con que se solapa}, con una sola
+    query por el rango completo. Los existentes vienen ordenados por inicio y no se
+    solapan entre sí, así basta mirar hacia atrás desde el primero que empieza después.
+    """
+    if not horarios:
+        return {}
+    existentes = list(
+        agenda.objects.filter(
+            kinesiologo_id=kinesiologo_id, estado__in=ESTADOS_OCUPADOS,
+            inicio__lt=max(fin for _, fin in horarios), fin__gt=min(inicio for inicio, _ in horarios),
+        ).order_by('inicio').values_list('id', 'inicio', 'fin')
+    )
+    inicios = [e[1] for e in existentes]
+    conflictos = {}
+    for i, (inicio, fin) in enumerate(horarios):
+        j = bisect_left(inicios, fin) - 1
+        if j >= 0 and existentes[j][2] > inicio:
+            conflictos[i] = existentes[j][0]
+    return conflictos
+
+
+def publicar_recurrente(kx, horarios, omitir_conflictos=True, tamano_lote=500, intentos=3):
+    """
+    Crea los horarios de una regla en una transacción: una query de solapamiento y
+    bulk_create. Retorna (creados, conflictos), con conflictos como
+    [{'inicio', 'fin', 'motivo', 'agenda_id'}]. Con omitir_conflictos=False y algún
+    conflicto no se crea ninguno. Si la restricción de la BD rechaza el lote (una
+    publicación simultánea), se recalculan los conflictos hasta `intentos` veces.
+    """
+    ahora = timezone.now()
+    for intento in range(intentos):
+        solapados = buscar_conflictos(kx.id, horarios)
+        conflictos, nuevos = [], []
+        for i, (inicio, fin) in enumerate(horarios):
+            if inicio < ahora:
+                conflictos.append({'inicio': inicio, 'fin': fin, 'motivo': 'pasado', 'agenda_id': None})
+            elif i in solapados:
+                conflictos.append({'inicio': inicio, 'fin': fin, 'motivo': 'solapa', 'agenda_id': solapados[i]})
+            else:
+                nuevos.append(agenda(kinesiologo=kx, inicio=inicio, fin=fin, estado='disponible'))
+        if conflictos and not omitir_conflictos:
+            return [], conflictos
+        try:
+            with transaction.atomic():
+                creados = agenda.objects.bulk_create(nuevos, batch_size=tamano_lote)
+        except IntegrityError as e:
+            if not es_solapamiento(e):
+                raise
+            if intento == intentos - 1:
+                raise HorarioSolapado() from e
+            # Otra publicación entró entre la query y el insert: se vuelven a calcular los conflictos
+            continue
+        if creados:
+            # bulk_create no pasa por las señales de agenda
+            invalidar('agenda', kx.id)
+        return creados, conflictos
+
+
+def expirar_horarios(tamano_lote=1000, ahora=None) -> int:
+    """
+    Marca como 'expirado' los horarios 'disponible' que ya empezaron, en lotes de
+    `tamano_lote` filas. Avanza por id, así cada fila se revisa una sola vez, y con
+    SKIP LOCKED no espera a una reserva en curso. Retorna cuántos se marcaron.
+    """
+    ahora = ahora or timezone.now()
+    total, ultimo = 0, 0
+    while True:
+        with transaction.atomic():
+            filas = list(agenda.objects
+                         .select_for_update(skip_locked=True)
+                         .filter(estado='disponible', inicio__lt=ahora, id__gt=ultimo)
+                         .order_by('id')
+                         .values_list('id', 'kinesiologo_id')[:tamano_lote])
+            if not filas:
+                return total
+            total += agenda.objects.filter(id__in=[f[0] for f in filas]).update(estado='expirado')
+            # update() no pasa por las señales de agenda
+            invalidar('agenda', *{f[1] for f in filas})
+        ultimo = filas[-1][0]
+
+
+def archivar_horarios(retencion_dias=None, tamano_lote=1000, ahora=None) -> int:
+    """
+    Mueve a agendaHistorica los horarios (en cualquier estado) que empezaron hace más
+    de `retencion_dias` (settings.AGENDA_RETENCION_DIAS): copia y borrado en la misma
+    transacción, por lotes. Retorna cuántos se movieron.
+    """
+    if retencion_dias is None:
+        retencion_dias = getattr(settings, 'AGENDA_RETENCION_DIAS', 180)
+    corte = (ahora or timezone.now()) - datetime.timedelta(days=retencion_dias)
+    total, ultimo = 0, 0
+    while True:
+        with transaction.atomic():
+            lote = list(agenda.objects
+                        .select_for_update(skip_locked=True)
+                        .filter(inicio__lt=corte, id__gt=ultimo)
+                        .order_by('id')[:tamano_lote])
+            if not lote:
+                return total
+            agendaHistorica.objects.bulk_create([
+                agendaHistorica(id=h.id, kinesiologo_id=h.kinesiologo_id, inicio=h.inicio, fin=h.fin, estado=h.estado,
+                                paciente_id=h.paciente_id, cita_id=h.cita_id, fecha_creacion=h.fecha_creacion)
+                for h in lote
+            ])
+            agenda.objects.filter(id__in=[h.id for h in lote]).delete()
+        total += len(lote)
+        ultimo = lote[-1].id
+
+
+def barrer_agenda(tamano_lote=None, retencion_dias=None) -> dict:
+    """Una pasada del barrido: expira los horarios libres pasados y archiva los antiguos."""
+    tamano_lote = tamano_lote or getattr(settings, 'AGENDA_BARRIDO_LOTE', 1000)
+    ahora = timezone.now()
+    return {
+        'expirados': expirar_horarios(tamano_lote, ahora),
+        'archivados': archivar_horarios(retencion_dias, tamano_lote, ahora),
+    }
+
+
+_barrido = None
+_barrido_lock = threading.Lock()
+
+
+def iniciar_barrido_periodico(intervalo=None):
+    """
+    Corre barrer_agenda cada `intervalo` segundos (settings.AGENDA_BARRIDO_INTERVALO_S)
+    en un hilo del proceso; con 0 no hace nada. Alternativa a
+    `manage.py barrer_agenda --continuo` cuando no hay cron. Varios workers pueden
+    tenerlo activo a la vez: los lotes se reparten con SKIP LOCKED.
+    """
+    global _barrido
+    intervalo = getattr(settings, 'AGENDA_BARRIDO_INTERVALO_S', 0) if intervalo is None else intervalo
+    if not intervalo:
+        return None
+    with _barrido_lock:
+        if _barrido is None:
+            _barrido = threading.Thread(target=_barrer_cada, args=(intervalo,), name='agenda-barrido', daemon=True)
+            _barrido.start()
+    return _barrido
+
+
+def _barrer_cada(intervalo):
+    while True:
+        try:
+            resultado = barrer_agenda()
+            if resultado['expirados'] or resultado['archivados']:
+                logger.info("Barrido de agenda: %(expirados)s expirados, %(archivados)s archivados", resultado)
+        except Exception:
+            logger.exception("Error en el barrido de agenda")
+        finally:
+            # El hilo tiene su propia conexión a la BD: no dejarla abierta entre pasadas
+            connection.close()
+        time.sleep(intervalo)
@@ -1,20 +1,26 @@
-from core.models import kinesiologo, pagoSuscripcion
+from core.models import kinesiologo
 from django.utils import timezone
 
-def get_kinesiologo_from_request(request):
-    """Obtiene el kinesiologo asociado al request basado en el uid de Firebase."""
-    uid = getattr(request.user, 'uid', None)
+def buscar_kinesiologo(uid):
+    """Kinesiologo con ese uid de Firebase, o None."""
     if not uid:
         return None
     return kinesiologo.objects.filter(firebase_ide=uid).first()
 
+def get_kinesiologo_from_request(request):
+    """
+    Obtiene el kinesiologo asociado al request basado en el uid de Firebase.
+    Con FirebaseAuthentication se resuelve una sola vez por request y lo comparten
+    los permisos, get_queryset y perform_create (ver FirebaseUser.kinesiologo).
+    """
+    user = request.user
+    if hasattr(user, 'kinesiologo'):
+        return user.kinesiologo
+    return buscar_kinesiologo(getattr(user, 'uid', None))
+
 def kinesio_tiene_suscripcion_activa(kx) -> bool:
-    """Retorna True si el kinesiologo tiene una suscripción válida."""
-    if not kx:
-        return False
-    ultimo_pago = (pagoSuscripcion.objects
-                    .filter(kinesiologo=kx, estado='pagado')
-                    .order_by('-fecha_expiracion')
-                    .first()
-    )
-    return bool(ultimo_pago and ultimo_pago.activa)
\ No newline at end of file
+    """
+    Retorna True si el kinesiologo tiene una suscripción válida.
+    Compara la columna suscripcion_vence del objeto ya cargado, sin consultar pagos.
+    """
+    return bool(kx and kx.suscripcion_vence and kx.suscripcion_vence > timezone.now())
@@ -0,0 +1,45 @@
+import math
+import resource
+from contextlib import contextmanager
+from django.db import transaction
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil p (0-100) por el método del rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[idx]
+
+
+def rss_mb(pid=None) -> float:
+    """
+    Memoria residente actual en MB del proceso `pid` (por defecto el actual).
+    Sin /proc solo se puede medir el proceso actual (máximo histórico).
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def revertir():
+    """Transacción que se revierte siempre al salir: los datos de prueba no quedan en la base."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def vista_sin_cache(clase, version=None):
+    """
+    as_view() de una vista con RespuestaCacheadaMixin que no usa respuestas ya cacheadas,
+    sin limpiar un backend que puede ser compartido: sin `version` no lee ni escribe la
+    cache; con una versión propia de la corrida solo encuentra lo que guardó ella misma.
+    """
+    return type(clase.__name__, (clase,), {'version_cache': lambda self, *args, **kwargs: version}).as_view()
@@ -0,0 +1,179 @@
+import functools
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+# Recursos versionados: 'directorio', 'metodos_pago' (globales) y 'agenda' / 'resenas' (por kinesiólogo)
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPUESTAS_CACHE_BACKEND', 'default')]
+
+
+def _ttl():
+    return getattr(settings, 'RESPUESTAS_CACHE_TTL', 300)
+
+
+def _clave_version(recurso, id_=None):
+    return f'respuestas:version:{recurso}:{id_ if id_ is not None else "*"}'
+
+
+def version_recurso(recurso: str, id_=None) -> str:
+    """
+    Versión actual del recurso. Si no existe (primera vez o la cache la descartó) se
+    crea con la hora en ms, nunca con un valor ya usado: los cuerpos guardados con
+    una versión anterior no se vuelven a servir.
+    """
+    cache = _cache()
+    clave = _clave_version(recurso, id_)
+    version = cache.get(clave)
+    if version is None:
+        version = int(time.time() * 1000)
+        cache.add(clave, version, None)
+        version = cache.get(clave, version)
+    return str(version)
+
+
+def _incrementar(claves):
+    cache = _cache()
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:  # no existía: la próxima lectura crea una versión nueva
+            pass
+
+
+def invalidar(recurso: str, *ids):
+    """
+    Cambia la versión del recurso (o de esos ids), así sus respuestas cacheadas y
+    ETags dejan de valer. Se incrementa ahora y otra vez al confirmar la transacción:
+    una request que leyó los datos viejos entre medio no deja guardado un cuerpo
+    viejo con la versión nueva.
+    """
+    claves = [_clave_version(recurso, i) for i in ids] if ids else [_clave_version(recurso)]
+    _incrementar(claves)
+    transaction.on_commit(lambda: _incrementar(claves))
+
+
+def limpiar():
+    """Borra versiones y cuerpos cacheados (tests, o tras restaurar la base)."""
+    _cache().clear()
+
+
+class MetricasCache:
+    """Contadores por vista en este worker: aciertos, fallos, 304 y bytes servidos desde la cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vistas = {}
+
+    def sumar(self, vista, campo, cantidad=1):
+        with self._lock:
+            contadores = self._vistas.setdefault(vista, {'aciertos': 0, 'fallos': 0, 'no_modificados': 0, 'bytes_ahorrados': 0})
+            contadores[campo] += cantidad
+
+    def limpiar(self):
+        with self._lock:
+            self._vistas.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            vistas = {}
+            for vista, c in self._vistas.items():
+                total = c['aciertos'] + c['fallos'] + c['no_modificados']
+                vistas[vista] = dict(c, tasa_aciertos=round((c['aciertos'] + c['no_modificados']) / total, 3) if total else 0)
+            return {'backend': getattr(settings, 'RESPUESTAS_CACHE_BACKEND', 'default'), 'ttl': _ttl(), 'vistas': vistas}
+
+
+metricas = MetricasCache()
+
+
+def _coincide_etag(request, etag):
+    pedidos = request.META.get('HTTP_IF_NONE_MATCH')
+    if not pedidos:
+        return False
+    return any(e.strip().removeprefix('W/') in (etag, '*') for e in pedidos.split(','))
+
+
+def responder_cacheado(request, vista: str, version, generar, ttl=None):
+    """
+    Respuesta de `generar()` cacheada como bytes ya renderizados, bajo la versión
+    del recurso y la URL completa. El ETag es el hash de esos bytes: mientras el
+    cuerpo siga guardado un If-None-Match que coincide se responde con 304 sin tocar
+    la base; si venció se regenera y el 304 solo sale si el contenido es el mismo.
+    Así una escritura que no alcanzó a cambiar la versión de este proceso (otro
+    worker, la cola de IA, un comando) no deja un 304 viejo más allá del TTL. Con
+    version=None (u otro método que GET) se llama a generar() sin cache.
+    """
+    if request.method != 'GET' or version is None:
+        return generar()
+    clave = hashlib.sha256(
+        f"{vista}|{version}|{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode('utf-8')
+    ).hexdigest()[:32]
+    cache = _cache()
+    guardada = cache.get(f'respuestas:cuerpo:{clave}')
+    if guardada is not None:
+        contenido, tipo = guardada['contenido'], guardada['tipo']
+    else:
+        respuesta = generar()
+        if respuesta.status_code != 200:
+            return respuesta
+        if hasattr(respuesta, 'render') and not respuesta.is_rendered:
+            respuesta.render()
+        contenido, tipo = respuesta.content, respuesta['Content-Type']
+        cache.set(f'respuestas:cuerpo:{clave}', {'contenido': contenido, 'tipo': tipo},
+                  ttl if ttl is not None else _ttl())
+    etag = f'"{hashlib.sha256(contenido).hexdigest()[:32]}"'
+
+    if _coincide_etag(request, etag):
+        metricas.sumar(vista, 'no_modificados' if guardada is not None else 'fallos')
+        respuesta = HttpResponseNotModified()
+    elif guardada is not None:
+        metricas.sumar(vista, 'aciertos')
+        metricas.sumar(vista, 'bytes_ahorrados', len(contenido))
+        respuesta = HttpResponse(contenido, content_type=tipo)
+    else:
+        metricas.sumar(vista, 'fallos')
+    respuesta['ETag'] = etag
+    patch_cache_control(respuesta, public=True, no_cache=True)
+    patch_vary_headers(respuesta, ['Accept'])
+    return respuesta
+
+
+def cache_respuesta(recurso: str, id_kwarg=None, ttl=None):
+    """
+    Decorador para vistas función (@api_view): cachea el GET con la versión de
+    `recurso` (por kinesiólogo si id_kwarg nombra el kwarg de la URL).
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            version = version_recurso(recurso, kwargs.get(id_kwarg) if id_kwarg else None)
+            return responder_cacheado(request, vista.__name__, version, lambda: vista(request, *args, **kwargs), ttl)
+        return envoltura
+    return decorador
+
+
+class RespuestaCacheadaMixin:
+    """
+    Lo mismo para vistas de clase: `cache_recurso` e `cache_id_kwarg` como en
+    cache_respuesta, o sobreescribir version_cache() (retornar None desactiva la
+    cache para esa request).
+    """
+    cache_recurso = None
+    cache_id_kwarg = None
+    cache_ttl = None
+
+    def version_cache(self, request, *args, **kwargs):
+        return version_recurso(self.cache_recurso, kwargs.get(self.cache_id_kwarg) if self.cache_id_kwarg else None)
+
+    def dispatch(self, request, *args, **kwargs):
+        return responder_cacheado(
+            request, type(self).__name__, self.version_cache(request, *args, **kwargs),
+            lambda: super(RespuestaCacheadaMixin, self).dispatch(request, *args, **kwargs), self.cache_ttl,
+        )
@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+import firebase_admin
+from firebase_admin import auth
+from .verificador_jwt import obtener_verificador
+
+
+def clave_token(token: str) -> str:
+    """El token no se guarda tal cual en memoria: la clave es su hash."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class CacheTokens:
+    """
+    Cache de claims de ID tokens de Firebase ya verificados, por proceso.
+
+    El mismo token se reusa hasta por una hora en todas las llamadas del panel;
+    verificarlo una vez evita repetir la validación de firma en cada request. Los
+    fallos se verifican con core.utils.verificador_jwt (llaves locales, sin red) o,
+    con FIREBASE_VERIFICACION_LOCAL=False, con auth.verify_id_token. Cada entrada vence en el `exp` del token y el
+    total se acota a FIREBASE_TOKEN_CACHE_MAX (LRU; 0 desactiva la cache).
+
+    Con FIREBASE_REVISAR_REVOCACION_S > 0 un token en cache se vuelve a contrastar
+    contra Firebase (usuario deshabilitado o sesiones revocadas) cada esa cantidad
+    de segundos (la misma revisión que verify_id_token(check_revoked=True)).
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._entradas = OrderedDict()  # clave -> [claims, exp, ultima_revision]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revisiones = 0
+        self.segundos_verificacion = 0.0
+
+    @property
+    def max_entradas(self) -> int:
+        return getattr(settings, 'FIREBASE_TOKEN_CACHE_MAX', 1024)
+
+    @property
+    def intervalo_revocacion(self) -> int:
+        return getattr(settings, 'FIREBASE_REVISAR_REVOCACION_S', 0)
+
+    def verificar(self, token: str) -> dict:
+        """
+        Igual que auth.verify_id_token: retorna los claims o lanza la excepción de
+        firebase_admin (token inválido, expirado, revocado, usuario deshabilitado).
+        """
+        clave = clave_token(token)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if entrada[1] > ahora:
+                    self._entradas.move_to_end(clave)
+                else:
+                    # Expiró: se verifica de nuevo para que firebase_admin lance ExpiredIdTokenError
+                    del self._entradas[clave]
+                    entrada = None
+
+        if entrada is not None:
+            intervalo = self.intervalo_revocacion
+            if intervalo > 0 and ahora - entrada[2] >= intervalo:
+                self._revisar_revocacion(clave, entrada[0])
+                entrada[2] = ahora
+            with self._lock:
+                self.hits += 1
+            return entrada[0]
+
+        t0 = time.perf_counter()
+        if getattr(settings, 'FIREBASE_VERIFICACION_LOCAL', True):
+            claims = obtener_verificador(self._proyecto()).verificar(token)
+        else:
+            claims = auth.verify_id_token(token, app=self.app)
+        if self.intervalo_revocacion > 0:
+            self._revisar_revocacion(clave, claims)
+        duracion = time.perf_counter() - t0
+        with self._lock:
+            self.misses += 1
+            self.segundos_verificacion += duracion
+            if self.max_entradas > 0:
+                self._entradas[clave] = [claims, claims.get('exp', 0), ahora]
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        return claims
+
+    def _proyecto(self):
+        return getattr(settings, 'FIREBASE_PROJECT_ID', '') or (self.app or firebase_admin.get_app()).project_id
+
+    def _revisar_revocacion(self, clave, claims):
+        with self._lock:
+            self.revisiones += 1
+        usuario = auth.get_user(claims.get('uid'), app=self.app)
+        error = None
+        if usuario.disabled:
+            error = auth.UserDisabledError('The user record is disabled.')
+        elif claims.get('iat', 0) * 1000 < (usuario.tokens_valid_after_timestamp or 0):
+            error = auth.RevokedIdTokenError('The Firebase ID token has been revoked.')
+        if error is not None:
+            with self._lock:
+                self._entradas.pop(clave, None)
+            raise error
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.hits = self.misses = self.revisiones = 0
+            self.segundos_verificacion = 0.0
+
+    def estadisticas(self) -> dict:
+        """
+        Aciertos/fallos y tiempo ahorrado: cada acierto se cuenta como una
+        verificación evitada, al costo promedio medido en los fallos.
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            ms_verificacion = self.segundos_verificacion * 1000 / self.misses if self.misses else 0
+            ms_ahorrados = ms_verificacion * self.hits
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revisiones_revocacion': self.revisiones,
+                'tasa_aciertos': round(self.hits / consultas, 3) if consultas else 0,
+                'ms_verificacion_promedio': round(ms_verificacion, 3),
+                'ms_ahorrados_total': round(ms_ahorrados, 1),
+                'ms_ahorrados_por_request': round(ms_ahorrados / consultas, 3) if consultas else 0,
+            }
+
+
+cache_tokens = CacheTokens()
@@ -0,0 +1,114 @@
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from core.models import kinesiologo, reseña
+from core.utils.cache_respuestas import invalidar
+
+CAMPOS_RESUMEN = [
+    'resenas_total', 'resenas_suma_calificaciones', 'resenas_positivas', 'resenas_neutrales', 'resenas_negativas', 'rating',
+]
+
+
+def prior():
+    """(media, peso) del promedio bayesiano: settings.RATING_MEDIA_PREVIA y RATING_PESO_PREVIO."""
+    return (Decimal(str(getattr(settings, 'RATING_MEDIA_PREVIA', 4.0))),
+            int(getattr(settings, 'RATING_PESO_PREVIO', 5)))
+
+
+def puntaje_bayesiano(total: int, suma: int) -> Decimal:
+    """
+    (peso * media + suma) / (peso + total): con pocas reseñas el puntaje queda cerca
+    de la media previa, así una sola reseña de 5 no supera a cien de 4,8. Sin reseñas es 0
+    (queda al final de ordering=-rating y fuera de rating_min=).
+    """
+    if not total:
+        return Decimal('0.000')
+    media, peso = prior()
+    # Mismo redondeo que Postgres al guardar en numeric(4,3)
+    return ((peso * media + suma) / (peso + total)).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP)
+
+
+def registrar_resena(kinesiologo_id: int, calificacion: int):
+    """
+    Suma una reseña nueva al resumen en un solo UPDATE. Las expresiones se evalúan
+    con los valores anteriores de la fila, así dos reseñas simultáneas no se pisan.
+    """
+    media, peso = prior()
+    kinesiologo.objects.filter(id=kinesiologo_id).update(
+        resenas_total=F('resenas_total') + 1,
+        resenas_suma_calificaciones=F('resenas_suma_calificaciones') + calificacion,
+        rating=ExpressionWrapper(
+            (Value(peso * media + calificacion) + F('resenas_suma_calificaciones')) / (Value(peso + 1) + F('resenas_total')),
+            output_field=DecimalField(max_digits=4, decimal_places=3),
+        ),
+    )
+
+
+def _calcular(kinesiologo_ids=None) -> dict:
+    """Resumen desde la tabla de reseñas, en una query agrupada: {kinesiologo_id: {campo: valor}}."""
+    reseñas = reseña.objects.all()
+    if kinesiologo_ids is not None:
+        reseñas = reseñas.filter(cita__kinesiologo_id__in=kinesiologo_ids)
+    grupos = (reseñas.values('cita__kinesiologo_id')
+              .annotate(
+                  total=Count('id'),
+                  suma=Sum('calificacion'),
+                  positivas=Count('id', filter=Q(sentimiento='positiva')),
+                  neutrales=Count('id', filter=Q(sentimiento='neutral')),
+                  negativas=Count('id', filter=Q(sentimiento='negativa')),
+              )
+              .order_by())
+    return {
+        g['cita__kinesiologo_id']: {
+            'resenas_total': g['total'],
+            'resenas_suma_calificaciones': g['suma'],
+            'resenas_positivas': g['positivas'],
+            'resenas_neutrales': g['neutrales'],
+            'resenas_negativas': g['negativas'],
+            'rating': puntaje_bayesiano(g['total'], g['suma']),
+        }
+        for g in grupos
+    }
+
+
+def recalcular_resumenes(kinesiologo_ids=None, tamano_lote=1000) -> int:
+    """
+    Reconcilia el resumen con las reseñas (todos los kinesiólogos, o solo esos ids),
+    en lotes. Cada lote bloquea sus filas antes de contar: una reseña creada en
+    paralelo o ya está en el conteo o suma su +1 después, nunca ambas ni ninguna.
+    Solo escribe las filas que difieren; retorna cuántas se corrigieron.
+    """
+    ids = kinesiologo.objects.order_by('id').values_list('id', flat=True)
+    if kinesiologo_ids is not None:
+        ids = ids.filter(id__in=list(kinesiologo_ids))
+    ids = list(ids)
+    vacio = dict.fromkeys(CAMPOS_RESUMEN, 0)
+    vacio['rating'] = Decimal('0.000')
+    corregidos = 0
+    for inicio in range(0, len(ids), tamano_lote):
+        lote_ids = ids[inicio:inicio + tamano_lote]
+        with transaction.atomic():
+            filas = list(kinesiologo.objects.select_for_update().filter(id__in=lote_ids).only('id', *CAMPOS_RESUMEN))
+            calculados = _calcular(lote_ids)
+            cambiados = []
+            for kx in filas:
+                esperado = calculados.get(kx.id, vacio)
+                if any(getattr(kx, campo) != valor for campo, valor in esperado.items()):
+                    for campo, valor in esperado.items():
+                        setattr(kx, campo, valor)
+                    cambiados.append(kx)
+            # bulk_update no dispara post_save: el resumen no invalida las facetas del directorio
+            kinesiologo.objects.bulk_update(cambiados, CAMPOS_RESUMEN)
+        corregidos += len(cambiados)
+    if corregidos:
+        invalidar('directorio')
+    return corregidos
+
+
+def recalcular_por_resenas(resena_ids) -> int:
+    """Tras cambiar el sentimiento de esas reseñas (cola de IA, rescore), reconcilia a sus kinesiólogos."""
+    ids = set(reseña.objects.filter(id__in=list(resena_ids)).values_list('cita__kinesiologo_id', flat=True))
+    if ids:
+        invalidar('resenas', *ids)
+    return recalcular_resumenes(ids) if ids else 0
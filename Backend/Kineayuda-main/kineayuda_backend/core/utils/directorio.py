@@ -0,0 +1,156 @@
+import hashlib
+import json
+import math
+import re
+import unicodedata
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, DecimalField, F, Max, Min, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+from django.utils import timezone
+from core.models import kinesiologo
+from core.utils.geografia import catalogo
+from core.utils.geocodificacion import RADIO_TIERRA_KM, caja
+
+CLAVE_FACETAS = 'directorio:facetas:v2'
+
+
+def _cache():
+    return caches[getattr(settings, 'DIRECTORIO_CACHE_BACKEND', 'default')]
+
+
+def calcular_facetas() -> dict:
+    """
+    Valores para poblar los filtros del directorio, en una sola query agrupada por
+    (especialidad, comuna, región) con agregados condicionales; las combinaciones
+    son pocas, así que el resto se arma en Python. Comunas y regiones salen del
+    catálogo como {'id', 'nombre'} (el id es el valor de ?comuna= / ?region=).
+    """
+    grupos = (kinesiologo.objects
+              .filter(estado_verificacion='aprobado')
+              .values('especialidad', 'comuna_ref', 'region_ref')
+              .annotate(
+                  domicilio=Count('id', filter=Q(atiende_domicilio=True)),
+                  consulta=Count('id', filter=Q(atiende_consulta=True)),
+                  precio_min=Min('precio_consulta'),
+                  precio_max=Max('precio_consulta'),
+              )
+              .order_by())
+    especialidades, comunas, regiones = set(), set(), set()
+    precios_min, precios_max = [], []
+    domicilio = consulta = 0
+    for g in grupos:
+        especialidades.add(g['especialidad'])
+        if g['comuna_ref']:
+            comunas.add(g['comuna_ref'])
+        if g['region_ref']:
+            regiones.add(g['region_ref'])
+        precios_min.append(g['precio_min'])
+        precios_max.append(g['precio_max'])
+        domicilio += g['domicilio']
+        consulta += g['consulta']
+
+    geo = catalogo()
+    return {
+        'especialidades': sorted(especialidades),
+        'comunas': sorted(
+            ({'id': c.id, 'nombre': c.nombre, 'region': c.region_id} for c in map(geo['comunas'].get, comunas)),
+            key=lambda c: c['nombre'],
+        ),
+        'regiones': [
+            {'id': r.id, 'nombre': r.nombre}
+            for r in sorted(map(geo['regiones'].get, regiones), key=lambda r: r.orden)
+        ],
+        'precioRango': {
+            'min': min(precios_min) if precios_min else 0,
+            'max': max(precios_max) if precios_max else 100000,
+        },
+        'modalidades': {
+            'domicilio': domicilio,
+            'consulta': consulta,
+        },
+    }
+
+
+def obtener_facetas() -> dict:
+    """
+    Facetas desde la cache (DIRECTORIO_CACHE_BACKEND) o recalculadas. Retorna
+    {'data', 'etag', 'modificado'}: el ETag es el hash del contenido y
+    'modificado' el momento en que se calcularon.
+    """
+    cache = _cache()
+    facetas = cache.get(CLAVE_FACETAS)
+    if facetas is None:
+        data = calcular_facetas()
+        cuerpo = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        facetas = {
+            'data': data,
+            'etag': f'"{hashlib.sha256(cuerpo.encode("utf-8")).hexdigest()[:32]}"',
+            'modificado': timezone.now().replace(microsecond=0),
+        }
+        cache.set(CLAVE_FACETAS, facetas, getattr(settings, 'DIRECTORIO_FACETAS_TTL', 600))
+    return facetas
+
+
+def invalidar_facetas():
+    _cache().delete(CLAVE_FACETAS)
+
+
+def normalizar_busqueda(texto: str) -> str:
+    """Minúsculas y sin tildes, igual que la columna busqueda_texto (unaccent + lower)."""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).strip()
+
+
+def buscar_kinesiologos(qset, termino: str):
+    """
+    Filtra por texto libre sobre nombre, apellido, especialidad, comuna y región y
+    anota 'relevancia'.
+
+    Primero por texto completo, cada palabra como prefijo (configuración
+    es_unaccent: stemming en español, sin tildes ni mayúsculas; índice GIN sobre
+    `busqueda`, ranking con pesos nombre > especialidad > ubicación). Solo si eso
+    no encuentra nada se usa la
+    similitud de trigramas por palabra (errores de tipeo; índice GIN trgm sobre
+    `busqueda_texto`): combinar ambas condiciones con OR obliga a Postgres a
+    evaluar la similitud fila por fila. La relevancia se redondea a 6 decimales
+    para poder usarla como cursor de paginación.
+    """
+    normalizado = normalizar_busqueda(termino)
+    palabras = re.findall(r'\w+', normalizado)
+    if not palabras:
+        return qset.none()
+    # Todas las palabras, cada una como prefijo: 'traumatolog' encuentra 'traumatología'
+    consulta = SearchQuery(' & '.join(f'{p}:*' for p in palabras), config='es_unaccent', search_type='raw')
+    por_texto = qset.filter(busqueda=consulta)
+    if por_texto.exists():
+        relevancia = SearchRank(F('busqueda'), consulta)
+        qset = por_texto
+    else:
+        relevancia = TrigramWordSimilarity(normalizado, 'busqueda_texto')
+        qset = qset.filter(busqueda_texto__trigram_word_similar=normalizado)
+    return qset.annotate(relevancia=Cast(relevancia, DecimalField(max_digits=12, decimal_places=6)))
+
+
+def filtrar_cerca(qset, latitud: float, longitud: float, radio_km: float, domicilio: bool = False):
+    """
+    Kinesiólogos a menos de radio_km del punto, con 'distancia_km' anotada.
+
+    Primero la caja de latitud/longitud que contiene el círculo (rangos sobre el
+    índice (estado_verificacion, latitud, longitud)) y solo sobre esas filas la
+    distancia exacta de haversine. Con domicilio=True además tiene que estar
+    dentro del radio_domicilio_km de cada kinesiólogo. La distancia se redondea
+    a metros para poder usarla como cursor de paginación.
+    """
+    lat_min, lat_max, lon_min, lon_max = caja(latitud, longitud, radio_km)
+    qset = qset.filter(latitud__range=(lat_min, lat_max), longitud__range=(lon_min, lon_max))
+    lat0 = Value(math.radians(latitud))
+    a = (Power(Sin((Radians('latitud') - lat0) / 2), 2)
+         + Cos(lat0) * Cos(Radians('latitud')) * Power(Sin((Radians('longitud') - Value(math.radians(longitud))) / 2), 2))
+    distancia = Cast(2 * RADIO_TIERRA_KM * ASin(Sqrt(a)), DecimalField(max_digits=9, decimal_places=3))
+    qset = qset.annotate(distancia_km=distancia).filter(distancia_km__lte=radio_km)
+    if domicilio:
+        qset = qset.filter(distancia_km__lte=F('radio_domicilio_km'))
+    return qset
@@ -0,0 +1,65 @@
+import functools
+import math
+from django.conf import settings
+from django.utils.module_loading import import_string
+from core.utils.geografia import buscar_comuna
+
+RADIO_TIERRA_KM = 6371.0
+
+
+class Geocodificador:
+    """
+    Convierte la ubicación de un kinesiólogo en coordenadas. Se elige con
+    settings.GEOCODIFICADOR (ruta a la clase); una implementación con un servicio
+    externo solo tiene que sobreescribir geocodificar().
+    """
+
+    def geocodificar(self, direccion=None, comuna=None, region=None):
+        """(latitud, longitud) o None si no se pudo ubicar."""
+        raise NotImplementedError
+
+
+class GeocodificadorCentroides(Geocodificador):
+    """
+    Sin red: ubica en el centroide de la comuna (catálogo en memoria, migración
+    0019). La dirección no se usa; la precisión es la de la comuna (unos km), de
+    sobra para "kinesiólogos a menos de N km".
+    """
+
+    def geocodificar(self, direccion=None, comuna=None, region=None):
+        comuna_obj = buscar_comuna(comuna) if comuna else None
+        if comuna_obj is None or comuna_obj.latitud is None:
+            return None
+        return comuna_obj.latitud, comuna_obj.longitud
+
+
+@functools.lru_cache(maxsize=1)
+def obtener_geocodificador() -> Geocodificador:
+    return import_string(getattr(settings, 'GEOCODIFICADOR', 'core.utils.geocodificacion.GeocodificadorCentroides'))()
+
+
+def caja(latitud: float, longitud: float, radio_km: float):
+    """
+    (lat_min, lat_max, lon_min, lon_max) que contiene el círculo de radio_km: un
+    filtro por rangos que resuelve el índice antes de calcular distancias exactas.
+    El ancho en longitud es el máximo del círculo sobre la esfera (crece hacia los polos).
+    Si el círculo toca un polo o cruza el antimeridiano la caja abarca todas las
+    longitudes (-180, 180): más filas candidatas, pero ninguna queda fuera.
+    """
+    angulo = radio_km / RADIO_TIERRA_KM
+    delta_lat = math.degrees(angulo)
+    seno = math.sin(angulo) / max(math.cos(math.radians(latitud)), 1e-9)
+    # Desde un cuarto de vuelta el seno vuelve a bajar: el círculo ya abarca todas las longitudes
+    delta_lon = math.degrees(math.asin(seno)) if seno < 1 and angulo < math.pi / 2 else 180
+    lon_min, lon_max = longitud - delta_lon, longitud + delta_lon
+    if lon_min < -180 or lon_max > 180:
+        lon_min, lon_max = -180, 180
+    return latitud - delta_lat, latitud + delta_lat, lon_min, lon_max
+
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia de haversine entre dos puntos."""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,98 @@
+import functools
+import re
+import unicodedata
+from core.models import regionChile, comunaChile
+
+# Formas habituales de escribir algunas regiones, además del nombre oficial y su código
+ALIAS_REGIONES = {
+    'metropolitana': 'RM',
+    'santiago': 'RM',
+    'ohiggins': 'VI',
+    'araucania': 'IX',
+    'aysen': 'XI',
+    'magallanes': 'XII',
+}
+ALIAS_COMUNAS = {
+    'cabodehornos': 'Cabo de Hornos (Ex Navarino)',
+    'navarino': 'Cabo de Hornos (Ex Navarino)',
+    'llayllay': 'Llaillay',
+}
+
+
+class UbicacionInvalida(ValueError):
+    """Región o comuna que no está en el catálogo; `campo` es 'region' o 'comuna'."""
+
+    def __init__(self, campo, mensaje):
+        super().__init__(mensaje)
+        self.campo = campo
+
+
+def clave(texto: str) -> str:
+    """Clave de comparación: sin tildes, minúsculas, solo letras y números ('Región del Bío-Bío' -> 'biobio')."""
+    descompuesto = unicodedata.normalize('NFKD', (texto or '').lower())
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    sin_tildes = re.sub(r'^\s*region\s+(de\s+la\s+|del\s+|de\s+)?', '', sin_tildes)
+    return re.sub(r'[^a-z0-9]', '', sin_tildes)
+
+
+@functools.lru_cache(maxsize=1)
+def catalogo() -> dict:
+    """
+    Regiones y comunas de Chile (migración 0018) en memoria: son ~360 filas que no
+    cambian, así que se leen una vez por proceso. Retorna los índices por id y por
+    clave(nombre).
+    """
+    regiones = {r.id: r for r in regionChile.objects.all()}
+    comunas = {c.id: c for c in comunaChile.objects.all()}
+    por_codigo = {r.codigo: r for r in regiones.values()}
+    regiones_por_clave = {clave(r.nombre): r for r in regiones.values()}
+    regiones_por_clave.update({clave(r.codigo): r for r in regiones.values()})
+    regiones_por_clave.update({clave(a): por_codigo[c] for a, c in ALIAS_REGIONES.items() if c in por_codigo})
+    comunas_por_clave = {clave(c.nombre): c for c in comunas.values()}
+    comunas_por_clave.update({
+        clave(a): comunas_por_clave[clave(n)] for a, n in ALIAS_COMUNAS.items() if clave(n) in comunas_por_clave
+    })
+    return {
+        'regiones': regiones,
+        'comunas': comunas,
+        'regiones_por_clave': regiones_por_clave,
+        'comunas_por_clave': comunas_por_clave,
+    }
+
+
+def buscar_region(valor):
+    """Región por id o por nombre (en cualquier forma habitual), o None."""
+    datos = catalogo()
+    if isinstance(valor, int) or str(valor).strip().isdigit():
+        return datos['regiones'].get(int(valor))
+    return datos['regiones_por_clave'].get(clave(valor))
+
+
+def buscar_comuna(valor):
+    """Comuna por id o por nombre, o None. Los nombres de comuna no se repiten en Chile."""
+    datos = catalogo()
+    if isinstance(valor, int) or str(valor).strip().isdigit():
+        return datos['comunas'].get(int(valor))
+    return datos['comunas_por_clave'].get(clave(valor))
+
+
+def normalizar_ubicacion(region=None, comuna=None):
+    """
+    (región, comuna) del catálogo para los textos recibidos. Si solo viene la comuna,
+    la región se deduce de ella. Lanza UbicacionInvalida si alguno no existe o si la
+    comuna no pertenece a la región.
+    """
+    region_obj = comuna_obj = None
+    if region:
+        region_obj = buscar_region(region)
+        if region_obj is None:
+            raise UbicacionInvalida('region', f"Región desconocida: {region}.")
+    if comuna:
+        comuna_obj = buscar_comuna(comuna)
+        if comuna_obj is None:
+            raise UbicacionInvalida('comuna', f"Comuna desconocida: {comuna}.")
+        if region_obj is None:
+            region_obj = catalogo()['regiones'][comuna_obj.region_id]
+        elif comuna_obj.region_id != region_obj.id:
+            raise UbicacionInvalida('comuna', f"La comuna {comuna_obj.nombre} no pertenece a la región {region_obj.nombre}.")
+    return region_obj, comuna_obj
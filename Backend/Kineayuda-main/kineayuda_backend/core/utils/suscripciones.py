@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+from core.models import kinesiologo, pagoSuscripcion
+
+
+def registrar_vencimiento(kx_id, vence):
+    """
+    Adelanta kinesiologo.suscripcion_vence a `vence` (nunca lo retrocede). Es un
+    UPDATE condicional, así dos retornos de Webpay simultáneos no se pisan.
+    """
+    return (kinesiologo.objects
+            .filter(pk=kx_id)
+            .exclude(suscripcion_vence__gte=vence)
+            .update(suscripcion_vence=vence))
+
+
+def recalcular_vencimientos():
+    """Reconstruye suscripcion_vence desde los pagos aprobados (p.ej. tras editar pagos en el admin)."""
+    ultimo = (pagoSuscripcion.objects
+              .filter(kinesiologo=OuterRef('pk'), estado__in=['pagado', 'expirado'])
+              .values('kinesiologo')
+              .annotate(vence=Max('fecha_expiracion'))
+              .values('vence'))
+    return kinesiologo.objects.update(suscripcion_vence=Subquery(ultimo))
+
+
+def expirar_suscripciones(tamano_lote=1000, ahora=None):
+    """
+    Marca como 'expirado' los pagos 'pagado' cuya fecha_expiracion ya pasó, en
+    lotes de `tamano_lote` filas. Retorna cuántos pagos se marcaron.
+    """
+    ahora = ahora or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(pagoSuscripcion.objects
+                       .select_for_update(skip_locked=True)
+                       .filter(estado='pagado', fecha_expiracion__lte=ahora)
+                       .values_list('id', flat=True)[:tamano_lote])
+            if not ids:
+                return total
+            total += pagoSuscripcion.objects.filter(id__in=ids).update(estado='expirado')
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+from firebase_admin import auth
+
+logger = logging.getLogger(__name__)
+
+URL_CERTIFICADOS = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+# Pausa mínima entre renovaciones: con un max-age menor que margen_s el hilo no martilla a Google
+_ESPERA_MINIMA_S = 60
+
+
+class VerificadorFirebase:
+    """
+    Verifica ID tokens de Firebase con PyJWT y las llaves públicas de Google ya
+    cargadas, sin llamadas de red en el camino de la request (mismas reglas que
+    auth.verify_id_token: RS256, aud = proyecto, iss, exp/iat, sub).
+
+    Las llaves viven en memoria y en `ruta` (JSON), así un worker nuevo no espera
+    a Google. Un hilo de fondo las renueva `margen_s` segundos antes de que venza
+    el max-age que informó el endpoint; si la renovación falla se siguen usando
+    las llaves actuales. Un `kid` desconocido (rotación de llaves) fuerza una
+    descarga, como mucho una vez por minuto.
+    """
+
+    def __init__(self, proyecto, url=URL_CERTIFICADOS, ruta=None, margen_s=300, tolerancia_s=0):
+        self.proyecto = proyecto
+        self.url = url
+        self.ruta = ruta
+        self.margen_s = margen_s
+        self.tolerancia_s = tolerancia_s
+        self._llaves = {}   # kid -> llave pública
+        self._vence = 0.0   # epoch en que vence el max-age de las llaves
+        self._lock = threading.RLock()
+        self._ultimo_forzado = 0.0
+        self._hilo = None
+        self._pid = None
+        self.refrescos = 0
+
+    # --- Llaves -----------------------------------------------------------
+
+    def _descargar(self):
+        try:
+            with urllib.request.urlopen(self.url, timeout=10) as resp:
+                certificados = json.loads(resp.read().decode('utf-8'))
+                max_age = _MAX_AGE.search(resp.headers.get('Cache-Control', ''))
+        except Exception as e:
+            raise auth.CertificateFetchError(f'Error al descargar certificados de {self.url}: {e}', e)
+        return certificados, int(max_age.group(1)) if max_age else 3600
+
+    def _instalar(self, certificados, vence):
+        llaves = {
+            kid: load_pem_x509_certificate(pem.encode('utf-8')).public_key()
+            for kid, pem in certificados.items()
+        }
+        with self._lock:
+            self._llaves = llaves
+            self._vence = vence
+
+    def _guardar_disco(self, certificados, vence):
+        if not self.ruta:
+            return
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w') as f:
+                json.dump({'vence': vence, 'certificados': certificados}, f)
+            os.replace(temporal, self.ruta)  # atómico: otro worker nunca lee un archivo a medias
+        except OSError as e:
+            logger.warning("No se pudieron guardar las llaves de Firebase en %s: %s", self.ruta, e)
+
+    def _cargar_disco(self) -> bool:
+        if not self.ruta or not os.path.exists(self.ruta):
+            return False
+        try:
+            with open(self.ruta) as f:
+                datos = json.load(f)
+            self._instalar(datos['certificados'], datos['vence'])
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Llaves de Firebase en disco ilegibles (%s), se descargan de nuevo.", e)
+            return False
+
+    def refrescar(self):
+        """Descarga las llaves vigentes y las deja en memoria y en disco."""
+        certificados, max_age = self._descargar()
+        vence = time.time() + max_age
+        self._instalar(certificados, vence)
+        self._guardar_disco(certificados, vence)
+        self.refrescos += 1
+
+    def _bucle_refresco(self):
+        while True:
+            time.sleep(max(self._vence - self.margen_s - time.time(), _ESPERA_MINIMA_S))
+            try:
+                self.refrescar()
+            except auth.CertificateFetchError as e:
+                logger.warning("%s; se reintenta en %ss con las llaves actuales.", e, _ESPERA_MINIMA_S)
+
+    def _asegurar_llaves(self):
+        # Después de un fork el hilo de fondo no existe en el hijo: se vuelve a lanzar
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            cargadas = bool(self._llaves) or self._cargar_disco()
+            if not cargadas or self._vence <= time.time():
+                try:
+                    self.refrescar()
+                except auth.CertificateFetchError:
+                    if not cargadas:
+                        raise
+                    logger.warning("Llaves de Firebase vencidas y sin red: se usan las de disco.")
+            self._hilo = threading.Thread(target=self._bucle_refresco, name='refresco-llaves-firebase', daemon=True)
+            self._hilo.start()
+            self._pid = os.getpid()
+
+    def _llave(self, kid):
+        llave = self._llaves.get(kid)
+        if llave is None and time.time() - self._ultimo_forzado > 60:
+            self._ultimo_forzado = time.time()
+            self.refrescar()
+            llave = self._llaves.get(kid)
+        return llave
+
+    # --- Verificación -----------------------------------------------------
+
+    def verificar(self, token: str) -> dict:
+        """Claims del token (con 'uid'), o InvalidIdTokenError / ExpiredIdTokenError de firebase_admin."""
+        if not isinstance(token, str) or not token:
+            raise ValueError('El ID token debe ser un string no vacío.')
+        self._asegurar_llaves()
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise auth.InvalidIdTokenError(f'ID token mal formado: {e}', e)
+        llave = self._llave(kid)
+        if llave is None:
+            raise auth.InvalidIdTokenError('El "kid" del ID token no corresponde a ninguna llave pública conocida.')
+        try:
+            claims = jwt.decode(
+                token, llave, algorithms=['RS256'],
+                audience=self.proyecto,
+                issuer=f"https://securetoken.google.com/{self.proyecto}",
+                leeway=self.tolerancia_s,
+                options={'require': ['exp', 'iat', 'sub', 'aud', 'iss']},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise auth.ExpiredIdTokenError('El ID token expiró.', e)
+        except jwt.InvalidTokenError as e:
+            raise auth.InvalidIdTokenError(f'ID token inválido: {e}', e)
+        sub = claims['sub']
+        if not isinstance(sub, str) or not sub or len(sub) > 128:
+            raise auth.InvalidIdTokenError('El claim "sub" del ID token es inválido.')
+        claims['uid'] = sub
+        return claims
+
+
+_verificadores = {}
+_verificadores_lock = threading.Lock()
+
+
+def obtener_verificador(proyecto: str) -> VerificadorFirebase:
+    """Un verificador por proyecto y proceso, configurado con FIREBASE_CERTS_*."""
+    from django.conf import settings
+
+    url = getattr(settings, 'FIREBASE_CERTS_URL', '') or URL_CERTIFICADOS
+    clave = (proyecto, url)
+    with _verificadores_lock:
+        if clave not in _verificadores:
+            _verificadores[clave] = VerificadorFirebase(
+                proyecto,
+                url=url,
+                ruta=getattr(settings, 'FIREBASE_CERTS_RUTA', '') or None,
+                margen_s=getattr(settings, 'FIREBASE_CERTS_MARGEN_S', 300),
+                tolerancia_s=getattr(settings, 'FIREBASE_TOLERANCIA_RELOJ_S', 0),
+            )
+        return _verificadores[clave]
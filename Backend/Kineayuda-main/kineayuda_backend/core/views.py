@@ -1,12 +1,15 @@
 ﻿import uuid
 from django.shortcuts import render
 from datetime import timedelta
+from decimal import Decimal, InvalidOperation
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 from django.db.models import Q, Count, Case, When, FloatField, Avg
 from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.shortcuts import redirect, get_object_or_404
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
@@ -18,15 +21,23 @@ from rest_framework.views import APIView
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import kinesiologo, paciente, cita, reseña, agenda, metodoPago, pagoSuscripcion, documentoVerificacion, pagoCita
-from firebase_admin import auth
-from .serializer import (kinesiologoSerializer, pacienteSerializer, citaSerializer, reseñaSerializer, agendaSerializer, metodoPagoSerializer, 
-                         documentoVerificacionSerializer, kinesiologoFotoSerializer, KinesiologoRegistroSerializer, CitaPublicaSerializer, ReseñaPublicaSerializer)
+from .serializer import (kinesiologoSerializer, pacienteSerializer, citaSerializer, reseñaSerializer, agendaSerializer, AgendaRecurrenteSerializer, metodoPagoSerializer, 
+                         documentoVerificacionSerializer, kinesiologoFotoSerializer, KinesiologoRegistroSerializer, CitaPublicaSerializer, ReseñaPublicaSerializer,
+                         KinesiologoPublicoSerializer)
 from .utils.auth_helpers import get_kinesiologo_from_request, kinesio_tiene_suscripcion_activa
 from .utils.rut import normalizar_rut
+from .utils.suscripciones import registrar_vencimiento
+from .utils.geografia import buscar_comuna, buscar_region
+from .utils.directorio import obtener_facetas, buscar_kinesiologos, filtrar_cerca
+from .utils.agenda import HorarioSolapado, guardar_horario, publicar_recurrente, ventana_horas, horas_por_dia, zona_agenda
+from .utils.cache_respuestas import RespuestaCacheadaMixin, cache_respuesta, invalidar, metricas as metricas_respuestas
 from .payments.webpay import create_transaction, commit_transaction
 from .permissions import TieneSuscripcionActiva, EsKinesiologoVerificado
+from .paginacion import PaginacionKeyset
 from dateutil.relativedelta import relativedelta
-from .modulo_ia import analizar_sentimiento
+from .modulo_ia import analizar_sentimiento_detalle, modelo_cargado
+from .ia.cache import cache_sentimiento
+from .utils.cache_tokens import cache_tokens
 
 # Create your views here.
 
@@ -228,13 +239,46 @@ class CrearReseñaPorCitaView(APIView):
             "mensaje": "Reseña creada exitosamente.",
             "reseña_id": reseña_obj.id,
             "sentimiento": reseña_obj.sentimiento,
+            "estado_sentimiento": reseña_obj.estado_sentimiento,
         },
         status=status.HTTP_201_CREATED)
 
-class KinesiologosPublicosView(ListAPIView):
-    """Vista pública para listar todos los kinesiologos aprobados con filtros avanzados."""
-    serializer_class = kinesiologoSerializer
+class KinesiologosPublicosView(RespuestaCacheadaMixin, ListAPIView):
+    """
+    Vista pública para listar todos los kinesiologos aprobados con filtros avanzados.
+
+    ?q= busca por texto libre (ver core.utils.directorio.buscar_kinesiologos).
+    ?comuna= / ?region= reciben el id del catálogo (o el nombre) y filtran por igualdad.
+    ?cerca=lat,lon&radio_km= deja los que están a menos de radio_km, más cercanos primero.
+    ?rating_min= y ordering=-rating usan el rating bayesiano precalculado.
+    ?fields=id,nombre,... limita los campos de cada kinesiólogo (y las columnas
+    que se leen). Con ?page_size= o ?cursor= la respuesta se pagina por cursor:
+    {'next': url | null, 'results': [...]}, estable para cada ordering.
+    La respuesta queda cacheada hasta que cambia un kinesiólogo o una reseña.
+    """
+    serializer_class = KinesiologoPublicoSerializer
     permission_classes = [AllowAny]
+    pagination_class = PaginacionKeyset
+    ORDENAMIENTOS = ['precio_consulta', 'apellido', '-precio_consulta', '-apellido', 'rating', '-rating']
+    cache_recurso = 'directorio'
+
+    def version_cache(self, request, *args, **kwargs):
+        # /estadisticas/ ya tiene su propia cache y ETag (obtener_facetas)
+        if request.path.endswith('/estadisticas/'):
+            return None
+        return super().version_cache(request, *args, **kwargs)
+
+    def campos_pedidos(self):
+        pedidos = self.request.query_params.get('fields')
+        if not pedidos:
+            return None
+        validos = [c for c in pedidos.split(',') if c in KinesiologoPublicoSerializer.Meta.fields]
+        return validos or None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['campos'] = self.campos_pedidos()
+        return context
 
     def get_queryset(self):
         qset = kinesiologo.objects.filter(estado_verificacion='aprobado')
@@ -252,6 +296,17 @@ class KinesiologosPublicosView(ListAPIView):
         if precio_max:
             qset = qset.filter(precio_consulta__lte=precio_max)
         
+        # Filtro por rating (promedio bayesiano precalculado, ver core/utils/calificaciones.py)
+        rating_min = self.request.query_params.get('rating_min')
+        if rating_min:
+            try:
+                minimo = Decimal(rating_min)
+            except InvalidOperation:
+                minimo = None
+            if minimo is None or not minimo.is_finite():
+                raise ValidationError({'rating_min': "Debe ser un número entre 0 y 5."})
+            qset = qset.filter(rating__gte=minimo)
+        
         # Filtro por modalidades
         atiende_domicilio = self.request.query_params.get('atiende_domicilio')
         atiende_consulta = self.request.query_params.get('atiende_consulta')
@@ -261,20 +316,54 @@ class KinesiologosPublicosView(ListAPIView):
         if atiende_consulta is not None and atiende_consulta.lower() == 'true':
             qset = qset.filter(atiende_consulta=True)
         
-        # Filtro por ubicación
+        # Filtro por ubicación: id del catálogo o nombre (se resuelve en memoria a su id)
         comuna = self.request.query_params.get('comuna')
         region = self.request.query_params.get('region')
         if comuna:
-            qset = qset.filter(comuna__icontains=comuna)
+            comuna_obj = buscar_comuna(comuna)
+            qset = qset.filter(comuna_ref_id=comuna_obj.id) if comuna_obj else qset.none()
         if region:
-            qset = qset.filter(region__icontains=region)
-        
-        # Ordenamiento
-        ordering = self.request.query_params.get('ordering', 'apellido')
-        if ordering in ['precio_consulta', 'apellido', '-precio_consulta', '-apellido']:
-            qset = qset.order_by(ordering)
+            region_obj = buscar_region(region)
+            qset = qset.filter(region_ref_id=region_obj.id) if region_obj else qset.none()
         
-        return qset
+        # Búsqueda libre sin tildes ni mayúsculas, con ranking de relevancia
+        q = self.request.query_params.get('q', '').strip()
+        if q:
+            qset = buscar_kinesiologos(qset, q[:100])
+
+        # Cercanía: ?cerca=lat,lon&radio_km= (con atiende_domicilio=true, dentro del radio de cada uno)
+        cerca = self.punto_cercano()
+        if cerca:
+            qset = filtrar_cerca(qset, *cerca, domicilio=atiende_domicilio is not None and atiende_domicilio.lower() == 'true')
+
+        # Ordenamiento (el id desempata, así el orden y la paginación son estables).
+        # Con ?cerca= el orden por defecto es por distancia y con ?q= por relevancia.
+        ordenamientos = self.ORDENAMIENTOS + (['-relevancia'] if q else []) + (['distancia_km'] if cerca else [])
+        por_defecto = 'distancia_km' if cerca else ('-relevancia' if q else 'apellido')
+        ordering = self.request.query_params.get('ordering', por_defecto)
+        if ordering not in ordenamientos:
+            ordering = 'apellido'
+        qset = qset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+
+        # Solo las columnas que se van a serializar (más la del orden, que usa el cursor)
+        columnas = KinesiologoPublicoSerializer.columnas(self.campos_pedidos())
+        if ordering not in ('-relevancia', 'distancia_km'):
+            columnas.add(ordering.lstrip('-'))
+        return qset.only(*columnas)
+
+    def punto_cercano(self):
+        """(latitud, longitud, radio_km) de ?cerca= / ?radio_km=, o None si no vienen."""
+        cerca = self.request.query_params.get('cerca')
+        if not cerca:
+            return None
+        try:
+            latitud, longitud = (float(v) for v in cerca.split(','))
+            radio_km = float(self.request.query_params.get('radio_km', getattr(settings, 'DIRECTORIO_RADIO_KM', 10)))
+        except ValueError:
+            raise ValidationError({'cerca': "Use cerca=latitud,longitud y radio_km numérico."})
+        if not (-90 <= latitud <= 90 and -180 <= longitud <= 180) or radio_km <= 0:
+            raise ValidationError({'cerca': "Coordenadas o radio fuera de rango."})
+        return latitud, longitud, min(radio_km, getattr(settings, 'DIRECTORIO_RADIO_MAX_KM', 100))
     
     def list(self, request, *args, **kwargs):
         """Sobrescribimos list para agregar endpoint de estadísticas"""
@@ -285,69 +374,78 @@ class KinesiologosPublicosView(ListAPIView):
         return super().list(request, *args, **kwargs)
     
     def get_estadisticas(self, request):
-        """Retorna estadísticas para poblar los filtros"""
-        from django.db.models import Min, Max, Count, Q
-        
-        qset = kinesiologo.objects.filter(estado_verificacion='aprobado')
-        
-        # Especialidades únicas
-        especialidades = list(qset.values_list('especialidad', flat=True).distinct())
-        
-        # Comunas únicas (excluyendo nulls)
-        comunas = list(qset.exclude(comuna__isnull=True).exclude(comuna='').values_list('comuna', flat=True).distinct())
-        
-        # Regiones únicas
-        regiones = list(qset.exclude(region__isnull=True).exclude(region='').values_list('region', flat=True).distinct())
-        
-        # Rango de precios
-        precio_rango = qset.aggregate(
-            min=Min('precio_consulta'),
-            max=Max('precio_consulta')
-        )
-        
-        # Contador de modalidades
-        modalidades = {
-            'domicilio': qset.filter(atiende_domicilio=True).count(),
-            'consulta': qset.filter(atiende_consulta=True).count(),
-        }
-        
-        data = {
-            'especialidades': especialidades,
-            'comunas': comunas,
-            'regiones': regiones,
-            'precioRango': {
-                'min': precio_rango['min'] or 0,
-                'max': precio_rango['max'] or 100000,
-            },
-            'modalidades': modalidades
-        }
-        
-        return Response(data, status=status.HTTP_200_OK)
-
-class ReseñasPublicasView(ListAPIView):
+        """
+        Retorna estadísticas para poblar los filtros. Se calculan en una query y
+        quedan en cache hasta que cambia un kinesiólogo (ver core/signals.py); con
+        If-None-Match / If-Modified-Since el navegador recibe un 304 sin cuerpo.
+        """
+        facetas = obtener_facetas()
+        respuesta = get_conditional_response(request, etag=facetas['etag'],
+                                             last_modified=facetas['modificado'].timestamp())
+        if respuesta is None:
+            respuesta = Response(facetas['data'], status=status.HTTP_200_OK)
+        respuesta['ETag'] = facetas['etag']
+        respuesta['Last-Modified'] = http_date(facetas['modificado'].timestamp())
+        patch_cache_control(respuesta, public=True, no_cache=True)
+        return respuesta
+
+class ReseñasPublicasView(RespuestaCacheadaMixin, ListAPIView):
     """Vista pública para listar todas las reseñas."""
     permission_classes = [AllowAny]
+    cache_recurso = 'resenas'
+    cache_id_kwarg = 'kinesiologo_id'
 
     def get(self, request, kinesiologo_id):
         qset = reseña.objects.filter(cita__kinesiologo_id=kinesiologo_id)
         data = reseñaSerializer(qset, many=True).data
         return Response(data, status=status.HTTP_200_OK)
 
-class HorasDisponiblesView(APIView):
+class HorasDisponiblesView(RespuestaCacheadaMixin, APIView):
     permission_classes = [AllowAny]
+    cache_recurso = 'agenda'
+    cache_id_kwarg = 'kinesiologo_id'
+    cache_ttl = 60
+
+    def version_cache(self, request, *args, **kwargs):
+        # Las horas pasadas salen de la lista sin que nadie escriba: la versión cambia cada minuto
+        minuto = int(timezone.now().timestamp() // 60)
+        return f"{super().version_cache(request, *args, **kwargs)}.{minuto}"
     
     def get(self, request, kinesiologo_id):
-        """Devuelve las horas disponibles para reserva de un kinesiologo específico."""
-        ahora = timezone.now()
-        slots = agenda.objects.filter(kinesiologo_id=kinesiologo_id, estado='disponible', inicio__gte=ahora).order_by('inicio')
+        """
+        Devuelve las horas disponibles para reserva de un kinesiologo específico.
+
+        ?desde= / ?hasta= (AAAA-MM-DD o fecha y hora ISO) acotan la ventana; por
+        defecto son los próximos HORAS_DISPONIBLES_DIAS días (ver ventana_horas).
+        ?formato=compacto agrupa por día en AGENDA_ZONA_HORARIA:
+        {'zona', 'desde', 'hasta', 'dias': [{'fecha', 'horas': [[id, inicio, fin], ...]}]},
+        con inicio/fin en minutos desde la medianoche.
+        """
+        zona = zona_agenda()
+        try:
+            desde, hasta = ventana_horas(request.query_params.get('desde'), request.query_params.get('hasta'), zona=zona)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Solo las columnas del índice parcial agenda_disponible_idx, sin instanciar modelos
+        filas = (agenda.objects
+                 .filter(kinesiologo_id=kinesiologo_id, estado='disponible', inicio__gte=desde, inicio__lt=hasta)
+                 .order_by('inicio')
+                 .values_list('id', 'inicio', 'fin'))
+        if request.query_params.get('formato') == 'compacto':
+            return Response({
+                'zona': zona.key,
+                'desde': desde.isoformat(),
+                'hasta': hasta.isoformat(),
+                'dias': horas_por_dia(filas, zona),
+            }, status=status.HTTP_200_OK)
         data = [{
-            'id': slot.id,
-            'fecha': slot.inicio.date().isoformat(),  # Formato: 2025-11-24
-            'hora_inicio': slot.inicio.time().isoformat()[:5],  # Formato: 14:00
-            'hora_fin': slot.fin.time().isoformat()[:5],  # Formato: 15:00
-            'inicio': slot.inicio.isoformat(),  # Formato completo ISO
-            'fin': slot.fin.isoformat()  # Formato completo ISO
-        } for slot in slots]
+            'id': id_,
+            'fecha': inicio.date().isoformat(),  # Formato: 2025-11-24
+            'hora_inicio': inicio.time().isoformat()[:5],  # Formato: 14:00
+            'hora_fin': fin.time().isoformat()[:5],  # Formato: 15:00
+            'inicio': inicio.isoformat(),  # Formato completo ISO
+            'fin': fin.isoformat()  # Formato completo ISO
+        } for id_, inicio, fin in filas]
         return Response(data, status=status.HTTP_200_OK)
 
 class AgendaViewSet(viewsets.ModelViewSet):
@@ -359,7 +457,7 @@ class AgendaViewSet(viewsets.ModelViewSet):
         Lectura (list/retrieve): solo autenticación.
         Mutaciones (create/update/partial_update/destroy): requiere suscripción activa.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'recurrente']:
             return [IsAuthenticated(), EsKinesiologoVerificado(),TieneSuscripcionActiva()]
         return [IsAuthenticated(), EsKinesiologoVerificado()]
 
@@ -379,21 +477,50 @@ class AgendaViewSet(viewsets.ModelViewSet):
         if not kinesio_tiene_suscripcion_activa(kx):
             raise PermissionDenied("Necesitas una suscripción activa para publicar disponibilidad.")
 
-        inicio = serializer.validated_data['inicio']
-        fin = serializer.validated_data['fin']
-
-        # Validar solapamiento
-        solapa = agenda.objects.filter(
-            kinesiologo=kx,
-            estado__in=['disponible', 'reservado', 'no_disponible'],
-        ).filter(
-            Q(inicio__lt=fin) & Q(fin__gt=inicio)
-        ).exists()
+        # El solapamiento lo rechaza la restricción agenda_sin_solapamiento de la BD
+        try:
+            guardar_horario(serializer, kinesiologo=kx, estado='disponible')
+        except HorarioSolapado:
+            raise ValidationError("El horario solapa con otro existente.")
 
-        if solapa:
+    def perform_update(self, serializer):
+        try:
+            guardar_horario(serializer)
+        except HorarioSolapado:
             raise ValidationError("El horario solapa con otro existente.")
 
-        serializer.save(kinesiologo=kx, estado='disponible')
+    @action(detail=False, methods=['post'])
+    def recurrente(self, request):
+        """
+        Publica de una vez los horarios de una regla semanal (AgendaRecurrenteSerializer):
+        una query de solapamiento y un bulk_create, en vez de un POST por horario.
+        Los que chocan con un horario existente o ya pasaron vuelven en 'conflictos';
+        con omitir_conflictos=false basta uno para que no se cree ninguno.
+        """
+        kx = get_kinesiologo_from_request(request)
+        if not kx:
+            raise PermissionDenied("Kinesiólogo no autenticado.")
+        if not kinesio_tiene_suscripcion_activa(kx):
+            raise PermissionDenied("Necesitas una suscripción activa para publicar disponibilidad.")
+
+        regla = AgendaRecurrenteSerializer(data=request.data)
+        regla.is_valid(raise_exception=True)
+        try:
+            creados, conflictos = publicar_recurrente(kx, regla.validated_data['horarios'],
+                                                      omitir_conflictos=regla.validated_data['omitir_conflictos'])
+        except HorarioSolapado:
+            return Response({'error': 'Otra publicación simultánea ocupó estos horarios. Intenta de nuevo.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        conflictos = [dict(c, inicio=c['inicio'].isoformat(), fin=c['fin'].isoformat()) for c in conflictos]
+        if conflictos and not regla.validated_data['omitir_conflictos']:
+            return Response({'error': 'Hay horarios que no se pueden publicar.', 'conflictos': conflictos},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'creados': len(creados),
+            'desde': creados[0].inicio.isoformat() if creados else None,
+            'hasta': creados[-1].fin.isoformat() if creados else None,
+            'conflictos': conflictos,
+        }, status=status.HTTP_201_CREATED if creados else status.HTTP_200_OK)
 
     def perform_destroy(self, instance):
         if instance.estado == 'reservado':
@@ -452,7 +579,7 @@ def verificar_firebase_token(request):
     if not token:
         return Response({'error': 'Token no proporcionado.'}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        decoded = auth.verify_id_token(token)
+        decoded = cache_tokens.verificar(token)
         return Response({'uid': decoded['uid'], 
                          'email': decoded.get('email')}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -466,6 +593,7 @@ def me(request):
         return Response({'detail': 'Kinesiologo no encontrado. ¿Ya registraste tu cuenta?'}, status=404)
     return Response(kinesiologoSerializer(kx).data)
 
+@cache_respuesta('metodos_pago')
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def lista_metodos_pago(request):
@@ -512,14 +640,9 @@ def estado_suscripcion(request):
     if not kx:
         return Response({"error": "Perfil no encontrado"}, status=404)
 
-    ultimo_pago = pagoSuscripcion.objects.filter(kinesiologo=kx).order_by('-fecha_pago').first()
-
-    activa = kinesio_tiene_suscripcion_activa(kx)
-    vence = ultimo_pago.fecha_expiracion if ultimo_pago else None
-
     return Response({
-        "activa": activa,
-        "vence": vence,
+        "activa": kinesio_tiene_suscripcion_activa(kx),
+        "vence": kx.suscripcion_vence,
     }, status=200)
 
 #1 INICIAR SUSCRIPCION
@@ -610,22 +733,27 @@ def webpay_retorno(request):
     buy_order = commit.get("buy_order")
     response_code = commit.get("response_code")  # 0 = aprobado
 
-    try:
-        pago = pagoSuscripcion.objects.get(orden_comercio=buy_order)
-    except pagoSuscripcion.DoesNotExist:
-        return Response({"error": "Orden no encontrada"}, status=404)
+    # El pago y el vencimiento del kinesiologo se actualizan juntos o no se actualizan
+    with transaction.atomic():
+        try:
+            pago = pagoSuscripcion.objects.select_for_update().get(orden_comercio=buy_order)
+        except pagoSuscripcion.DoesNotExist:
+            return Response({"error": "Orden no encontrada"}, status=404)
 
-    # Guardamos payload bruto (útil para auditoría)
-    pago.raw_payload = commit
-    pago.transa_id_externo = token_ws
+        # Guardamos payload bruto (útil para auditoría)
+        pago.raw_payload = commit
+        pago.transa_id_externo = token_ws
 
-    if response_code == 0:
-        pago.estado = 'pagado'
-        pago.fecha_expiracion = timezone.now() + relativedelta(months=1)
-    else:
-        pago.estado = 'fallido'
+        if response_code == 0:
+            pago.estado = 'pagado'
+            pago.fecha_expiracion = timezone.now() + relativedelta(months=1)
+        else:
+            pago.estado = 'fallido'
 
-    pago.save()
+        pago.save()
+
+        if pago.estado == 'pagado':
+            registrar_vencimiento(pago.kinesiologo_id, pago.fecha_expiracion)
 
     # Redirigir al frontend para mostrar pantalla de éxito/fracaso
     from django.shortcuts import redirect
@@ -864,6 +992,7 @@ def webpay_retorno_pago_cita(request):
         cita_obj.estado = 'cancelada'
         cita_obj.save()
         slot_qs.update(estado='disponible')
+        invalidar('agenda', cita_obj.kinesiologo_id)  # update() no pasa por las señales de agenda
         pago.save()
 
         return Response({
@@ -954,18 +1083,21 @@ def validar_sentimiento_resena(request):
         }, status=400)
     
     # Analizar sentimiento del comentario con IA
-    sentimiento = analizar_sentimiento(comentario)
+    detalle = analizar_sentimiento_detalle(comentario)
+    sentimiento = detalle['sentimiento']
+    confianza = detalle['confianza']
     
-    # Determinar si hay coincidencia
+    # Determinar si hay coincidencia (solo se alerta si el modelo está suficientemente seguro)
     coincide = True
     sugerencia = ""
     alerta_tipo = "info"
+    seguro = confianza >= settings.IA_UMBRAL_DISCREPANCIA
     
-    if calificacion >= 4 and sentimiento == 'negativa':
+    if seguro and calificacion >= 4 and sentimiento == 'negativa':
         coincide = False
         alerta_tipo = "warning"
         sugerencia = f"Tu comentario parece negativo pero diste {calificacion} {'estrella' if calificacion == 1 else 'estrellas'}. ¿Deseas revisar tu calificación?"
-    elif calificacion <= 2 and sentimiento == 'positiva':
+    elif seguro and calificacion <= 2 and sentimiento == 'positiva':
         coincide = False
         alerta_tipo = "warning"
         sugerencia = f"Tu comentario parece positivo pero diste {calificacion} {'estrella' if calificacion == 1 else 'estrellas'}. ¿Tal vez quisiste dar más estrellas?"
@@ -973,12 +1105,54 @@ def validar_sentimiento_resena(request):
     return Response({
         'coincide': coincide,
         'sentimiento_detectado': sentimiento,
+        'confianza': confianza,
+        'probabilidades': detalle['probabilidades'],
         'sugerencia': sugerencia,
         'alerta_tipo': alerta_tipo,
         'calificacion_enviada': calificacion
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def estado_sentimiento_resena(request, resena_id):
+    """
+    Permite al frontend consultar (polling) si ya se calculó el sentimiento de una reseña.
+    estado_sentimiento: 'pendiente' | 'procesando' | 'procesado' | 'error'
+    """
+    datos = reseña.objects.filter(id=resena_id).values('id', 'sentimiento', 'estado_sentimiento').first()
+    if not datos:
+        return Response({'error': 'Reseña no encontrada'}, status=404)
+    return Response(datos)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_ia(request):
+    """
+    Estado del módulo de IA en este worker: si el modelo está cargado y los
+    contadores de aciertos/fallos de la cache de sentimiento.
+    """
+    return Response({
+        'modelo_cargado': modelo_cargado(),
+        'cache': cache_sentimiento.estadisticas(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_auth(request):
+    """Contadores de la cache de tokens de Firebase en este worker (aciertos y tiempo ahorrado)."""
+    return Response(cache_tokens.estadisticas())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_cache(request):
+    """Aciertos, fallos y 304 de la cache de respuestas públicas por vista en este worker."""
+    return Response(metricas_respuestas.estadisticas())
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def estadisticas_resenas_kine(request):
@@ -986,12 +1160,9 @@ def estadisticas_resenas_kine(request):
     Devuelve estadísticas de reseñas del kinesiólogo autenticado.
     Incluye: total, promedio, distribución por sentimiento, y discrepancias.
     """
-    kine_id = request.user.uid  # UID de Firebase
-    
-    # Obtener kinesiólogo desde Firebase UID
-    try:
-        kine = kinesiologo.objects.get(firebase_ide=kine_id)
-    except kinesiologo.DoesNotExist:
+    # Kinesiólogo del Firebase UID (resuelto una vez por request)
+    kine = get_kinesiologo_from_request(request)
+    if not kine:
         return Response({
             'error': 'Kinesiólogo no encontrado'
         }, status=404)
@@ -1040,11 +1211,19 @@ def estadisticas_resenas_kine(request):
         'negativa': round((sent_dict['negativa'] / total) * 100, 1)
     }
     
-    # Detectar discrepancias (alta calificación con comentario negativo, o viceversa)
+    # Detectar discrepancias (alta calificación con comentario negativo, o viceversa).
+    # Se usa la confianza guardada al analizar la reseña: ?umbral=0.8 no requiere volver a inferir.
+    # Las reseñas analizadas antes de guardar la confianza (NULL) se siguen considerando.
+    try:
+        umbral = float(request.query_params.get('umbral', settings.IA_UMBRAL_DISCREPANCIA))
+    except ValueError:
+        umbral = settings.IA_UMBRAL_DISCREPANCIA
     discrepancias = resenas_kine.filter(
         Q(calificacion__gte=4, sentimiento='negativa') |
         Q(calificacion__lte=2, sentimiento='positiva')
-    ).values('id', 'comentario', 'calificacion', 'sentimiento', 'fecha_creacion')[:5]  # Límite 5
+    ).filter(
+        Q(confianza_sentimiento__isnull=True) | Q(confianza_sentimiento__gte=umbral)
+    ).values('id', 'comentario', 'calificacion', 'sentimiento', 'confianza_sentimiento', 'fecha_creacion')[:5]  # Límite 5
     
     return Response({
         'total': total,
@@ -1065,12 +1244,9 @@ def evolucion_resenas_kine(request):
     from datetime import datetime,timedelta
     from dateutil.relativedelta import relativedelta
     
-    kine_id = request.user.uid  # UID de Firebase
-    
-    # Obtener kinesiólogo desde Firebase UID
-    try:
-        kine = kinesiologo.objects.get(firebase_ide=kine_id)
-    except kinesiologo.DoesNotExist:
+    # Kinesiólogo del Firebase UID (resuelto una vez por request)
+    kine = get_kinesiologo_from_request(request)
+    if not kine:
         return Response({
             'error': 'Kinesiólogo no encontrado'
         }, status=404)
@@ -1163,11 +1339,8 @@ def palabras_clave_resenas(request):
     from collections import Counter
     import re
     
-    kine_id = request.user.uid
-    
-    try:
-        kine = kinesiologo.objects.get(firebase_ide=kine_id)
-    except kinesiologo.DoesNotExist:
+    kine = get_kinesiologo_from_request(request)
+    if not kine:
         return Response({'error': 'Kinesiólogo no encontrado'}, status=404)
     
     resenas_kine = reseña.objects.filter(cita__kinesiologo_id=kine.id)
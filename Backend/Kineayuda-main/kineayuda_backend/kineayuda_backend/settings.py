@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',  
     'core',
     'rest_framework'
@@ -119,6 +120,10 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "kineayuda123"),
         "HOST": os.getenv("POSTGRES_HOST", "db"),  # <- antes decía localhost
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Costo de lectura aleatoria para el planificador. El 4 por defecto de Postgres supone disco
+        # mecánico y, p.ej., lee toda la tabla de reseñas en vez de usar resena_cita_fecha_idx
+        # (ver `manage.py verificar_indices`). 1.1 corresponde a SSD
+        "OPTIONS": {"options": f"-c random_page_cost={os.getenv('POSTGRES_RANDOM_PAGE_COST', '1.1')}"},
     }
 }
 
@@ -169,6 +174,21 @@ FIREBASE_CRED_PATH = os.getenv("FIREBASE_CRED_PATH", os.path.join(BASE_DIR, "fir
 if not firebase_admin._apps:  # Avoid multiple initializations
     cred = credentials.Certificate(FIREBASE_CRED_PATH)
     firebase_admin.initialize_app(cred)
+# Cache de ID tokens ya verificados (core.utils.cache_tokens); 0 = verificar en cada request
+FIREBASE_TOKEN_CACHE_MAX = int(os.getenv("FIREBASE_TOKEN_CACHE_MAX", "1024"))
+# Cada cuántos segundos revisar si un token en cache fue revocado (0 = no revisar)
+FIREBASE_REVISAR_REVOCACION_S = int(os.getenv("FIREBASE_REVISAR_REVOCACION_S", "0"))
+# URL alternativa de los certificados públicos de Firebase (servidor local para tests sin red). Solo la usa
+# el verificador local: con FIREBASE_VERIFICACION_LOCAL=False firebase_admin siempre los pide a Google
+FIREBASE_CERTS_URL = os.getenv("FIREBASE_CERTS_URL", "")
+# Verificar ID tokens con PyJWT y llaves cacheadas (core.utils.verificador_jwt) en vez de firebase_admin
+FIREBASE_VERIFICACION_LOCAL = os.getenv("FIREBASE_VERIFICACION_LOCAL", "True") == "True"
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID", "")  # '' = el project_id de las credenciales
+# Copia en disco de las llaves públicas, compartida por los workers y entre reinicios
+FIREBASE_CERTS_RUTA = os.getenv("FIREBASE_CERTS_RUTA", os.path.join(BASE_DIR, ".firebase_certs.json"))
+# Segundos antes del vencimiento (max-age) en que se renuevan las llaves en segundo plano
+FIREBASE_CERTS_MARGEN_S = int(os.getenv("FIREBASE_CERTS_MARGEN_S", "300"))
+FIREBASE_TOLERANCIA_RELOJ_S = int(os.getenv("FIREBASE_TOLERANCIA_RELOJ_S", "0"))
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -207,3 +227,107 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')  # tu-correo@gmail.com
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')  # App Password de Gmail
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@kineayuda.org')
 
+
+# ============================================
+# MODELO DE SENTIMIENTO (core.modulo_ia)
+# ============================================
+IA_MODELO_NOMBRE = os.getenv('IA_MODELO_NOMBRE', 'finiteautomata/beto-sentiment-analysis')
+# Commit del modelo en el Hub: fijar el SHA y cambiarlo junto con el modelo. Entra en la clave de la
+# cache de resultados y en reseña.modelo_sentimiento; una rama como 'main' se resuelve al commit
+# al que apunta al arrancar cada proceso (core.ia.registro.revision_modelo)
+IA_MODELO_REVISION = os.getenv('IA_MODELO_REVISION', 'main')
+# 'perezoso': se carga con la primera reseña analizada (por defecto)
+# 'arranque': cada worker lo carga al iniciar (wsgi/asgi)
+# 'prefork':  se carga una vez en el maestro (gunicorn --preload) y los workers lo comparten copy-on-write
+IA_CARGA_MODELO = os.getenv('IA_CARGA_MODELO', 'perezoso')
+# Micro-lotes: las reseñas que llegan al mismo tiempo se analizan en un solo forward pass
+IA_LOTE_MAX = int(os.getenv('IA_LOTE_MAX', '16'))
+IA_LOTE_ESPERA_MS = float(os.getenv('IA_LOTE_ESPERA_MS', '5'))  # 0 desactiva el agrupamiento
+IA_LOTE_TIMEOUT_S = float(os.getenv('IA_LOTE_TIMEOUT_S', '60'))  # máximo que un request espera su lote (incluye cargar el modelo)
+# Cache de resultados por hash(texto normalizado + modelo + revisión)
+IA_CACHE_MAX = int(os.getenv('IA_CACHE_MAX', '2048'))  # entradas del LRU en memoria (0 lo desactiva)
+IA_CACHE_BACKEND = os.getenv('IA_CACHE_BACKEND', '')  # alias de CACHES para compartir entre workers ('' = solo memoria)
+IA_CACHE_TTL = int(os.getenv('IA_CACHE_TTL', str(7 * 24 * 3600)))
+# Backend de inferencia: 'torch' (referencia), 'torch_int8' (cuantizado dinámico) u 'onnx' (onnxruntime)
+IA_BACKEND = os.getenv('IA_BACKEND', 'torch')
+IA_ONNX_RUTA = os.getenv('IA_ONNX_RUTA', os.path.join(BASE_DIR, 'modelos', 'beto-sentimiento.onnx'))
+# Sentimiento de reseñas nuevas: 'hilo' (segundo plano en el mismo proceso), 'cola' (lo procesa
+# `manage.py procesar_sentimientos --continuo`) o 'sincrono' (dentro del request)
+IA_SENTIMIENTO_MODO = os.getenv('IA_SENTIMIENTO_MODO', 'hilo')
+# Segundos que una reseña tomada por un worker ('procesando') queda reservada; si el worker muere, otro la retoma
+IA_COLA_RECLAMO_S = int(os.getenv('IA_COLA_RECLAMO_S', '300'))
+# Confianza mínima del modelo para alertar discrepancias entre estrellas y comentario
+IA_UMBRAL_DISCREPANCIA = float(os.getenv('IA_UMBRAL_DISCREPANCIA', '0.6'))
+# Servicio local de inferencia (`manage.py servidor_ia`): un solo proceso con el modelo para todos los workers.
+# '' = cada worker infiere en su propio proceso
+IA_SERVICIO_SOCKET = os.getenv('IA_SERVICIO_SOCKET', '')
+IA_SERVICIO_TIMEOUT = float(os.getenv('IA_SERVICIO_TIMEOUT', '2'))
+IA_SERVICIO_FALLBACK = os.getenv('IA_SERVICIO_FALLBACK', 'True') == 'True'  # inferir localmente si el servicio no responde
+IA_SERVICIO_REINTENTO_S = float(os.getenv('IA_SERVICIO_REINTENTO_S', '30'))  # tras una falla, no reintentar antes de esto
+# Hilos de torch/onnxruntime (0 = valor por defecto de la librería, normalmente todos los núcleos)
+IA_TORCH_HILOS = int(os.getenv('IA_TORCH_HILOS', '0'))
+IA_TORCH_HILOS_INTEROP = int(os.getenv('IA_TORCH_HILOS_INTEROP', '0'))
+# Largo máximo en tokens y buckets de relleno ('' = rellenar cada lote a su texto más largo)
+IA_MAX_LENGTH = int(os.getenv('IA_MAX_LENGTH', '256'))
+IA_BUCKETS_LONGITUD = [int(b) for b in os.getenv('IA_BUCKETS_LONGITUD', '32,64,128,256').split(',') if b.strip()]
+# Correr inferencias de calentamiento al cargar el modelo en modo 'arranque'
+IA_WARMUP = os.getenv('IA_WARMUP', 'True') == 'True'
+
+# ============================================
+# DIRECTORIO PÚBLICO (core.utils.directorio)
+# ============================================
+# Alias de CACHES para las facetas del buscador. Con la cache en memoria por defecto cada
+# worker invalida solo la suya; con una compartida (Redis/DB) la invalidación llega a todos
+DIRECTORIO_CACHE_BACKEND = os.getenv('DIRECTORIO_CACHE_BACKEND', 'default')
+# Vigencia máxima de las facetas cacheadas (red de seguridad si otro worker no se enteró del cambio)
+DIRECTORIO_FACETAS_TTL = int(os.getenv('DIRECTORIO_FACETAS_TTL', '600'))
+# ?cerca=lat,lon: radio por defecto y máximo de ?radio_km=
+DIRECTORIO_RADIO_KM = float(os.getenv('DIRECTORIO_RADIO_KM', '10'))
+DIRECTORIO_RADIO_MAX_KM = float(os.getenv('DIRECTORIO_RADIO_MAX_KM', '100'))
+# Clase que ubica la consulta de cada kinesiólogo (core.utils.geocodificacion). La por defecto
+# no usa red: centroide de la comuna
+GEOCODIFICADOR = os.getenv('GEOCODIFICADOR', 'core.utils.geocodificacion.GeocodificadorCentroides')
+# Rating del directorio: promedio bayesiano (peso * media + suma) / (peso + total). Al cambiarlos,
+# correr `manage.py recalcular_ratings`
+RATING_MEDIA_PREVIA = float(os.getenv('RATING_MEDIA_PREVIA', '4.0'))
+RATING_PESO_PREVIO = int(os.getenv('RATING_PESO_PREVIO', '5'))
+
+# ============================================
+# CACHE DE RESPUESTAS PÚBLICAS (core.utils.cache_respuestas)
+# ============================================
+# La cache por defecto es en memoria del proceso. Con RESPUESTAS_CACHE_RUTA se agrega un alias
+# 'respuestas' en disco, compartido por los workers de la misma máquina
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+RESPUESTAS_CACHE_RUTA = os.getenv('RESPUESTAS_CACHE_RUTA', '')
+if RESPUESTAS_CACHE_RUTA:
+    CACHES['respuestas'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': RESPUESTAS_CACHE_RUTA,
+    }
+# Alias de CACHES donde se guardan las versiones de cada recurso y los cuerpos ya renderizados
+# Las versiones solo cambian en el backend del proceso que escribe: con la cache en memoria, lo que
+# escriben otros workers, la cola de IA o los comandos (cron) se ve recién cuando vence el cuerpo
+# (el ETag es el hash del cuerpo). En producción con varios procesos usar un backend compartido
+RESPUESTAS_CACHE_BACKEND = os.getenv('RESPUESTAS_CACHE_BACKEND', 'respuestas' if RESPUESTAS_CACHE_RUTA else 'default')
+# Vigencia de un cuerpo cacheado (las versiones no vencen; un cambio invalida antes)
+RESPUESTAS_CACHE_TTL = int(os.getenv('RESPUESTAS_CACHE_TTL', '300'))
+
+# ============================================
+# AGENDA (core.utils.agenda)
+# ============================================
+# Zona en que se interpretan las horas de reloj de una regla recurrente (la BD guarda en UTC)
+AGENDA_ZONA_HORARIA = os.getenv('AGENDA_ZONA_HORARIA', 'America/Santiago')
+# Límites de POST /api/agendas/recurrente/: días que puede abarcar la regla y horarios que genera
+AGENDA_RECURRENTE_MAX_DIAS = int(os.getenv('AGENDA_RECURRENTE_MAX_DIAS', '366'))
+AGENDA_RECURRENTE_MAX_HORARIOS = int(os.getenv('AGENDA_RECURRENTE_MAX_HORARIOS', '2000'))
+# Barrido de horarios (manage.py barrer_agenda): los 'disponible' pasados quedan 'expirado' y los que
+# empezaron hace más de AGENDA_RETENCION_DIAS se mueven a agendaHistorica
+AGENDA_RETENCION_DIAS = int(os.getenv('AGENDA_RETENCION_DIAS', '180'))
+AGENDA_BARRIDO_LOTE = int(os.getenv('AGENDA_BARRIDO_LOTE', '1000'))
+# Cada cuántos segundos corre el barrido en un hilo de cada worker (0 = no corre; usar cron o --continuo)
+AGENDA_BARRIDO_INTERVALO_S = float(os.getenv('AGENDA_BARRIDO_INTERVALO_S', '0'))
+# GET /public/kinesiologos/<id>/horas/: días que se muestran sin ?hasta= y ventana máxima con ?desde=/?hasta=
+HORAS_DISPONIBLES_DIAS = int(os.getenv('HORAS_DISPONIBLES_DIAS', '60'))
+HORAS_DISPONIBLES_MAX_DIAS = int(os.getenv('HORAS_DISPONIBLES_MAX_DIAS', '366'))
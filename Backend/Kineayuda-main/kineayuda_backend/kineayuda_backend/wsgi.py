@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kineayuda_backend.settings')
 
 application = get_wsgi_application()
+
+# Carga anticipada del modelo de sentimiento según settings.IA_CARGA_MODELO
+from core.ia.registro import precargar_segun_settings  # noqa: E402
+
+precargar_segun_settings()
+
+# Barrido periódico de la agenda en este proceso, si settings.AGENDA_BARRIDO_INTERVALO_S > 0
+from core.utils.agenda import iniciar_barrido_periodico  # noqa: E402
+
+iniciar_barrido_periodico()
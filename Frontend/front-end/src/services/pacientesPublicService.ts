@@ -53,8 +53,8 @@ export interface FiltrosKinesiologo {
  */
 export interface EstadisticasFiltros {
     especialidades: string[];
-    comunas: string[];
-    regiones: string[];
+    comunas: { id: number; nombre: string; region: number }[];
+    regiones: { id: number; nombre: string }[];
     precioRango: {
         min: number;
         max: number;
@@ -85,9 +85,13 @@ export interface Resena {
  * Agenda pública de un kinesiólogo
  */
 export async function obtenerAgendaPublica(
-    kinesiologoId: number
+    kinesiologoId: number,
+    rango?: { desde?: string; hasta?: string }
 ): Promise<SlotPublico[]> {
-    const resp = await api.get(`/public/kinesiologos/${kinesiologoId}/horas/`);
+    // desde/hasta: AAAA-MM-DD; sin ellos el backend devuelve los próximos 60 días
+    const resp = await api.get(`/public/kinesiologos/${kinesiologoId}/horas/`, {
+        params: rango,
+    });
     return resp.data;
 }
 